@@ -1,13 +1,55 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from modules.routers import users, doctors, benchmark
-from modules.config import init_db
+from modules.routers import users, doctors, benchmark, routes
+from modules.config import (
+    init_db, create_osrm_client, MATRIX_STORE_DIR, MATRIX_STORE_SYNC_ON_START, COMPUTE_EXECUTOR, COMPUTE_WORKERS, COMPUTE_MAX_QUEUE,
+    BENCHMARK_JOB_WORKERS, BENCHMARK_JOB_POLL_INTERVAL, BENCHMARK_JOB_LEASE, DIJKSTRA_WORKERS,
+)
+from modules.algorithms.dijkstra_parallel import start_pool, shutdown_pool
+from modules.services.compute import ComputeExecutor
+from modules.services.region_matrix import sync_matrix_store
+from modules.preprocess.matrix_store import MatrixStore
+from modules.services.benchmark_jobs import BenchmarkJobQueue
+from modules.services.migrations import migrate_embedded_recommendations, backfill_locations
 from contextlib import asynccontextmanager
+import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
-    yield
+    await migrate_embedded_recommendations()
+    await backfill_locations()
+    app.state.osrm_client = await create_osrm_client()
+    app.state.matrix_store = MatrixStore(MATRIX_STORE_DIR) if MATRIX_STORE_DIR else None
+    # Precompute job: catch the store up with the database in the background
+    matrix_sync = None
+    if app.state.matrix_store is not None and MATRIX_STORE_SYNC_ON_START:
+        matrix_sync = asyncio.create_task(sync_matrix_store(app.state.matrix_store, app.state.osrm_client))
+    if DIJKSTRA_WORKERS > 1:
+        start_pool(DIJKSTRA_WORKERS)
+    app.state.compute = ComputeExecutor(
+        max_workers=COMPUTE_WORKERS,
+        max_queue=COMPUTE_MAX_QUEUE,
+        kind=COMPUTE_EXECUTOR,
+    )
+    app.state.job_queue = BenchmarkJobQueue(
+        app.state.osrm_client,
+        app.state.compute,
+        workers=BENCHMARK_JOB_WORKERS,
+        poll_interval=BENCHMARK_JOB_POLL_INTERVAL,
+        lease=BENCHMARK_JOB_LEASE,
+        matrix_store=app.state.matrix_store,
+    )
+    await app.state.job_queue.start()
+    try:
+        yield
+    finally:
+        if matrix_sync is not None:
+            matrix_sync.cancel()
+        await app.state.job_queue.stop()
+        app.state.compute.shutdown()
+        shutdown_pool()
+        await app.state.osrm_client.aclose()
 
 app = FastAPI(
     title="Medcom Routing Dashboard API",
@@ -23,12 +65,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(users.router)
 app.include_router(doctors.router)
 app.include_router(benchmark.router)
+app.include_router(routes.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,51 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+def assign_capacitated(distance_matrix, depots: Sequence[int], capacity: int) -> Dict[int, List[int]]:
+    """
+    Assign every non-depot node to a depot, at most `capacity` nodes per depot.
+
+    Regret insertion: each step assigns the node that would lose the most by
+    not getting its cheapest open depot (second cheapest minus cheapest
+    round trip), so nodes with one clearly best depot are placed before that
+    depot fills up. O(N² · D) in NumPy.
+    Args:
+        distance_matrix: N x N distances (inf/NaN for unreachable pairs)
+        depots: Depot nodes
+        capacity: Nodes per depot at most (len(depots) * capacity must cover every node)
+    Returns:
+        Assigned nodes per depot, in assignment order
+    """
+    dist = np.array(distance_matrix, dtype=np.float64)
+    dist[~np.isfinite(dist)] = np.inf
+    depots = list(depots)
+    nodes = np.array([node for node in range(len(dist)) if node not in set(depots)], dtype=np.int64)
+    if len(nodes) > capacity * len(depots):
+        raise ValueError(f"{len(nodes)} nodes exceed {len(depots)} depots x capacity {capacity}")
+    # Round trip depot -> node -> depot, nodes x depots
+    cost = dist[np.ix_(depots, nodes)].T + dist[np.ix_(nodes, depots)]
+    # Unreachable pairs still beat an over-capacity depot
+    finite = np.isfinite(cost)
+    cost[~finite] = (cost[finite].max(initial=0.0) + 1) * 10
+    load = np.zeros(len(depots), dtype=np.int64)
+    assigned: Dict[int, List[int]] = {depot: [] for depot in depots}
+    pending = np.ones(len(nodes), dtype=bool)
+    for _ in range(len(nodes)):
+        open_cost = np.where(load < capacity, cost, np.inf)
+        open_cost[~pending] = np.inf
+        if len(depots) > 1:
+            two = np.partition(open_cost, 1, axis=1)[:, :2]
+            with np.errstate(invalid="ignore"):
+                regret = np.where(np.isfinite(two[:, 1]), two[:, 1] - two[:, 0], np.inf)
+        else:
+            regret = -open_cost[:, 0]
+        regret[~pending] = -np.inf
+        # Ties (e.g. a single open depot left) go to the cheapest node
+        candidates = np.flatnonzero(regret == regret.max())
+        i = int(candidates[np.argmin(open_cost[candidates].min(axis=1))])
+        d = int(np.argmin(open_cost[i]))
+        assigned[depots[d]].append(int(nodes[i]))
+        load[d] += 1
+        pending[i] = False
+    return assigned
@@ -1,53 +1,159 @@
-def bellman_ford_all_pairs(adj_list):
+from collections import deque
+from typing import List, Optional, Set
+from modules.preprocess.csr_graph import as_csr
+from modules.algorithms.nearest_neighbor import nearest_neighbor_order
+
+class NegativeCycleError(ValueError):
+    """
+    A negative-weight cycle is reachable from `source`, so shortest paths are undefined.
+
+    `cycle` lists the nodes of one such cycle in travel order. `source` is
+    None when the whole graph was searched at once (Johnson's potentials).
+    """
+    def __init__(self, source: Optional[int], cycle: Optional[List[int]] = None):
+        self.source = source
+        self.cycle = cycle or []
+        origin = f" reachable from node {source}" if source is not None else ""
+        detail = f": {' -> '.join(map(str, self.cycle + self.cycle[:1]))}" if self.cycle else ""
+        super().__init__(f"Negative cycle{origin}{detail}")
+
+def _find_cycle(pred: List[int], v: int, n: int) -> List[int]:
+    """Cycle in the predecessor graph reached by walking back from v (which was just relaxed)."""
+    # After n steps back the walk is certainly inside the cycle
+    for _ in range(n):
+        v = pred[v]
+    cycle = [v]
+    u = pred[v]
+    while u != v:
+        cycle.append(u)
+        u = pred[u]
+    cycle.reverse()
+    return cycle
+
+def _bellman_ford(sources, targets, weights, n, source, early_exit=True):
+    """
+    Single-source Bellman-Ford over parallel edge lists.
+
+    With early_exit the rounds stop as soon as one relaxes no edge, which on
+    sparse k-nearest graphs happens after a few rounds instead of n - 1.
+    Raises:
+        NegativeCycleError: if an edge can still be relaxed after n - 1 rounds
+    """
+    dist = [float('inf')] * n
+    dist[source] = 0
+    pred = [-1] * n
+    edges = list(zip(sources, targets, weights))
+    for _ in range(n - 1):
+        changed = False
+        for u, v, w in edges:
+            if dist[u] + w < dist[v]:
+                dist[v] = dist[u] + w
+                pred[v] = u
+                changed = True
+        if early_exit and not changed:
+            return dist
+    for u, v, w in edges:
+        if dist[u] + w < dist[v]:
+            pred[v] = u
+            raise NegativeCycleError(source, _find_cycle(pred, v, n))
+    return dist
+
+def _spfa(indptr, indices, weights, source):
+    """
+    Single-source SPFA (queue-based Bellman-Ford) over CSR lists.
+
+    Only nodes whose distance improved are scanned again. With the
+    small-label-first heuristic a node is queued at the front when its
+    distance is below the one at the front, so nodes tend to be scanned
+    closer to their final distance.
+    Raises:
+        NegativeCycleError: when a shortest path would need n or more edges
+    """
+    n = len(indptr) - 1
+    dist = [float('inf')] * n
+    dist[source] = 0
+    pred = [-1] * n
+    hops = [0] * n
+    in_queue = [False] * n
+    queue = deque([source])
+    in_queue[source] = True
+    while queue:
+        u = queue.popleft()
+        in_queue[u] = False
+        du = dist[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            nd = du + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                hops[v] = hops[u] + 1
+                if hops[v] >= n:
+                    raise NegativeCycleError(source, _find_cycle(pred, v, n))
+                if not in_queue[v]:
+                    in_queue[v] = True
+                    if queue and nd < dist[queue[0]]:
+                        queue.appendleft(v)
+                    else:
+                        queue.append(v)
+    return dist
+
+def bellman_ford_all_pairs(adj_list, early_exit=True):
     """
     All-Pairs Shortest Path using Bellman-Ford algorithm.
     Args:
-        adj_list: Dict[int, List[Tuple[int, float]]] adjacency list
+        adj_list: CSRGraph or Dict[int, List[Tuple[int, float]]] adjacency list
+        early_exit: Stop each search after the first round without a relaxation
+            (False always runs n - 1 rounds, the textbook baseline)
     Returns:
         dist: Dict[int, Dict[int, float]] shortest path distances
+    Raises:
+        NegativeCycleError: as soon as a source reaches a negative cycle
     """
-    nodes = list(adj_list.keys())
-    n = len(nodes)
+    graph = as_csr(adj_list)
+    n = graph.n
+    sources, targets, weights = graph.sources().tolist(), graph.indices.tolist(), graph.weights.tolist()
+    nodes = range(n)
     all_dist = {}
     for src in nodes:
-        dist = {node: float('inf') for node in nodes}
-        dist[src] = 0
-        for _ in range(n - 1):
-            for u in nodes:
-                for v, w in adj_list[u]:
-                    if dist[u] + w < dist[v]:
-                        dist[v] = dist[u] + w
-        all_dist[src] = dist
+        all_dist[src] = dict(zip(nodes, _bellman_ford(sources, targets, weights, n, src, early_exit)))
     return all_dist 
 
 # New function for visiting order
-def bellman_ford_route(adj_list, start_idx, user_indices, priorities=None, idx_to_userid=None):
+def bellman_ford_route(adj_list, start_idx, user_indices, dist=None, priority_indices: Optional[Set[int]] = None):
     """
     Returns a visiting order using a greedy nearest neighbor approach with Bellman-Ford algorithm.
+    
+    `dist` is an all-pairs table already computed for this graph (e.g. by the
+    benchmark runner); without it the all-pairs table is computed once here.
+    Nodes in `priority_indices` are visited before all others.
+    """
+    if dist is None:
+        dist = bellman_ford_all_pairs(adj_list)
+    return nearest_neighbor_order(dist, start_idx, user_indices, priority_indices)
+
+def spfa_all_pairs(adj_list):
+    """
+    All-Pairs Shortest Path using SPFA with the small-label-first heuristic.
+    Args:
+        adj_list: CSRGraph or Dict[int, List[Tuple[int, float]]] adjacency list
+    Returns:
+        dist: Dict[int, Dict[int, float]] shortest path distances
+    Raises:
+        NegativeCycleError: as soon as a source reaches a negative cycle
+    """
+    indptr, indices, weights = as_csr(adj_list).as_lists()
+    nodes = range(len(indptr) - 1)
+    return {src: dict(zip(nodes, _spfa(indptr, indices, weights, src))) for src in nodes}
+
+def spfa_route(adj_list, start_idx, user_indices, dist=None, priority_indices: Optional[Set[int]] = None):
+    """
+    Returns a visiting order using a greedy nearest neighbor approach with SPFA distances.
+
+    `dist` is an all-pairs table already computed for this graph (e.g. by the
+    benchmark runner); without it the all-pairs table is computed once here.
+    Nodes in `priority_indices` are visited before all others.
     """
-    order = [start_idx]
-    unvisited = set(user_indices)
-    current = start_idx
-    nodes = list(adj_list.keys())
-    n = len(nodes)
-    while unvisited:
-        # Bellman-Ford from current
-        dist = {node: float('inf') for node in nodes}
-        dist[current] = 0
-        for _ in range(n - 1):
-            for u in nodes:
-                for v, w in adj_list[u]:
-                    if dist[u] + w < dist[v]:
-                        dist[v] = dist[u] + w
-        # Prefer priority nodes if any are unvisited
-        next_node = None
-        if priorities and idx_to_userid:
-            priority_unvisited = [x for x in unvisited if priorities.get(idx_to_userid.get(x))]
-            if priority_unvisited:
-                next_node = min(priority_unvisited, key=lambda x: dist[x])
-        if next_node is None:
-            next_node = min(unvisited, key=lambda x: dist[x])
-        order.append(next_node)
-        unvisited.remove(next_node)
-        current = next_node
-    return order 
\ No newline at end of file
+    if dist is None:
+        dist = spfa_all_pairs(adj_list)
+    return nearest_neighbor_order(dist, start_idx, user_indices, priority_indices)
@@ -1,57 +1,51 @@
 import heapq
-from typing import Dict, List, Tuple
+import numpy as np
+from typing import Dict, List, Optional, Set, Tuple, Union
+from modules.preprocess.csr_graph import CSRGraph, as_csr
+from modules.algorithms.nearest_neighbor import nearest_neighbor_order
+from modules.algorithms.search import search_route
 
-def dijkstra_all_pairs(adj_list):
+Graph = Union[CSRGraph, Dict[int, List[Tuple[int, float]]]]
+
+def _dijkstra(indptr: List[int], indices: List[int], weights: List[float], source: int) -> List[float]:
+    """Single-source Dijkstra over CSR lists, returns the distance to every node."""
+    dist = [float('inf')] * (len(indptr) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            nd = d + weights[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+def dijkstra_all_pairs(adj_list: Graph):
     """
     All-Pairs Shortest Path using Dijkstra's algorithm.
     Args:
-        adj_list: Dict[int, List[Tuple[int, float]]] adjacency list
+        adj_list: CSRGraph or Dict[int, List[Tuple[int, float]]] adjacency list
     Returns:
-        dist: Dict[int, Dict[int, float]] shortest path distances
+        dist: N x N array of shortest path distances (inf if unreachable)
     """
-    def dijkstra(source):
-        dist = {node: float('inf') for node in adj_list}
-        dist[source] = 0
-        heap = [(0.0, source)]
-        while heap:
-            d, u = heapq.heappop(heap)
-            if d > dist[u]:
-                continue
-            for v, w in adj_list[u]:
-                if dist[u] + w < dist[v]:
-                    dist[v] = dist[u] + w
-                    heapq.heappush(heap, (dist[v], v))
-        return dist
-    
-    all_dist = {}
-    for node in adj_list:
-        all_dist[node] = dijkstra(node)
-    return all_dist 
+    indptr, indices, weights = as_csr(adj_list).as_lists()
+    return np.array([_dijkstra(indptr, indices, weights, node) for node in range(len(indptr) - 1)], dtype=np.float64)
 
 # New function for visiting order
-def dijkstra_route(adj_list: Dict[int, List[Tuple[int, float]]], start_idx: int, user_indices: List[int]) -> List[int]:
+def dijkstra_route(adj_list: Graph, start_idx: int, user_indices: List[int], dist=None,
+                   priority_indices: Optional[Set[int]] = None) -> List[int]:
     """
     Returns a visiting order using a greedy nearest neighbor approach with Dijkstra's algorithm.
+    
+    `dist` is an all-pairs table already computed for this graph (e.g. by the
+    benchmark runner); without it each step runs a Dijkstra from the current
+    node that stops once the remaining candidates are settled.
+    Nodes in `priority_indices` are visited before all others.
     """
-    order = [start_idx]
-    unvisited = set(user_indices)
-    current = start_idx
-    while unvisited:
-        # Compute shortest paths from current node
-        dist = {node: float('inf') for node in adj_list}
-        dist[current] = 0
-        heap = [(0.0, current)]
-        while heap:
-            d, u = heapq.heappop(heap)
-            if d > dist[u]:
-                continue
-            for v, w in adj_list[u]:
-                if dist[u] + w < dist[v]:
-                    dist[v] = dist[u] + w
-                    heapq.heappush(heap, (dist[v], v))
-        # Find nearest unvisited
-        next_node = min(unvisited, key=lambda x: dist[x])
-        order.append(next_node)
-        unvisited.remove(next_node)
-        current = next_node
-    return order 
\ No newline at end of file
+    if dist is None:
+        return search_route(adj_list, start_idx, user_indices, priority_indices)[0]
+    return nearest_neighbor_order(dist, start_idx, user_indices, priority_indices)
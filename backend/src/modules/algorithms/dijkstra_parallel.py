@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from modules.preprocess.csr_graph import as_csr
+from modules.algorithms.dijkstra_all_pairs import _dijkstra
+
+# Graph lists and output matrix of the current worker process, set by _load_graph
+_worker_state: Dict[str, object] = {}
+
+# Process pool shared by every call, kept for the life of the process (see start_pool)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block; the parent process owns and unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Workers share the parent's resource tracker, so registering again is a no-op
+        return shared_memory.SharedMemory(name=name)
+
+def _load_graph(blocks: Dict[str, Tuple[str, Tuple[int, ...], str]]) -> None:
+    """Attach a call's shared graph once per worker and convert it to Python lists."""
+    for shm in _worker_state.get('handles', ()):
+        shm.close()
+    _worker_state.clear()
+    arrays = {}
+    handles = []
+    for key, (name, shape, dtype) in blocks.items():
+        shm = _attach(name)
+        handles.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker_state['handles'] = handles
+    _worker_state['indptr'] = arrays['indptr'].tolist()
+    _worker_state['indices'] = arrays['indices'].tolist()
+    _worker_state['weights'] = arrays['weights'].tolist()
+    _worker_state['out'] = arrays['out']
+    _worker_state['key'] = blocks['out'][0]
+
+def _run_batch(blocks: Dict[str, Tuple[str, Tuple[int, ...], str]], sources: List[int]) -> int:
+    """Run Dijkstra from each source and write the rows straight into the shared output."""
+    # Workers outlive calls: a new output block means a new graph
+    if _worker_state.get('key') != blocks['out'][0]:
+        _load_graph(blocks)
+    indptr = _worker_state['indptr']
+    indices = _worker_state['indices']
+    weights = _worker_state['weights']
+    out = _worker_state['out']
+    for source in sources:
+        out[source] = _dijkstra(indptr, indices, weights, source)
+    return len(sources)
+
+def _gil_disabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+def _mp_context():
+    # Forking a process that runs threads (uvicorn, motor, the compute pool) can
+    # deadlock the child on a lock held by another thread; forkserver/spawn start clean
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def start_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The shared worker pool with at least `workers` processes, started on first use.
+
+    Called from the app lifespan so the pool lives as long as the app; the
+    offline suite gets one on its first parallel call. Worker start-up is
+    paid once instead of on every call (and every benchmark repeat).
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                # Tasks already submitted by other calls still complete
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pool() -> None:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, 0
+
+def dijkstra_all_pairs_parallel(adj_list, workers: Optional[int] = None, batch_size: Optional[int] = None, min_nodes: int = 0) -> np.ndarray:
+    """
+    All-Pairs Shortest Path running the per-source Dijkstras on several cores.
+
+    Sources are split into batches executed by the shared process pool
+    (start_pool). The CSR graph and the n x n result are placed in shared
+    memory, so each worker loads the graph once per call and writes its rows
+    in place instead of pickling them back.
+    On free-threaded Python builds a thread pool is used instead.
+    Args:
+        adj_list: CSRGraph or Dict[int, List[Tuple[int, float]]] adjacency list
+        workers: Number of worker processes (defaults to the CPU count)
+        batch_size: Sources per task (defaults to ~4 batches per worker)
+        min_nodes: Below this many nodes the searches run serially in-process
+    Returns:
+        dist: n x n numpy array of shortest path distances
+    """
+    graph = as_csr(adj_list)
+    n = graph.n
+    workers = workers or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, -(-n // (workers * 4)))
+    batches = [list(range(start, min(start + batch_size, n))) for start in range(0, n, batch_size)]
+
+    if workers <= 1 or n < min_nodes or n == 0:
+        indptr, indices, weights = graph.as_lists()
+        out = np.empty((n, n), dtype=np.float64)
+        for source in range(n):
+            out[source] = _dijkstra(indptr, indices, weights, source)
+        return out
+
+    if _gil_disabled():
+        indptr, indices, weights = graph.as_lists()
+        out = np.empty((n, n), dtype=np.float64)
+
+        def run(batch: List[int]) -> None:
+            for source in batch:
+                out[source] = _dijkstra(indptr, indices, weights, source)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, batches))
+        return out
+
+    arrays = {
+        'indptr': graph.indptr,
+        'indices': graph.indices,
+        'weights': graph.weights,
+        'out': np.empty((n, n), dtype=np.float64),
+    }
+    segments = []
+    try:
+        blocks = {}
+        for key, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            blocks[key] = (shm.name, array.shape, array.dtype.str)
+        pool = start_pool(workers)
+        list(pool.map(_run_batch, [blocks] * len(batches), batches))
+        _, shape, dtype = blocks['out']
+        return np.ndarray(shape, dtype=dtype, buffer=segments[-1].buf).copy()
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
@@ -1,11 +1,21 @@
+import numpy as np
+from modules.preprocess.csr_graph import CSRGraph
+from modules.algorithms.nearest_neighbor import nearest_neighbor_order
+
 def floyd_warshall(adj_matrix):
     """
     All-Pairs Shortest Path using Floyd-Warshall algorithm.
+    
+    Pure-Python reference implementation, kept as the baseline for benchmarks.
     Args:
-        adj_matrix: 2D list or numpy array representing adjacency matrix (with inf for no edge)
+        adj_matrix: 2D list, numpy array (with inf for no edge) or CSRGraph
     Returns:
-        dist: 2D list or array of shortest path distances
+        dist: 2D list of shortest path distances
     """
+    if isinstance(adj_matrix, CSRGraph):
+        adj_matrix = adj_matrix.to_dense()
+    if isinstance(adj_matrix, np.ndarray):
+        adj_matrix = adj_matrix.tolist()
     n = len(adj_matrix)
     # Copy the adjacency matrix to avoid mutating the input
     dist = [row[:] for row in adj_matrix]
@@ -16,20 +26,121 @@ def floyd_warshall(adj_matrix):
                     dist[i][j] = dist[i][k] + dist[k][j]
     return dist 
 
+def floyd_warshall_numpy(adj_matrix, dtype=np.float64, return_predecessors=False, overwrite=False):
+    """
+    Vectorized Floyd-Warshall: each k-step is one broadcasted np.minimum over the whole matrix.
+    Args:
+        adj_matrix: 2D list, numpy array (with inf for no edge) or CSRGraph
+        dtype: np.float64 or np.float32 (halves memory, ~7 significant digits)
+        return_predecessors: Also return the predecessor matrix for `reconstruct_path`
+        overwrite: Work directly on adj_matrix when it is already an array of `dtype`
+    Returns:
+        dist: numpy array of shortest path distances,
+        or (dist, pred) when return_predecessors is set. pred[i][j] is the node
+        before j on the shortest i -> j path, -1 when there is none.
+    """
+    if isinstance(adj_matrix, CSRGraph):
+        dist = adj_matrix.to_dense(dtype)
+    elif overwrite and isinstance(adj_matrix, np.ndarray) and adj_matrix.dtype == dtype:
+        dist = adj_matrix
+    else:
+        dist = np.array(adj_matrix, dtype=dtype)
+    n = dist.shape[0]
+    via = np.empty_like(dist)
+    
+    if not return_predecessors:
+        for k in range(n):
+            np.add(dist[:, k, None], dist[None, k, :], out=via)
+            np.minimum(dist, via, out=dist)
+        return dist
+    
+    pred = np.where(np.isfinite(dist), np.arange(n)[:, None], -1)
+    np.fill_diagonal(pred, -1)
+    improved = np.empty(dist.shape, dtype=bool)
+    for k in range(n):
+        np.add(dist[:, k, None], dist[None, k, :], out=via)
+        np.less(via, dist, out=improved)
+        np.copyto(dist, via, where=improved)
+        np.copyto(pred, np.broadcast_to(pred[k, :], pred.shape), where=improved)
+    return dist, pred
+
+def floyd_warshall_blocked(adj_matrix, block_size=64, dtype=np.float64):
+    """
+    Tiled Floyd-Warshall for cache locality on large graphs.
+    
+    Runs the classic three-phase blocked schedule: the diagonal tile of each
+    k-block, then its row and column tiles, then every remaining tile as a
+    min-plus product of two finished tiles.
+    Args:
+        adj_matrix: 2D list, numpy array (with inf for no edge) or CSRGraph
+        block_size: Tile edge length; tiles of block_size^2 should fit in L2
+        dtype: np.float64 or np.float32
+    Returns:
+        dist: numpy array of shortest path distances
+    """
+    if isinstance(adj_matrix, CSRGraph):
+        dist = adj_matrix.to_dense(dtype)
+    else:
+        dist = np.array(adj_matrix, dtype=dtype)
+    n = dist.shape[0]
+    blocks = [slice(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+    for kb, K in enumerate(blocks):
+        # Phase 1: the diagonal tile depends only on itself
+        _fw_tile(dist[K, K], dist[K, K], dist[K, K])
+        # Phase 2: tiles in the same block row / column as the diagonal one
+        for jb, J in enumerate(blocks):
+            if jb != kb:
+                _fw_tile(dist[K, J], dist[K, K], dist[K, J])
+                _fw_tile(dist[J, K], dist[J, K], dist[K, K])
+        # Phase 3: all other tiles only read finished tiles
+        for ib, I in enumerate(blocks):
+            if ib == kb:
+                continue
+            A = dist[I, K]
+            for jb, J in enumerate(blocks):
+                if jb != kb:
+                    C = dist[I, J]
+                    np.minimum(C, (A[:, :, None] + dist[K, J][None, :, :]).min(axis=1), out=C)
+    return dist
+
+def _fw_tile(C, A, B):
+    """In-place C = min(C, A[:, k] + B[k, :]) for every k, in order (C may alias A or B)."""
+    for k in range(A.shape[1]):
+        np.minimum(C, A[:, k, None] + B[None, k, :], out=C)
+
+def reconstruct_path(pred, i, j):
+    """
+    Rebuild the shortest i -> j path from a predecessor matrix.
+    Returns:
+        List of node indices from i to j, or [] when j is unreachable.
+    """
+    if i == j:
+        return [i]
+    if pred[i][j] < 0:
+        return []
+    path = [j]
+    while j != i:
+        j = int(pred[i][j])
+        path.append(j)
+    path.reverse()
+    return path
+
+# Implementations selectable in the benchmark, "python" is the reference baseline
+FLOYD_WARSHALL_IMPLEMENTATIONS = {
+    "python": floyd_warshall,
+    "numpy": floyd_warshall_numpy,
+    "blocked": floyd_warshall_blocked,
+}
+
 # New function for visiting order
-def floyd_warshall_route(adj_matrix, start_idx, user_indices):
+def floyd_warshall_route(adj_matrix, start_idx, user_indices, dist=None, priority_indices=None):
     """
     Returns a visiting order using a greedy nearest neighbor approach with Floyd-Warshall distances.
+    
+    `dist` is the all-pairs matrix already computed for adj_matrix (e.g. by the
+    benchmark runner); without it it is computed here with the NumPy engine.
+    Nodes in `priority_indices` are visited before all others.
     """
-    n = len(adj_matrix)
-    dist = floyd_warshall(adj_matrix)
-    order = [start_idx]
-    unvisited = set(user_indices)
-    current = start_idx
-    while unvisited:
-        # Find nearest unvisited
-        next_node = min(unvisited, key=lambda x: dist[current][x])
-        order.append(next_node)
-        unvisited.remove(next_node)
-        current = next_node
-    return order 
\ No newline at end of file
+    if dist is None:
+        dist = floyd_warshall_numpy(adj_matrix)
+    return nearest_neighbor_order(dist, start_idx, user_indices, priority_indices)
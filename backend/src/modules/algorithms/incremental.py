@@ -0,0 +1,163 @@
+import heapq
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from modules.preprocess.csr_graph import CSRGraph
+
+def graph_add_node(graph: CSRGraph, out_row: np.ndarray, in_column: np.ndarray, k: int) -> CSRGraph:
+    """
+    The k-nearest graph with one more node (index n) appended.
+
+    The new node gets edges to its k nearest nodes by `out_row` (its distances
+    to every existing node). Existing nodes whose k nearest it joins get an
+    edge to it, keeping their current edges: each edge is a real road
+    distance, so the graph stays a valid (slightly denser) subgraph of the
+    road metric without the decremental work of dropping displaced edges.
+    Args:
+        out_row: Distances new node -> existing nodes (NaN/inf if unreachable)
+        in_column: Distances existing nodes -> new node
+    """
+    n = graph.n
+    out_row = np.where(np.isfinite(out_row), out_row, np.inf)
+    in_column = np.where(np.isfinite(in_column), in_column, np.inf)
+    nearest = np.argsort(out_row, kind="stable")[:k]
+    nearest = nearest[np.isfinite(out_row[nearest])]
+
+    # Farthest current neighbor per node, inf below k edges
+    farthest = np.full(n, -np.inf)
+    np.maximum.at(farthest, graph.sources(), graph.weights)
+    farthest[np.diff(graph.indptr) < k] = np.inf
+    joins = np.isfinite(in_column) & (in_column < farthest)
+
+    adj_list = graph.to_adj_list()
+    for u in np.flatnonzero(joins).tolist():
+        adj_list[u].append((n, float(in_column[u])))
+    adj_list[n] = list(zip(nearest.tolist(), out_row[nearest].tolist()))
+    return CSRGraph.from_adj_list(adj_list, n + 1)
+
+def graph_remove_node(graph: CSRGraph, node: int) -> CSRGraph:
+    """The graph without `node` and its edges; higher node indices shift down by one."""
+    keep = (graph.sources() != node) & (graph.indices != node)
+    sources = graph.sources()[keep]
+    targets = graph.indices[keep]
+    sources = sources - (sources > node)
+    targets = targets - (targets > node)
+    n = graph.n - 1
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return CSRGraph(indptr, targets.astype(np.int32), graph.weights[keep])
+
+def apsp_add_node(dist: np.ndarray, graph: CSRGraph) -> np.ndarray:
+    """
+    All-pairs distances after appending node n, in O(n²) instead of a full recomputation.
+
+    `dist` holds the distances of the first n nodes of `graph` (before the
+    node and its edges were added). With non-negative weights a shortest path
+    visits the new node x at most once, so
+        d(x, v) = min over edges x->a of w + dist[a, v]
+        d(u, x) = min over edges b->x of dist[u, b] + w
+        d(u, v) = min(dist[u, v], d(u, x) + d(x, v))
+    """
+    n = len(dist)
+    x = n
+    out_nodes, out_weights = graph.neighbors(x)
+    sources = graph.sources()
+    into = graph.indices == x
+    in_nodes, in_weights = sources[into], graph.weights[into]
+    to_x = np.full(n, np.inf)
+    from_x = np.full(n, np.inf)
+    if len(in_nodes):
+        to_x = (dist[:, in_nodes] + in_weights[None, :]).min(axis=1)
+    if len(out_nodes):
+        from_x = (out_weights[:, None] + dist[out_nodes, :]).min(axis=0)
+
+    result = np.empty((n + 1, n + 1))
+    np.minimum(dist, to_x[:, None] + from_x[None, :], out=result[:n, :n])
+    result[:n, x] = to_x
+    result[x, :n] = from_x
+    result[x, x] = 0.0
+    return result
+
+def apsp_remove_node(dist: np.ndarray, node: int, graph: CSRGraph) -> Tuple[np.ndarray, int]:
+    """
+    All-pairs distances after removing `node`, given `graph` without it.
+
+    A pair keeps its distance unless its shortest path went through the node
+    (or tied with one that did); finding them is O(n²). From each source the
+    affected targets are then re-settled by a Dijkstra that starts from the
+    still-valid distances of their in-neighbors and only visits affected
+    targets, so the work is proportional to the pairs that actually changed
+    rather than n full searches.
+    Returns:
+        (dist, repaired): the (n-1) x (n-1) distances and how many pairs were re-settled
+    """
+    through = dist[:, node][:, None] + dist[node, :][None, :]
+    with np.errstate(invalid="ignore"):
+        affected = np.isfinite(through) & (through <= dist * (1 + 1e-12) + 1e-9)
+    np.fill_diagonal(affected, False)
+    affected = np.delete(np.delete(affected, node, axis=0), node, axis=1)
+    result = np.delete(np.delete(dist, node, axis=0), node, axis=1)
+
+    # In-edges of every node: the reversed graph in CSR layout
+    order = np.argsort(graph.indices, kind="stable")
+    in_ptr = np.zeros(graph.n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph.indices, minlength=graph.n), out=in_ptr[1:])
+    in_ptr, in_src, in_w = in_ptr.tolist(), graph.sources()[order].tolist(), graph.weights[order].tolist()
+    indptr, indices, weights = graph.as_lists()
+
+    repaired = 0
+    for u in np.flatnonzero(affected.any(axis=1)).tolist():
+        targets = np.flatnonzero(affected[u])
+        repaired += len(targets)
+        row = result[u].tolist()
+        for v in targets.tolist():
+            row[v] = float("inf")
+        pending = set(targets.tolist())
+        heap = []
+        for v in pending:
+            best = min((row[in_src[e]] + in_w[e] for e in range(in_ptr[v], in_ptr[v + 1])), default=float("inf"))
+            if best < row[v]:
+                row[v] = best
+                heap.append((best, v))
+        heapq.heapify(heap)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > row[v] or v not in pending:
+                continue
+            pending.discard(v)
+            for e in range(indptr[v], indptr[v + 1]):
+                t = indices[e]
+                if t in pending and d + weights[e] < row[t]:
+                    row[t] = d + weights[e]
+                    heapq.heappush(heap, (row[t], t))
+        result[u] = row
+    return result, repaired
+
+def tour_insert(tour: List[int], dist: np.ndarray, node: int, priority: Iterable[int] = ()) -> List[int]:
+    """
+    Cheapest insertion of `node` into a closed tour (starting and ending at 0).
+
+    Priority nodes stay ahead of the others: a priority node is inserted
+    within the leading priority block, any other node after it.
+    """
+    def cost(a: int, b: int) -> float:
+        # Unreachable legs cost more than any real tour
+        return dist[a][b] if np.isfinite(dist[a][b]) else 1e15
+
+    priority = set(priority)
+    stops = tour[1:-1]
+    block = 0
+    while block < len(stops) and stops[block] in priority:
+        block += 1
+    # Positions i: insert between tour[i] and tour[i + 1]
+    positions = range(0, block + 1) if node in priority else range(block, len(tour) - 1)
+    best = min(positions, key=lambda i: cost(tour[i], node) + cost(node, tour[i + 1]) - cost(tour[i], tour[i + 1]))
+    return tour[:best + 1] + [node] + tour[best + 1:]
+
+def tour_remove(tour: List[int], node: int) -> List[int]:
+    """The closed tour without `node`, with higher node indices shifted down by one."""
+    return [i - (i > node) for i in tour if i != node]
+
+def tour_cost(tour: List[int], dist) -> float:
+    return float(sum(dist[a][b] for a, b in zip(tour, tour[1:])))
@@ -0,0 +1,90 @@
+from typing import List, Optional, Set
+
+import numpy as np
+
+from modules.preprocess.csr_graph import CSRGraph, as_csr
+from modules.algorithms.dijkstra_all_pairs import _dijkstra
+from modules.algorithms.dijkstra_parallel import dijkstra_all_pairs_parallel
+from modules.algorithms.bellman_ford_all_pairs import NegativeCycleError, _find_cycle
+from modules.algorithms.nearest_neighbor import nearest_neighbor_order
+
+def johnson_potentials(graph: CSRGraph) -> np.ndarray:
+    """
+    Node potentials h that make every reweighted edge w + h[u] - h[v] non-negative.
+
+    Bellman-Ford from a virtual node with a 0-weight edge to every node,
+    which is the same as starting with all distances at 0. Rounds stop at the
+    first one without a relaxation; graphs without negative edges need none.
+    Raises:
+        NegativeCycleError: if the graph contains a negative cycle
+    """
+    n = graph.n
+    h = np.zeros(n)
+    if n == 0 or graph.weights.min(initial=0.0) >= 0:
+        return h
+    sources, targets, weights = graph.sources().tolist(), graph.indices.tolist(), graph.weights.tolist()
+    edges = list(zip(sources, targets, weights))
+    dist = [0.0] * n
+    pred = [-1] * n
+    for _ in range(n):
+        changed = False
+        for u, v, w in edges:
+            if dist[u] + w < dist[v]:
+                dist[v] = dist[u] + w
+                pred[v] = u
+                changed = True
+        if not changed:
+            return np.array(dist)
+    # Still relaxing after n rounds (n + 1 nodes with the virtual one)
+    for u, v, w in edges:
+        if dist[u] + w < dist[v]:
+            pred[v] = u
+            raise NegativeCycleError(None, _find_cycle(pred, v, n))
+    return np.array(dist)
+
+def johnson_all_pairs(adj_list, workers: int = 1, min_nodes: int = 0) -> np.ndarray:
+    """
+    All-Pairs Shortest Path using Johnson's algorithm.
+
+    One Bellman-Ford pass computes potentials that remove negative edge
+    weights, then Dijkstra runs from every source on the reweighted graph:
+    O(V·E log V) instead of Floyd-Warshall's O(V³) or Bellman-Ford's O(V²·E),
+    while still allowing negative edges.
+    Args:
+        adj_list: CSRGraph or Dict[int, List[Tuple[int, float]]] adjacency list
+        workers: With more than one, the Dijkstras run on the shared-memory process pool
+        min_nodes: Below this many nodes the Dijkstras run serially
+    Returns:
+        dist: n x n numpy array of shortest path distances
+    Raises:
+        NegativeCycleError: if the graph contains a negative cycle
+    """
+    graph = as_csr(adj_list)
+    n = graph.n
+    h = johnson_potentials(graph)
+    # Reweighted edges are >= 0 up to rounding
+    reweighted = graph.with_weights(np.maximum(graph.weights + h[graph.sources()] - h[graph.indices], 0.0))
+    if workers > 1:
+        dist = dijkstra_all_pairs_parallel(reweighted, workers=workers, min_nodes=min_nodes)
+    else:
+        indptr, indices, weights = reweighted.as_lists()
+        dist = np.empty((n, n))
+        for source in range(n):
+            dist[source] = _dijkstra(indptr, indices, weights, source)
+    # d(u, v) = d'(u, v) - h[u] + h[v]
+    dist -= h[:, None]
+    dist += h[None, :]
+    return dist
+
+def johnson_route(adj_list, start_idx: int, user_indices: List[int], dist=None,
+                  priority_indices: Optional[Set[int]] = None) -> List[int]:
+    """
+    Returns a visiting order using a greedy nearest neighbor approach with Johnson's algorithm.
+
+    `dist` is an all-pairs table already computed for this graph (e.g. by the
+    benchmark runner); without it the all-pairs table is computed once here.
+    Nodes in `priority_indices` are visited before all others.
+    """
+    if dist is None:
+        dist = johnson_all_pairs(adj_list)
+    return nearest_neighbor_order(dist, start_idx, user_indices, priority_indices)
@@ -0,0 +1,27 @@
+from typing import Iterable, List, Optional, Set
+
+def nearest_neighbor_order(dist, start_idx: int, user_indices: Iterable[int], priority_indices: Optional[Set[int]] = None) -> List[int]:
+    """
+    Greedy nearest neighbor visiting order on top of an all-pairs distance table.
+    Args:
+        dist: All-pairs distances indexable as dist[u][v] (nested dicts, lists or numpy array)
+        start_idx: Node the route starts from
+        user_indices: Nodes to visit
+        priority_indices: Nodes that must be visited before any other one
+    Returns:
+        Visiting order starting at start_idx
+    """
+    order = [start_idx]
+    unvisited = set(user_indices)
+    pending_priority = set(priority_indices or ()) & unvisited
+    current = start_idx
+    while unvisited:
+        row = dist[current]
+        # Prefer priority nodes while any are unvisited
+        candidates = pending_priority or unvisited
+        next_node = min(candidates, key=lambda x: row[x])
+        order.append(next_node)
+        unvisited.remove(next_node)
+        pending_priority.discard(next_node)
+        current = next_node
+    return order
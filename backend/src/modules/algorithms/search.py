@@ -0,0 +1,223 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from modules.preprocess.csr_graph import CSRGraph, as_csr
+from modules.preprocess.spatial import haversine
+
+SEARCH_METHODS = ("targets", "bidirectional", "astar")
+
+# Defaults of the A* bound (ASTAR_MAX_SPEED / ASTAR_SNAP_SLACK in the app configuration)
+DEFAULT_MAX_SPEED = 1.1
+DEFAULT_SNAP_SLACK = 250.0
+
+INF = float("inf")
+
+def reverse_graph(graph: CSRGraph) -> CSRGraph:
+    """The graph with every edge reversed (in-edges of each node as its out-edges)."""
+    order = np.argsort(graph.indices, kind="stable")
+    indptr = np.zeros(graph.n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph.indices, minlength=graph.n), out=indptr[1:])
+    return CSRGraph(indptr, graph.sources()[order], graph.weights[order])
+
+class GraphSearch:
+    """
+    Shortest path queries between a few nodes of one graph, without all-pairs work.
+
+    The per-graph setup (CSR arrays as Python lists, the reversed graph for
+    bidirectional search, coordinates for A*) is done once; every query
+    then works on integer-indexed lists and stops as soon as its answer is
+    settled.
+    Args:
+        graph: CSRGraph or adjacency list with non-negative weights
+        coords: (latitude, longitude) of every node, for the A* heuristic
+        max_speed: Straight-line meters per unit of edge weight at most (m/s for durations)
+        snap_slack: Meters OSRM may move each point onto the road network. Edge
+            weights are measured between the snapped points, so the A* lower
+            bound is (haversine - 2 * snap_slack) / max_speed; it is only a true
+            lower bound while no point is snapped farther than this
+    """
+
+    def __init__(self, graph, coords: Optional[Sequence[Tuple[float, float]]] = None,
+                 max_speed: float = DEFAULT_MAX_SPEED, snap_slack: float = DEFAULT_SNAP_SLACK):
+        graph = as_csr(graph)
+        self.n = graph.n
+        self._indptr, self._indices, self._weights = graph.as_lists()
+        self._reverse: Optional[Tuple[List[int], List[int], List[float]]] = None
+        self._graph = graph
+        self._coords = np.asarray(coords, dtype=np.float64) if coords is not None else None
+        self.max_speed = max_speed
+        self.snap_slack = snap_slack
+
+    def to_targets(self, source: int, targets: Iterable[int]) -> Dict[int, float]:
+        """
+        Dijkstra from `source` that stops once every target is settled.
+        Returns:
+            Distance to each target (inf if unreachable)
+        """
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        pending = set(targets)
+        result = {t: INF for t in pending}
+        dist = [INF] * self.n
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        while heap and pending:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u in pending:
+                pending.discard(u)
+                result[u] = d
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return result
+
+    def bidirectional(self, source: int, target: int) -> float:
+        """
+        Bidirectional Dijkstra: alternate forward search from the source and
+        backward search (over the reversed graph) from the target, until the
+        smallest keys of the two queues sum to at least the best meeting path.
+        """
+        if source == target:
+            return 0.0
+        if self._reverse is None:
+            self._reverse = reverse_graph(self._graph).as_lists()
+        sides = [
+            ((self._indptr, self._indices, self._weights), [INF] * self.n, [(0.0, source)]),
+            (self._reverse, [INF] * self.n, [(0.0, target)]),
+        ]
+        sides[0][1][source] = 0.0
+        sides[1][1][target] = 0.0
+        best = INF
+        while sides[0][2] and sides[1][2]:
+            if sides[0][2][0][0] + sides[1][2][0][0] >= best:
+                break
+            # Expand the side with the smaller queue
+            side = 0 if len(sides[0][2]) <= len(sides[1][2]) else 1
+            (indptr, indices, weights), dist, heap = sides[side]
+            other = sides[1 - side][1]
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+                    if nd + other[v] < best:
+                        best = nd + other[v]
+        return best
+
+    def lower_bounds(self, source: int) -> np.ndarray:
+        """Straight-line lower bound of the distance from `source` to every node (zeros without coordinates)."""
+        if self._coords is None:
+            return np.zeros(self.n)
+        straight = haversine(self._coords[:, 0], self._coords[:, 1], *self._coords[source])
+        return np.maximum(straight - 2 * self.snap_slack, 0.0) / self.max_speed
+
+    def astar(self, source: int, target: int) -> float:
+        """
+        A* with lower_bounds(target) as heuristic.
+
+        The result is the exact shortest distance only while the bound is
+        admissible (see snap_slack and max_speed); a point snapped farther
+        than snap_slack can make it return a longer path. Nodes may be
+        re-expanded, so an admissible but inconsistent bound is fine. Without
+        coordinates this is Dijkstra stopping at the target.
+        """
+        h = self.lower_bounds(target).tolist()
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        dist = [INF] * self.n
+        dist[source] = 0.0
+        heap = [(h[source], 0.0, source)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == target:
+                return d
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                nd = d + weights[e]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd + h[v], nd, v))
+        return INF
+
+    def distances(self, source: int, targets: Iterable[int], method: str = "targets") -> Dict[int, float]:
+        """Distances from `source` to each target with one of SEARCH_METHODS."""
+        if method == "targets":
+            return self.to_targets(source, targets)
+        if method == "bidirectional":
+            return {t: self.bidirectional(source, t) for t in targets}
+        if method == "astar":
+            return {t: self.astar(source, t) for t in targets}
+        raise ValueError(f"Unknown search method: {method}")
+
+    def nearest(self, source: int, candidates: Iterable[int], method: str = "targets") -> Dict[int, float]:
+        """
+        Distances from `source` to enough candidates to know the nearest one.
+
+        The multi-target search settles them all in one pass. Point-to-point
+        methods search candidates in order of their straight-line lower bound
+        and stop once the bound reaches the best distance found, so with
+        coordinates only the few plausible candidates are searched. That cut-off
+        relies on the same admissible bound as astar: a candidate whose bound
+        overestimates its distance may be skipped even if it is the nearest.
+        """
+        if method == "targets" or self._coords is None:
+            return self.distances(source, candidates, method)
+        candidates = list(candidates)
+        bounds = self.lower_bounds(source)[candidates]
+        result: Dict[int, float] = {}
+        best = INF
+        for i in np.argsort(bounds, kind="stable").tolist():
+            if bounds[i] >= best:
+                break
+            d = self.distances(source, [candidates[i]], method)[candidates[i]]
+            result[candidates[i]] = d
+            best = min(best, d)
+        return result
+
+def search_route(graph, start_idx: int, user_indices: Iterable[int], priority_indices: Optional[Set[int]] = None,
+                 method: str = "targets", coords: Optional[Sequence[Tuple[float, float]]] = None,
+                 max_speed: float = DEFAULT_MAX_SPEED, snap_slack: float = DEFAULT_SNAP_SLACK
+                 ) -> Tuple[List[int], Dict[int, Dict[int, float]]]:
+    """
+    Greedy nearest neighbor visiting order, searching only what each step needs.
+
+    Same order as nearest_neighbor_order over an all-pairs table (up to ties),
+    but each step only asks for the distances from the current node to the
+    remaining candidates (the unvisited priority nodes first), so the
+    searches shrink as the route fills up.
+    Args:
+        method: One of SEARCH_METHODS
+        coords: (latitude, longitude) per node, used by "astar"
+        max_speed, snap_slack: A* lower bound settings, see GraphSearch
+    Returns:
+        (order, rows): the visiting order starting at start_idx, and the distances
+        that were searched as Dict[from, Dict[to, distance]]
+    """
+    search = GraphSearch(graph, coords, max_speed, snap_slack)
+    order = [start_idx]
+    unvisited = set(user_indices)
+    pending_priority = set(priority_indices or ()) & unvisited
+    rows: Dict[int, Dict[int, float]] = {}
+    current = start_idx
+    while unvisited:
+        candidates = pending_priority or unvisited
+        row = search.nearest(current, candidates, method)
+        rows[current] = row
+        # Candidates left out of the row are no nearer than the best one in it
+        next_node = min(candidates, key=lambda x: row.get(x, INF))
+        order.append(next_node)
+        unvisited.remove(next_node)
+        pending_priority.discard(next_node)
+        current = next_node
+    return order, rows
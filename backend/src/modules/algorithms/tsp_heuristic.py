@@ -0,0 +1,243 @@
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from modules.preprocess.csr_graph import CSRGraph
+
+CONSTRUCTIONS = ("nearestNeighbor", "greedyEdge")
+
+def neighbor_lists(dist: np.ndarray, k: int = 8, graph: Optional[CSRGraph] = None) -> np.ndarray:
+    """
+    n x k candidate neighbors per node, padded with -1.
+
+    The sparse k-nearest graph's rows are used when given (they are already
+    sorted by distance); otherwise the k nearest are taken from dist.
+    """
+    n = len(dist)
+    if graph is not None:
+        k = int(np.diff(graph.indptr).max(initial=0))
+        lists = np.full((n, max(k, 1)), -1, dtype=np.int64)
+        for u in range(n):
+            row = graph.neighbors(u)[0]
+            lists[u, :len(row)] = row
+        return lists
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.full((n, 1), -1, dtype=np.int64)
+    masked = dist.copy()
+    np.fill_diagonal(masked, np.inf)
+    nearest = np.argpartition(masked, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(masked, nearest, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(nearest, order, axis=1).astype(np.int64)
+
+def _nearest_neighbor_tour(dist: np.ndarray, priority: np.ndarray) -> List[int]:
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    pending = priority.copy()
+    tour = [0]
+    current = 0
+    for _ in range(n - 1):
+        # Priority nodes are exhausted before any other one
+        allowed = ~visited & pending if pending.any() else ~visited
+        row = np.where(allowed, dist[current], np.inf)
+        current = int(np.argmin(row))
+        if not allowed[current]:
+            current = int(np.flatnonzero(allowed)[0])
+        visited[current] = True
+        pending[current] = False
+        tour.append(current)
+    return tour + [0]
+
+def _greedy_edge_tour(dist: np.ndarray) -> List[int]:
+    """Cheapest arcs first, skipping ones that would branch or close a subtour."""
+    n = len(dist)
+    if n <= 2:
+        return list(range(n)) + [0]
+    successor = np.full(n, -1)
+    has_pred = np.zeros(n, dtype=bool)
+    # Path fragments as union-find over their nodes
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    costs = dist.astype(np.float64, copy=True)
+    np.fill_diagonal(costs, np.inf)
+    arcs = 0
+    for flat in np.argsort(costs, axis=None, kind="stable"):
+        u, v = divmod(int(flat), n)
+        if successor[u] != -1 or has_pred[v] or find(u) == find(v):
+            continue
+        successor[u] = v
+        has_pred[v] = True
+        parent[find(u)] = find(v)
+        arcs += 1
+        if arcs == n - 1:
+            break
+    # One Hamiltonian path remains: close it and rotate to start at the depot
+    start = int(np.flatnonzero(~has_pred)[0])
+    path = [start]
+    while successor[path[-1]] != -1:
+        path.append(int(successor[path[-1]]))
+    depot = path.index(0)
+    cycle = path[depot:] + path[:depot]
+    return cycle + [0]
+
+class _Tour:
+    """Closed tour with positions and prefix sums of forward/backward arc costs."""
+
+    def __init__(self, tour: List[int], dist: np.ndarray, rank: np.ndarray):
+        self.dist = dist
+        self.rank_of_node = rank
+        self.set(np.array(tour, dtype=np.int64))
+
+    def set(self, tour: np.ndarray) -> None:
+        self.tour = tour
+        self.pos = np.empty(len(tour) - 1, dtype=np.int64)
+        self.pos[tour[:-1]] = np.arange(len(tour) - 1)
+        forward = self.dist[tour[:-1], tour[1:]]
+        backward = self.dist[tour[1:], tour[:-1]]
+        self.forward = np.concatenate(([0.0], np.cumsum(forward)))
+        self.backward = np.concatenate(([0.0], np.cumsum(backward)))
+        # Rank per position: start depot 0, priority 1, others 2, end depot 3
+        self.rank = self.rank_of_node[tour]
+        self.rank[0], self.rank[-1] = 0, 3
+
+    @property
+    def cost(self) -> float:
+        return float(self.forward[-1])
+
+def _candidate_positions(t: _Tour, nodes: np.ndarray, neighbors: np.ndarray, offset: int) -> np.ndarray:
+    """
+    Tour positions (plus offset) of the neighbors of each node, -1 for padding.
+
+    A move's arc into the depot closes the tour, so the depot is at the last position.
+    """
+    cand = neighbors[nodes]
+    pos = np.where(cand > 0, t.pos[np.where(cand >= 0, cand, 0)], len(t.tour) - 1)
+    return np.where(cand >= 0, pos + offset, -1)
+
+def _best_two_opt(t: _Tour, neighbors: np.ndarray):
+    """
+    Best move reversing tour[i+1..j], creating arcs tour[i] -> tour[j] and tour[i+1] -> tour[j+1].
+
+    Candidates are the moves where either new arc goes to a neighbor of its tail.
+    """
+    tour, dist = t.tour, t.dist
+    m = len(tour) - 1
+    i = np.arange(m - 1)[:, None]
+    j = np.concatenate((
+        _candidate_positions(t, tour[:m - 1], neighbors, 0),
+        _candidate_positions(t, tour[1:m], neighbors, -1),
+    ), axis=1)
+    valid = (j >= i + 2) & (j <= m - 1)
+    j = np.where(valid, j, i + 2).clip(max=m - 1)
+    a, b, c, d = tour[i], tour[i + 1], tour[j], tour[j + 1]
+    # Reversing the segment turns its inner arcs around (matters for asymmetric costs)
+    inner_forward = t.forward[j] - t.forward[i + 1]
+    inner_backward = t.backward[j] - t.backward[i + 1]
+    delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d] + inner_backward - inner_forward
+    valid &= t.rank[i + 1] == t.rank[j]
+    delta = np.where(valid & np.isfinite(delta), delta, np.inf)
+    flat = int(np.argmin(delta))
+    return delta.flat[flat], int(i.flat[flat // delta.shape[1]]), int(j.flat[flat])
+
+def _best_or_opt(t: _Tour, neighbors: np.ndarray, length: int):
+    """Best move of a segment of `length` nodes to right after a neighbor of its first node."""
+    tour, dist = t.tour, t.dist
+    m = len(tour) - 1
+    if m - length < 2:
+        return np.inf, 0, 0
+    s = np.arange(1, m - length + 1)[:, None]
+    e = s + length - 1
+    first, last = tour[s], tour[e]
+    removal = dist[tour[s - 1], first] + dist[last, tour[e + 1]] - dist[tour[s - 1], tour[e + 1]]
+    x_node = neighbors[first[:, 0]]
+    p = np.where(x_node >= 0, t.pos[np.where(x_node >= 0, x_node, 0)], -1)
+    valid = (p >= 0) & ((p < s - 1) | (p > e))
+    p = np.where(valid, p, 0)
+    x, y = tour[p], tour[p + 1]
+    insertion = dist[x, first] + dist[last, y] - dist[x, y]
+    delta = insertion - removal
+    valid &= (t.rank[s] == t.rank[e]) & (t.rank[p] <= t.rank[s]) & (t.rank[s] <= t.rank[p + 1])
+    delta = np.where(valid & np.isfinite(delta), delta, np.inf)
+    flat = int(np.argmin(delta))
+    return delta.flat[flat], int(s.flat[flat // delta.shape[1]]), int(p.flat[flat])
+
+def solve_tsp_heuristic(distance_matrix, priority_indices: Optional[Iterable[int]] = None,
+                        graph: Optional[CSRGraph] = None, construction: str = "nearestNeighbor",
+                        neighbors: int = 8, max_iterations: int = 10_000, time_limit: float = 2.0,
+                        initial_tour: Optional[List[int]] = None) -> List[int]:
+    """
+    Closed tour from node 0 through every node with construction plus local search.
+
+    A nearest-neighbor or greedy-edge tour is improved by vectorized 2-opt and
+    Or-opt (segments of 1-3 nodes) moves, applying the best improving move of
+    each scan. Candidate moves only connect a node to one of its `neighbors`
+    nearest nodes (or its neighbors in `graph`), so a scan is O(n·k) NumPy
+    work instead of O(n²).
+    Args:
+        distance_matrix: N x N shortest path distances (e.g. the APSP table)
+        priority_indices: Nodes that must be visited before any other one
+        graph: Sparse k-nearest graph whose rows are the candidate neighbors
+        construction: One of CONSTRUCTIONS (greedyEdge is ignored with priorities)
+        max_iterations: Improving moves applied at most
+        time_limit: Seconds of local search at most
+        initial_tour: Closed tour to improve instead of constructing one
+            (priority nodes must already come first), e.g. a repaired previous tour
+    Returns:
+        Visiting order starting and ending at 0
+    """
+    deadline = time.perf_counter() + time_limit
+    dist = np.array(distance_matrix, dtype=np.float64)
+    n = len(dist)
+    if n <= 2:
+        return list(range(n)) + [0]
+    # Unreachable pairs cost more than any real tour
+    finite = np.isfinite(dist)
+    dist[~finite] = (np.abs(dist[finite]).sum() + 1) if finite.any() else 1
+
+    priority = np.zeros(n, dtype=bool)
+    priority[[p for p in (priority_indices or ()) if 0 < p < n]] = True
+    if n == 3:
+        # No local search moves exist: take the cheaper order the priorities allow
+        orders = [o for o in ([0, 1, 2, 0], [0, 2, 1, 0]) if priority[o[1]] or not priority[o[2]]]
+        return min(orders, key=lambda o: dist[o[:-1], o[1:]].sum())
+    if initial_tour is not None:
+        tour = list(initial_tour)
+    elif construction == "greedyEdge" and not priority.any():
+        tour = _greedy_edge_tour(dist)
+    else:
+        tour = _nearest_neighbor_tour(dist, priority)
+
+    rank = np.where(priority, 1, 2)
+    t = _Tour(tour, dist, rank)
+    candidates = neighbor_lists(dist, neighbors, graph)
+    for _ in range(max_iterations):
+        if time.perf_counter() > deadline:
+            break
+        best = min(
+            (_best_two_opt(t, candidates) + ("2opt",),
+             *(_best_or_opt(t, candidates, length) + ("oropt", length) for length in (1, 2, 3))),
+            key=lambda move: move[0],
+        )
+        if not best[0] < -1e-9:
+            break
+        tour = t.tour
+        if best[3] == "2opt":
+            _, i, j, _ = best
+            tour = np.concatenate((tour[:i + 1], tour[i + 1:j + 1][::-1], tour[j + 1:]))
+        else:
+            _, s, p, _, length = best
+            segment = tour[s:s + length]
+            rest = np.concatenate((tour[:s], tour[s + length:]))
+            # p indexes the tour before removal
+            at = p + 1 if p < s else p + 1 - length
+            tour = np.concatenate((rest[:at], segment, rest[at:]))
+        t.set(tour)
+    return t.tour.tolist()
@@ -1,25 +1,179 @@
+import hashlib
+import threading
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
-from typing import List
+from typing import Iterable, List, Optional, Sequence, Set, Union
+import numpy as np
+from modules.preprocess.csr_graph import CSRGraph
+from modules.preprocess.osrm_cache import LRUCache
+from modules.algorithms.floyd_warshall import floyd_warshall_numpy
+
+FIRST_SOLUTION_STRATEGIES = tuple(routing_enums_pb2.FirstSolutionStrategy.Value.keys())
+METAHEURISTICS = tuple(routing_enums_pb2.LocalSearchMetaheuristic.Value.keys())
+
+# Solved tours by problem hash, and the last tour (as node keys) per warm-start key.
+# Process-local: with COMPUTE_EXECUTOR=process every worker keeps its own.
+_solutions = LRUCache(max_entries=1024, ttl=7 * 86400)
+_solutions_lock = threading.Lock()
+
+def _cache_get(key: str):
+    with _solutions_lock:
+        return _solutions.get_many([key]).get(key)
+
+def _cache_set(items) -> None:
+    with _solutions_lock:
+        _solutions.set_many(items)
+
+def tsp_cache_stats():
+    with _solutions_lock:
+        return _solutions.stats()
+
+def integer_costs(distance_matrix) -> np.ndarray:
+    """
+    Integer cost matrix for OR-Tools: distances rounded to whole units (meters).
+
+    Unreachable pairs (inf/nan) get a cost larger than any real tour instead of overflowing.
+    """
+    costs = np.array(distance_matrix, dtype=np.float64)
+    finite = np.isfinite(costs)
+    big = (np.abs(costs[finite]).sum() + 1) if finite.any() else 1
+    costs[~finite] = big
+    return np.rint(costs).astype(np.int64)
+
+def _problem_key(costs: np.ndarray, priority: Sequence[int], node_keys: Optional[Sequence[str]],
+                 first_solution: str, metaheuristic: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(costs).tobytes())
+    digest.update(repr((costs.shape, list(priority), list(node_keys or ()), first_solution, metaheuristic)).encode())
+    return f"tsp:{digest.hexdigest()}"
+
+def _initial_route(previous: List[str], node_keys: Sequence[str], costs: np.ndarray, priority: Sequence[int]) -> List[int]:
+    """
+    Previous tour adapted to the current nodes: removed nodes are dropped and
+    new ones inserted where they add the least cost. Depot (node 0) excluded.
+    """
+    index = {key: i for i, key in enumerate(node_keys)}
+    route = [index[key] for key in previous if key in index and index[key] != 0]
+    seen = set(route)
+    for node in range(1, len(node_keys)):
+        if node in seen:
+            continue
+        tour = [0] + route + [0]
+        added = [costs[a, node] + costs[node, b] - costs[a, b] for a, b in zip(tour, tour[1:])]
+        route.insert(int(np.argmin(added)), node)
+    # Priority nodes first so the start satisfies the count dimension
+    first = set(priority)
+    return [i for i in route if i in first] + [i for i in route if i not in first]
+
+def _initial_routes(depots: Sequence[int], costs: np.ndarray, capacity: Optional[int],
+                    priority: Set[int]) -> Optional[List[List[int]]]:
+    """
+    Cheapest insertion of every non-depot node into one route per depot (depots
+    excluded), within capacity. Priority nodes are inserted first and the
+    others only after each route's priority block. None if capacity runs out.
+    """
+    depot_set = set(depots)
+    nodes = sorted(priority) + [i for i in range(len(costs)) if i not in depot_set and i not in priority]
+    routes: List[List[int]] = [[] for _ in depots]
+    blocks = [0] * len(depots)
+    for node in nodes:
+        best = None
+        for v, depot in enumerate(depots):
+            if capacity is not None and len(routes[v]) >= capacity:
+                continue
+            tour = np.array([depot] + routes[v] + [depot])
+            added = costs[tour[:-1], node] + costs[node, tour[1:]] - costs[tour[:-1], tour[1:]]
+            start, stop = (0, blocks[v] + 1) if node in priority else (blocks[v], len(tour) - 1)
+            i = start + int(np.argmin(added[start:stop]))
+            if best is None or added[i] < best[0]:
+                best = (added[i], v, i)
+        if best is None:
+            return None
+        _, v, i = best
+        routes[v].insert(i, node)
+        blocks[v] += node in priority
+    return routes
+
+def _search_parameters(time_limit: float, first_solution: str, metaheuristic: str):
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = getattr(routing_enums_pb2.FirstSolutionStrategy, first_solution)
+    search_parameters.local_search_metaheuristic = getattr(routing_enums_pb2.LocalSearchMetaheuristic, metaheuristic)
+    search_parameters.time_limit.FromMilliseconds(max(1, int(time_limit * 1000)))
+    return search_parameters
+
+def solve_tsp(distance_matrix: Union[List[List[float]], np.ndarray, CSRGraph],
+              priority_indices: Optional[Iterable[int]] = None,
+              time_limit: float = 10.0,
+              first_solution: str = "PATH_CHEAPEST_ARC",
+              metaheuristic: str = "AUTOMATIC",
+              node_keys: Optional[Sequence[str]] = None,
+              warm_start_key: Optional[str] = None,
+              cache: bool = True) -> List[int]:
+    """
+    Closed tour from node 0 through every node, minimizing the total distance.
+
+    Arc costs are registered as an integer matrix, so OR-Tools never calls
+    back into Python during the search. With `cache` an identical problem
+    (same costs, priorities, node keys and strategies) is answered from
+    memory. With `node_keys` and `warm_start_key` (e.g. the doctor id) the
+    search starts from the last tour solved under that key, adapted to the
+    current nodes, instead of from scratch.
+    Args:
+        distance_matrix: N x N costs (inf for unreachable pairs) or a CSRGraph
+        priority_indices: Nodes that must be visited before any other one
+        time_limit: Search budget in seconds
+        first_solution: One of FIRST_SOLUTION_STRATEGIES
+        metaheuristic: One of METAHEURISTICS (GUIDED_LOCAL_SEARCH and others
+            keep improving until the time limit; AUTOMATIC stops at a local optimum)
+        node_keys: Stable id of every node (node 0 is the depot)
+        warm_start_key: Key under which the solution is kept for warm starts
+        cache: Use and update the solution cache
+    Returns:
+        Visiting order starting and ending at 0 (empty if no solution was found)
+    """
+    if isinstance(distance_matrix, CSRGraph):
+        # Travel between non-adjacent nodes follows the shortest path in the graph
+        distance_matrix = floyd_warshall_numpy(distance_matrix)
+    costs = integer_costs(distance_matrix)
+    n = len(costs)
+    priority = sorted({p for p in (priority_indices or ()) if 0 < p < n})
+    if node_keys is not None and len(node_keys) != n:
+        raise ValueError(f"Expected {n} node keys, got {len(node_keys)}")
+
+    key = _problem_key(costs, priority, node_keys, first_solution, metaheuristic)
+    if cache:
+        cached = _cache_get(key)
+        if cached is not None:
+            return list(cached)
 
-def solve_tsp(distance_matrix: List[List[float]]) -> List[int]:
-    n = len(distance_matrix)
     manager = pywrapcp.RoutingIndexManager(n, 1, 0)
     routing = pywrapcp.RoutingModel(manager)
 
-    def distance_callback(from_index, to_index):
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return int(distance_matrix[from_node][to_node])
-
-    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    transit_callback_index = routing.RegisterTransitMatrix(costs.tolist())
     routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
-    search_parameters.time_limit.seconds = 10
+    if priority:
+        # Count dimension: the cumul at a node is its position in the tour, so
+        # capping it for priority nodes puts them all among the first stops
+        count_callback_index = routing.RegisterUnaryTransitVector([1] * n)
+        routing.AddDimension(count_callback_index, 0, n, True, "Count")
+        count_dimension = routing.GetDimensionOrDie("Count")
+        for node in priority:
+            count_dimension.CumulVar(manager.NodeToIndex(node)).SetMax(len(priority))
 
-    solution = routing.SolveWithParameters(search_parameters)
+    search_parameters = _search_parameters(time_limit, first_solution, metaheuristic)
+
+    solution = None
+    previous = _cache_get(f"tsp-warm:{warm_start_key}") if cache and warm_start_key and node_keys else None
+    # Priority searches also start from a built route: PATH_CHEAPEST_ARC can
+    # dead-end on the count dimension and then finds no solution at all
+    if previous or priority:
+        routing.CloseModelWithParameters(search_parameters)
+        keys = node_keys or [str(i) for i in range(n)]
+        initial = routing.ReadAssignmentFromRoutes([_initial_route(previous or [], keys, costs, priority)], True)
+        if initial is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+    if solution is None:
+        solution = routing.SolveWithParameters(search_parameters)
     if not solution:
         return []
 
@@ -29,4 +183,83 @@ def solve_tsp(distance_matrix: List[List[float]]) -> List[int]:
         route.append(manager.IndexToNode(index))
         index = solution.Value(routing.NextVar(index))
     route.append(manager.IndexToNode(index))
-    return route 
\ No newline at end of file
+
+    if cache:
+        items = {key: route}
+        if warm_start_key and node_keys:
+            items[f"tsp-warm:{warm_start_key}"] = [node_keys[i] for i in route]
+        _cache_set(items)
+    return route
+
+def solve_vrp(distance_matrix: Union[List[List[float]], np.ndarray],
+              depots: Sequence[int],
+              capacity: Optional[int] = None,
+              priority_indices: Optional[Iterable[int]] = None,
+              time_limit: float = 10.0,
+              first_solution: str = "PATH_CHEAPEST_ARC",
+              metaheuristic: str = "AUTOMATIC") -> List[List[int]]:
+    """
+    Closed routes from several depots (one vehicle each) that together visit every other node once.
+
+    The multi-depot version of solve_tsp: one RoutingIndexManager with a
+    vehicle starting and ending at each depot, so assigning nodes to depots
+    and ordering them are optimized together over the same integer cost matrix.
+    Args:
+        distance_matrix: N x N costs (inf for unreachable pairs)
+        depots: Depot node of every vehicle
+        capacity: Non-depot nodes per vehicle at most (None = unbounded)
+        priority_indices: Nodes visited before any other node of their route
+        time_limit: Search budget in seconds
+    Returns:
+        One route per depot, in `depots` order, starting and ending at its depot
+        (empty list if no solution was found)
+    """
+    costs = integer_costs(distance_matrix)
+    n = len(costs)
+    depot_set = set(depots)
+    priority = {p for p in (priority_indices or ()) if 0 <= p < n and p not in depot_set}
+    vehicles = len(depots)
+    manager = pywrapcp.RoutingIndexManager(n, vehicles, list(depots), list(depots))
+    routing = pywrapcp.RoutingModel(manager)
+
+    transit_callback_index = routing.RegisterTransitMatrix(costs.tolist())
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    if capacity is not None:
+        demand = [0 if node in depot_set else 1 for node in range(n)]
+        demand_callback_index = routing.RegisterUnaryTransitVector(demand)
+        routing.AddDimensionWithVehicleCapacity(demand_callback_index, 0, [capacity] * vehicles, True, "Load")
+
+    if priority:
+        # The cumul at a node counts the non-priority nodes visited before it on
+        # its route; zero at priority nodes puts them first on every route
+        deferred = [0 if node in depot_set or node in priority else 1 for node in range(n)]
+        deferred_callback_index = routing.RegisterUnaryTransitVector(deferred)
+        routing.AddDimension(deferred_callback_index, 0, n, True, "Deferred")
+        deferred_dimension = routing.GetDimensionOrDie("Deferred")
+        for node in priority:
+            deferred_dimension.CumulVar(manager.NodeToIndex(node)).SetMax(0)
+
+    search_parameters = _search_parameters(time_limit, first_solution, metaheuristic)
+    solution = None
+    if priority:
+        # Same as solve_tsp: start priority searches from a feasible insertion
+        routing.CloseModelWithParameters(search_parameters)
+        initial_routes = _initial_routes(depots, costs, capacity, priority)
+        initial = routing.ReadAssignmentFromRoutes(initial_routes, True) if initial_routes else None
+        if initial is not None:
+            solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+    if solution is None:
+        solution = routing.SolveWithParameters(search_parameters)
+    if not solution:
+        return []
+    routes = []
+    for vehicle in range(vehicles):
+        index = routing.Start(vehicle)
+        route = []
+        while not routing.IsEnd(index):
+            route.append(manager.IndexToNode(index))
+            index = solution.Value(routing.NextVar(index))
+        route.append(manager.IndexToNode(index))
+        routes.append(route)
+    return routes
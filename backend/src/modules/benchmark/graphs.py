@@ -0,0 +1,85 @@
+import json
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from modules.preprocess.csr_graph import CSRGraph
+from modules.preprocess.osrm_client import OSRMClient
+
+# Road distance / straight-line distance, typical for urban networks
+DETOUR_FACTOR = 1.3
+
+def k_for(n: int, k: Optional[int] = None, density: Optional[float] = None) -> int:
+    """Neighbors per node from an explicit k or a density (fraction of the other nodes)."""
+    if density is not None:
+        return max(1, round(density * (n - 1)))
+    return k if k is not None else 4
+
+def random_geometric_distances(n: int, seed: int = 0, extent: float = 20000.0, asymmetry: float = 0.1) -> np.ndarray:
+    """
+    Road-like N x N distance matrix between random points.
+
+    Points are uniform in an `extent` x `extent` meter square; distances are
+    Euclidean times DETOUR_FACTOR with up to `asymmetry` relative noise per
+    direction, since one-way streets make real tables asymmetric.
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0.0, extent, size=(n, 2))
+    euclidean = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1))
+    noise = 1.0 + rng.uniform(0.0, asymmetry, size=(n, n))
+    distances = euclidean * DETOUR_FACTOR * noise
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+def graph_from_distances(distances, k: int) -> Tuple[np.ndarray, CSRGraph]:
+    """The (dense adjacency matrix, CSR graph) pair the benchmark runs on, as built by build_graph."""
+    graph = CSRGraph.k_nearest(distances, k)
+    return graph.to_dense(), graph
+
+def random_geometric_graph(n: int, k: Optional[int] = None, density: Optional[float] = None, seed: int = 0) -> Tuple[np.ndarray, CSRGraph]:
+    """k-nearest random geometric graph with n nodes."""
+    return graph_from_distances(random_geometric_distances(n, seed), k_for(n, k, density))
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    """Read a table recorded by `record_fixture`."""
+    with open(path) as f:
+        return json.load(f)
+
+def fixture_distances(fixture: Dict[str, Any], n: int) -> np.ndarray:
+    """Distance matrix between the first n waypoints of a recorded fixture (NaN if unreachable)."""
+    size = len(fixture['waypoints'])
+    if n > size:
+        raise ValueError(f"Fixture has {size} waypoints, {n} requested")
+    return np.array(fixture['distances'], dtype=np.float64)[:n, :n]
+
+def fixture_graph(fixture: Dict[str, Any], n: int, k: Optional[int] = None, density: Optional[float] = None) -> Tuple[np.ndarray, CSRGraph]:
+    """Graph over the first n waypoints of a recorded fixture."""
+    return graph_from_distances(fixture_distances(fixture, n), k_for(n, k, density))
+
+def random_waypoints(n: int, latitude: float, longitude: float, radius: float, seed: int = 0) -> List[Dict[str, float]]:
+    """Uniform random coordinates within `radius` meters of a center point."""
+    rng = np.random.default_rng(seed)
+    r = radius * np.sqrt(rng.uniform(0.0, 1.0, n))
+    theta = rng.uniform(0.0, 2 * math.pi, n)
+    dlat = r * np.cos(theta) / 111320.0
+    dlon = r * np.sin(theta) / (111320.0 * math.cos(math.radians(latitude)))
+    return [{"latitude": latitude + a, "longitude": longitude + b} for a, b in zip(dlat.tolist(), dlon.tolist())]
+
+async def record_fixture(waypoints: List[Dict[str, float]], osrm_client: OSRMClient, path: str) -> Dict[str, Any]:
+    """
+    Fetch the OSRM distance/duration table for waypoints and save it as a JSON fixture.
+
+    Fixtures keep real road-network structure available to the benchmark
+    suite without MongoDB or a running OSRM.
+    """
+    table = await osrm_client.get_table(waypoints)
+    fixture = {
+        'recordedAt': datetime.now(timezone.utc).isoformat(),
+        'osrm': osrm_client.base_url,
+        'waypoints': waypoints,
+        'distances': table['distances'],
+        'durations': table['durations'],
+    }
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+    return fixture
@@ -0,0 +1,154 @@
+import gc
+import math
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The GC switch and tracemalloc are process-wide while measurements run on
+# several compute threads: timed regions share one GC pause (the last one out
+# restores the GC) and memory runs take turns.
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = True
+_memory_lock = threading.Lock()
+
+class HarnessConfig:
+    """
+    Settings for timing one callable.
+
+    Args:
+        warmup: Untimed runs before sampling (JIT-free Python still warms caches/allocators)
+        min_repeats: Timed runs always taken
+        max_repeats: Upper bound on timed runs
+        target_rel_ci: Stop once the 95% confidence half-width of the mean is
+            below this fraction of the median (0 disables adaptive stopping)
+        time_budget: Seconds after which no new run starts, even below min_repeats
+            (at least one timed run is always taken)
+        measure_memory: Record the tracemalloc peak of one extra, untimed run.
+            Memory runs are serialized, but tracemalloc sees every thread, so
+            allocations of concurrent jobs during the run are counted too
+        disable_gc: Keep the cyclic GC off inside timed regions. The GC is
+            process-global: it stays off while any thread is in a timed region,
+            for other work in the process as well
+    """
+    def __init__(self, warmup: int = 1, min_repeats: int = 3, max_repeats: int = 20,
+                 target_rel_ci: float = 0.05, time_budget: Optional[float] = None,
+                 measure_memory: bool = False, disable_gc: bool = True):
+        self.warmup = warmup
+        self.min_repeats = max(1, min_repeats)
+        self.max_repeats = max(self.min_repeats, max_repeats)
+        self.target_rel_ci = target_rel_ci
+        self.time_budget = time_budget
+        self.measure_memory = measure_memory
+        self.disable_gc = disable_gc
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    """Linear-interpolated percentile of already sorted samples."""
+    position = (len(sorted_samples) - 1) * q
+    low = math.floor(position)
+    high = math.ceil(position)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (position - low)
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Median, p95, mean, stddev and 95% CI half-width of timing samples (seconds)."""
+    ordered = sorted(samples)
+    stddev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    return {
+        'runs': len(samples),
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(samples),
+        'p95': _percentile(ordered, 0.95),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'stddev': stddev,
+        'ci95': 1.96 * stddev / math.sqrt(len(samples)),
+    }
+
+@contextmanager
+def _gc_paused():
+    """Cyclic GC off until every concurrent pause has ended, then back to its state before the first."""
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+def _timed_call(fn: Callable[[], Any], disable_gc: bool) -> Tuple[float, Any]:
+    gc.collect()
+    if not disable_gc:
+        start = time.perf_counter()
+        result = fn()
+        return time.perf_counter() - start, result
+    with _gc_paused():
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    return elapsed, result
+
+def _peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak bytes traced above the starting point while fn() runs."""
+    with _memory_lock:
+        # Someone else (e.g. a profiler) may already be tracing: leave it running
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            fn()
+            return tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+def measure(fn: Callable[[], Any], config: Optional[HarnessConfig] = None) -> Tuple[Dict[str, Any], Any]:
+    """
+    Time fn() with warm-up and adaptive repetition.
+    Returns:
+        (stats, result): the `summarize` statistics (plus `peakMemory` in bytes
+        when enabled) and the return value of the last timed run
+    """
+    config = config or HarnessConfig()
+    started = time.perf_counter()
+
+    def over_budget() -> bool:
+        return config.time_budget is not None and time.perf_counter() - started >= config.time_budget
+
+    for _ in range(config.warmup):
+        if over_budget():
+            break
+        fn()
+
+    samples: List[float] = []
+    result = None
+    while True:
+        elapsed, result = _timed_call(fn, config.disable_gc)
+        samples.append(elapsed)
+        if len(samples) >= config.max_repeats or over_budget():
+            break
+        if len(samples) >= config.min_repeats:
+            if config.target_rel_ci <= 0:
+                break
+            stats = summarize(samples)
+            if stats['ci95'] <= config.target_rel_ci * stats['median']:
+                break
+
+    stats = summarize(samples)
+    stats['converged'] = stats['ci95'] <= config.target_rel_ci * stats['median']
+
+    if config.measure_memory:
+        # Separate run: tracemalloc slows allocation-heavy code down considerably
+        stats['peakMemory'] = _peak_memory(fn)
+    return stats, result
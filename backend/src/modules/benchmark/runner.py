@@ -1,33 +1,119 @@
-import time
-from modules.algorithms.floyd_warshall import floyd_warshall
+from typing import Callable, Dict, List, Optional
+from modules.benchmark.harness import HarnessConfig, measure
+from modules.algorithms.floyd_warshall import FLOYD_WARSHALL_IMPLEMENTATIONS
 from modules.algorithms.dijkstra_all_pairs import dijkstra_all_pairs
-from modules.algorithms.bellman_ford_all_pairs import bellman_ford_all_pairs
+from modules.algorithms.dijkstra_parallel import dijkstra_all_pairs_parallel
+from modules.algorithms.bellman_ford_all_pairs import bellman_ford_all_pairs, spfa_all_pairs
+from modules.algorithms.johnson import johnson_all_pairs
+from modules.algorithms.search import SEARCH_METHODS, DEFAULT_MAX_SPEED, DEFAULT_SNAP_SLACK, search_route
+from modules.preprocess.csr_graph import as_csr
 
 
-def benchmark_algorithms(adj_matrix, adj_list, runs_per_algo=3):
+ALGORITHMS = ("floydWarshall", "dijkstra", "bellmanFord", "spfa", "johnson")
+
+# Result keys per algorithm: median time of the primary variant, and the stats of every variant run
+TIME_KEYS = {
+    "floydWarshall": "fwTime",
+    "dijkstra": "dijkstraTime",
+    "bellmanFord": "bellmanFordTime",
+    "spfa": "spfaTime",
+    "johnson": "johnsonTime",
+}
+STATS_KEYS = {
+    "floydWarshall": "fwStats",
+    "dijkstra": "dijkstraStats",
+    "bellmanFord": "bellmanFordStats",
+    "spfa": "spfaStats",
+    "johnson": "johnsonStats",
+}
+
+# A variant takes (adj_matrix, adj_list, options) and returns the all-pairs distances,
+# except the route search variants: only the pairs their greedy route searched (Dict[from, Dict[to, d]])
+Variant = Callable[..., object]
+VARIANTS: Dict[str, Dict[str, Variant]] = {algorithm: {} for algorithm in ALGORITHMS}
+
+def register_variant(algorithm: str, name: str, fn: Variant) -> None:
+    """Make an implementation selectable (and comparable) under `algorithm` in the benchmark."""
+    VARIANTS.setdefault(algorithm, {})[name] = fn
+
+def _floyd_warshall_variant(impl: str) -> Variant:
+    floyd_warshall = FLOYD_WARSHALL_IMPLEMENTATIONS[impl]
+    return lambda adj_matrix, adj_list, options: floyd_warshall(adj_matrix)
+
+def _search_variant(method: str) -> Variant:
+    """Greedy route from node 0 through every node, searching only the distances each step needs."""
+    def variant(adj_matrix, adj_list, options):
+        graph = as_csr(adj_list)
+        return search_route(graph, 0, range(1, graph.n), method=method, coords=options.get('coords'),
+                            max_speed=options.get('astar_max_speed', DEFAULT_MAX_SPEED),
+                            snap_slack=options.get('astar_snap_slack', DEFAULT_SNAP_SLACK))[1]
+    return variant
+
+for _impl in FLOYD_WARSHALL_IMPLEMENTATIONS:
+    register_variant("floydWarshall", _impl, _floyd_warshall_variant(_impl))
+register_variant("dijkstra", "serial", lambda adj_matrix, adj_list, options: dijkstra_all_pairs(adj_list))
+register_variant("dijkstra", "parallel", lambda adj_matrix, adj_list, options: dijkstra_all_pairs_parallel(
+    adj_list, workers=options.get('dijkstra_workers'), min_nodes=options.get('dijkstra_min_nodes', 0)))
+for _method in SEARCH_METHODS:
+    register_variant("dijkstra", _method, _search_variant(_method))
+register_variant("bellmanFord", "python", lambda adj_matrix, adj_list, options: bellman_ford_all_pairs(adj_list))
+register_variant("bellmanFord", "fullRounds", lambda adj_matrix, adj_list, options: bellman_ford_all_pairs(adj_list, early_exit=False))
+register_variant("spfa", "slf", lambda adj_matrix, adj_list, options: spfa_all_pairs(adj_list))
+register_variant("johnson", "serial", lambda adj_matrix, adj_list, options: johnson_all_pairs(adj_list))
+register_variant("johnson", "parallel", lambda adj_matrix, adj_list, options: johnson_all_pairs(
+    adj_list, workers=options.get('dijkstra_workers') or 1, min_nodes=options.get('dijkstra_min_nodes', 0)))
+
+def benchmark_algorithms(adj_matrix, adj_list, config: Optional[HarnessConfig] = None,
+                         variants: Optional[Dict[str, List[str]]] = None, fw_impl="numpy",
+                         dijkstra_workers=1, dijkstra_min_nodes=0, algorithms=ALGORITHMS, coords=None,
+                         astar_max_speed=DEFAULT_MAX_SPEED, astar_snap_slack=DEFAULT_SNAP_SLACK):
+    """
+    Time each all-pairs algorithm on the same graph with the statistical harness.
+
+    Every algorithm has a primary variant (`fw_impl` for Floyd-Warshall,
+    "parallel" for Dijkstra and Johnson when dijkstra_workers > 1, else "serial") whose
+    median time is reported as e.g. `fwTime` and whose distances are returned.
+    `variants` adds further implementations per algorithm, timed on the same
+    graph and reported side by side in e.g. `fwStats`.
+
+    `algorithms` restricts the run to a subset of ALGORITHMS, e.g. to time
+    them as separate jobs and report progress in between.
+    Args:
+        config: Warm-up, repetition, memory and GC settings (HarnessConfig defaults if None)
+        variants: Dict[algorithm, List[variant name]] of extra variants to compare
+        coords: (latitude, longitude) per node, for the A* search variant
+        astar_max_speed, astar_snap_slack: Lower bound settings of the A* variant (see GraphSearch)
+    Returns:
+        (results, apsp): the timings, and the all-pairs distances computed by
+        each algorithm's primary variant (keyed like the router's `algorithm`
+        values) so the route builders can reuse them instead of searching again.
+    """
+    config = config or HarnessConfig()
+    variants = variants or {}
+    options = {'dijkstra_workers': dijkstra_workers, 'dijkstra_min_nodes': dijkstra_min_nodes, 'coords': coords,
+               'astar_max_speed': astar_max_speed, 'astar_snap_slack': astar_snap_slack}
+    primary = {
+        "floydWarshall": fw_impl,
+        "dijkstra": "parallel" if dijkstra_workers > 1 else "serial",
+        "bellmanFord": "python",
+        "spfa": "slf",
+        "johnson": "parallel" if dijkstra_workers > 1 else "serial",
+    }
     results = {}
-    # Floyd-Warshall
-    fw_times = []
-    for _ in range(runs_per_algo):
-        start = time.perf_counter()
-        floyd_warshall(adj_matrix)
-        fw_times.append(time.perf_counter() - start)
-    results['fwTime'] = sum(fw_times) / runs_per_algo
-
-    # Dijkstra
-    dijkstra_times = []
-    for _ in range(runs_per_algo):
-        start = time.perf_counter()
-        dijkstra_all_pairs(adj_list)
-        dijkstra_times.append(time.perf_counter() - start)
-    results['dijkstraTime'] = sum(dijkstra_times) / runs_per_algo
-
-    # Bellman-Ford
-    bf_times = []
-    for _ in range(runs_per_algo):
-        start = time.perf_counter()
-        bellman_ford_all_pairs(adj_list)
-        bf_times.append(time.perf_counter() - start)
-    results['bellmanFordTime'] = sum(bf_times) / runs_per_algo
-
-    return results 
\ No newline at end of file
+    apsp = {}
+    for algorithm in algorithms:
+        stats = {}
+        names = [primary[algorithm]] + [name for name in variants.get(algorithm, []) if name != primary[algorithm]]
+        for name in names:
+            variant = VARIANTS[algorithm][name]
+            stats[name], dist = measure(lambda: variant(adj_matrix, adj_list, options), config)
+            if name == primary[algorithm]:
+                apsp[algorithm] = dist
+        results[TIME_KEYS[algorithm]] = stats[primary[algorithm]]['median']
+        results[STATS_KEYS[algorithm]] = stats
+
+    if "floydWarshall" in algorithms:
+        results['fwImpl'] = fw_impl
+    if "dijkstra" in algorithms:
+        results['dijkstraWorkers'] = dijkstra_workers
+    return results, apsp
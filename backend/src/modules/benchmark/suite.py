@@ -0,0 +1,288 @@
+"""
+Offline benchmark suite for the algorithms in modules/algorithms.
+
+Runs without MongoDB or OSRM, from backend/src:
+
+    python -m modules.benchmark.suite run --sizes 50 100 200 --k 4 --output results.json
+    python -m modules.benchmark.suite run --fixture lima.json --baseline baseline.json
+    python -m modules.benchmark.suite compare results.json baseline.json
+    python -m modules.benchmark.suite record lima.json --n 500 --center -12.05 -77.04 --radius 15000
+
+`run` sweeps graph sizes over random geometric graphs (or the first n
+waypoints of a recorded OSRM table), times every registered all-pairs
+variant and TSP solver with the statistical harness and writes a JSON
+results file. Against a baseline file it exits with status 1 when any
+median got slower than the threshold allows.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from modules.benchmark.harness import HarnessConfig, measure
+from modules.benchmark.runner import VARIANTS
+from modules.benchmark.graphs import (
+    fixture_distances, graph_from_distances, k_for, load_fixture, random_geometric_distances, random_waypoints,
+    record_fixture,
+)
+from modules.algorithms.floyd_warshall import floyd_warshall_numpy
+from modules.algorithms.nearest_neighbor import nearest_neighbor_order
+from modules.algorithms.tsp_solver import solve_tsp
+from modules.algorithms.tsp_heuristic import solve_tsp_heuristic
+from modules.preprocess.osrm_client import OSRMClient
+from modules.config import MAX_GRAPH_SIZE, OSRM_BASE_URL, OSRM_TABLE_MAX_SIZE, GRAPH_K, DIJKSTRA_WORKERS, DIJKSTRA_PARALLEL_MIN_NODES, ASTAR_MAX_SPEED, ASTAR_SNAP_SLACK
+
+def _tsp_ortools(adj_matrix, graph) -> List[int]:
+    # Without the solution cache every timed run solves from scratch
+    return solve_tsp(graph, cache=False)
+
+def _tsp_nearest_neighbor(adj_matrix, graph) -> List[int]:
+    dist = floyd_warshall_numpy(adj_matrix)
+    return nearest_neighbor_order(dist, 0, range(1, graph.n)) + [0]
+
+def _tsp_heuristic(adj_matrix, graph) -> List[int]:
+    return solve_tsp_heuristic(floyd_warshall_numpy(adj_matrix), graph=graph)
+
+# TSP solvers take (adj_matrix, graph) and return a closed tour from node 0
+TSP_VARIANTS: Dict[str, Callable[..., List[int]]] = {
+    "ortools": _tsp_ortools,
+    "nearestNeighbor": _tsp_nearest_neighbor,
+    "heuristic": _tsp_heuristic,
+}
+
+# Largest graph each slow variant is run on by default ("algorithm/variant": nodes)
+SIZE_LIMITS = {
+    "floydWarshall/python": 300,
+    "bellmanFord/python": 500,
+    "bellmanFord/fullRounds": 200,
+    "tsp/ortools": 200,
+    # Without fixture coordinates these search every candidate point to point
+    "dijkstra/bidirectional": 200,
+    "dijkstra/astar": 200,
+}
+
+def default_sizes(max_size: int = MAX_GRAPH_SIZE) -> List[int]:
+    """Doubling sweep 50, 100, 200, ... up to max_size (included)."""
+    sizes = []
+    size = 50
+    while size < max_size:
+        sizes.append(size)
+        size *= 2
+    return sizes + [max_size]
+
+def tour_cost(dist: np.ndarray, tour: List[int]) -> Optional[float]:
+    """
+    Length of a tour over a distance matrix, None when it uses an unreachable pair.
+
+    Tours are scored on the full road distance matrix the graph was built
+    from: the k-nearest graph is directed and its APSP has unreachable
+    pairs at every size, which would leave most tours without a cost.
+    """
+    cost = float(sum(dist[a, b] for a, b in zip(tour, tour[1:])))
+    return cost if math.isfinite(cost) else None
+
+def run_suite(sizes: List[int], k: Optional[int] = None, density: Optional[float] = None, seed: int = 0,
+              fixture: Optional[Dict[str, Any]] = None, algorithms: Optional[List[str]] = None,
+              limits: Optional[Dict[str, int]] = None, config: Optional[HarnessConfig] = None,
+              log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Time every variant (and TSP solver) on each graph size.
+    Args:
+        sizes: Node counts of the sweep
+        k, density: Neighbors per node of the k-nearest graph (see graphs.k_for; GRAPH_K
+            when neither is given, like the benchmark endpoint)
+        fixture: Recorded OSRM table to slice graphs from instead of random geometric graphs
+        algorithms: Subset of VARIANTS plus "tsp" (all by default)
+        limits: Overrides of SIZE_LIMITS
+    Returns:
+        Results document with `meta`, one `results` entry per (algorithm, variant, n)
+        and the fitted `scaling` exponent of every variant
+    """
+    config = config or HarnessConfig()
+    if k is None and density is None:
+        k = GRAPH_K
+    limits = {**SIZE_LIMITS, **(limits or {})}
+    algorithms = algorithms or list(VARIANTS) + ["tsp"]
+    options = {'dijkstra_workers': DIJKSTRA_WORKERS, 'dijkstra_min_nodes': DIJKSTRA_PARALLEL_MIN_NODES,
+               'astar_max_speed': ASTAR_MAX_SPEED, 'astar_snap_slack': ASTAR_SNAP_SLACK}
+    graph_source = "fixture" if fixture is not None else "randomGeometric"
+    results = []
+    for n in sizes:
+        if fixture is not None:
+            distances = fixture_distances(fixture, n)
+        else:
+            distances = random_geometric_distances(n, seed)
+        adj_matrix, graph = graph_from_distances(distances, k_for(n, k, density))
+        reference = floyd_warshall_numpy(adj_matrix)
+        if fixture is not None:
+            options['coords'] = [(wp['latitude'], wp['longitude']) for wp in fixture['waypoints'][:n]]
+        for algorithm in algorithms:
+            variants = TSP_VARIANTS if algorithm == "tsp" else VARIANTS[algorithm]
+            for name, variant in variants.items():
+                if n > limits.get(f"{algorithm}/{name}", math.inf):
+                    continue
+                if algorithm == "tsp":
+                    stats, tour = measure(lambda: variant(adj_matrix, graph), config)
+                    stats['tourCost'] = tour_cost(distances, tour)
+                else:
+                    stats, dist = measure(lambda: variant(adj_matrix, graph, options), config)
+                    matrix = _as_matrix(dist, n)
+                    # Route search variants only fill the pairs they searched
+                    known = ~np.isnan(matrix)
+                    stats['correct'] = bool(np.allclose(matrix[known], reference[known]))
+                results.append({
+                    'algorithm': algorithm, 'variant': name, 'n': n,
+                    'edges': graph.num_edges, 'graph': graph_source, **stats,
+                })
+                log(f"{algorithm:>14} {name:<16} n={n:<5} median={stats['median']:.6f}s runs={stats['runs']}")
+    return {
+        'meta': {
+            'createdAt': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'numpy': np.__version__,
+            'graph': graph_source,
+            'k': k, 'density': density, 'seed': seed,
+            'harness': vars(config),
+        },
+        'results': results,
+        'scaling': scaling_exponents(results),
+    }
+
+def _as_matrix(dist, n: int) -> np.ndarray:
+    """APSP output (ndarray, nested lists or dict of dicts, NaN for missing pairs) as an n x n array."""
+    if isinstance(dist, dict):
+        matrix = np.full((n, n), np.nan)
+        for u, row in dist.items():
+            for v, d in row.items():
+                matrix[u, v] = d
+        return matrix
+    return np.asarray(dist, dtype=np.float64)
+
+def scaling_exponents(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Least-squares slope of log(median) over log(n) per variant, e.g. ~3 for Floyd-Warshall."""
+    series: Dict[str, List[Tuple[int, float]]] = {}
+    for entry in results:
+        series.setdefault(f"{entry['algorithm']}/{entry['variant']}", []).append((entry['n'], entry['median']))
+    exponents = {}
+    for key, points in series.items():
+        if len(points) < 2:
+            continue
+        x = np.log([n for n, _ in points])
+        y = np.log([max(median, 1e-9) for _, median in points])
+        exponents[key] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Entries whose median is more than `threshold` (relative) slower than the baseline's.
+
+    Entries are matched on (algorithm, variant, n, graph); medians within the
+    combined 95% confidence intervals are not reported.
+    """
+    previous = {(e['algorithm'], e['variant'], e['n'], e['graph']): e for e in baseline['results']}
+    regressions = []
+    for entry in results['results']:
+        base = previous.get((entry['algorithm'], entry['variant'], entry['n'], entry['graph']))
+        if base is None:
+            continue
+        slowdown = entry['median'] - base['median']
+        if slowdown > threshold * base['median'] and slowdown > entry['ci95'] + base['ci95']:
+            regressions.append({
+                'algorithm': entry['algorithm'], 'variant': entry['variant'], 'n': entry['n'],
+                'baseline': base['median'], 'median': entry['median'], 'ratio': entry['median'] / base['median'],
+            })
+    return regressions
+
+def _report(regressions: List[Dict[str, Any]]) -> int:
+    for r in regressions:
+        print(f"REGRESSION {r['algorithm']}/{r['variant']} n={r['n']}: "
+              f"{r['baseline']:.6f}s -> {r['median']:.6f}s ({r['ratio']:.2f}x)")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+def _parse_limits(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for value in values:
+        key, _, size = value.partition("=")
+        limits[key] = int(size)
+    return limits
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m modules.benchmark.suite", description="Offline algorithm benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a size sweep and write a results file")
+    run.add_argument("--sizes", type=int, nargs="+", help=f"Graph sizes (default: doubling up to MAX_GRAPH_SIZE={MAX_GRAPH_SIZE})")
+    run.add_argument("--k", type=int, help="Neighbors per node (default GRAPH_K)")
+    run.add_argument("--density", type=float, help="Neighbors per node as a fraction of n - 1 (overrides --k)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--fixture", help="Recorded OSRM table to use instead of random geometric graphs")
+    run.add_argument("--algorithms", nargs="+", help=f"Subset of {', '.join(list(VARIANTS) + ['tsp'])}")
+    run.add_argument("--limit", action="append", default=[], metavar="ALGORITHM/VARIANT=N",
+                     help="Largest size for a variant, e.g. floydWarshall/python=500 (repeatable)")
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--min-repeats", type=int, default=3)
+    run.add_argument("--max-repeats", type=int, default=20)
+    run.add_argument("--target-ci", type=float, default=0.05)
+    run.add_argument("--budget", type=float, default=30.0, help="Seconds per variant and size")
+    run.add_argument("--memory", action="store_true", help="Record tracemalloc peak memory")
+    run.add_argument("--output", default="benchmark-results.json")
+    run.add_argument("--baseline", help="Results file to compare against")
+    run.add_argument("--threshold", type=float, default=0.1, help="Allowed relative slowdown")
+
+    cmp = commands.add_parser("compare", help="Compare a results file against a baseline")
+    cmp.add_argument("results")
+    cmp.add_argument("baseline")
+    cmp.add_argument("--threshold", type=float, default=0.1)
+
+    record = commands.add_parser("record", help="Record an OSRM table as a fixture (needs a running OSRM)")
+    record.add_argument("output")
+    record.add_argument("--n", type=int, default=MAX_GRAPH_SIZE)
+    record.add_argument("--center", type=float, nargs=2, default=(-12.0464, -77.0428), metavar=("LAT", "LON"))
+    record.add_argument("--radius", type=float, default=15000.0, help="meters")
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("--osrm-url", default=OSRM_BASE_URL)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        config = HarnessConfig(
+            warmup=args.warmup, min_repeats=args.min_repeats, max_repeats=args.max_repeats,
+            target_rel_ci=args.target_ci, time_budget=args.budget, measure_memory=args.memory,
+        )
+        fixture = load_fixture(args.fixture) if args.fixture else None
+        sizes = args.sizes or default_sizes(min(MAX_GRAPH_SIZE, len(fixture['waypoints'])) if fixture else MAX_GRAPH_SIZE)
+        results = run_suite(sizes, args.k, args.density, args.seed, fixture, args.algorithms, _parse_limits(args.limit), config)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+        if args.baseline:
+            with open(args.baseline) as f:
+                return _report(compare(results, json.load(f), args.threshold))
+        return 0
+    if args.command == "compare":
+        with open(args.results) as f:
+            results = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return _report(compare(results, baseline, args.threshold))
+
+    async def record_table() -> None:
+        waypoints = random_waypoints(args.n, args.center[0], args.center[1], args.radius, args.seed)
+        async with OSRMClient(args.osrm_url, table_max_size=OSRM_TABLE_MAX_SIZE) as client:
+            await record_fixture(waypoints, client, args.output)
+
+    asyncio.run(record_table())
+    print(f"Fixture with {args.n} waypoints written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
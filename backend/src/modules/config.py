@@ -4,6 +4,9 @@ from beanie import init_beanie
 from modules.models.user import User
 from modules.models.doctor import Doctor
 from modules.models.recommendation import Recommendation
+from modules.models.benchmark_job import BenchmarkJob
+from modules.preprocess.osrm_client import OSRMClient
+from modules.preprocess.osrm_cache import OSRMCache, LRUCache, MongoCacheTier
 
 # MongoDB connection
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -11,21 +14,117 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "medcom_routing")
 
 # OSRM configuration
 OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "http://localhost:5000")
+OSRM_TABLE_MAX_SIZE = int(os.getenv("OSRM_TABLE_MAX_SIZE", "100"))  # must match osrm-routed --max-table-size
+OSRM_MAX_CONNECTIONS = int(os.getenv("OSRM_MAX_CONNECTIONS", "20"))
+OSRM_MAX_CONCURRENCY = int(os.getenv("OSRM_MAX_CONCURRENCY", "20"))  # in-flight requests per backend worker
+OSRM_TIMEOUT = float(os.getenv("OSRM_TIMEOUT", "30"))  # seconds per request
+OSRM_RETRIES = int(os.getenv("OSRM_RETRIES", "3"))
+
+# OSRM response cache configuration
+OSRM_CACHE_ENABLED = os.getenv("OSRM_CACHE_ENABLED", "true").lower() == "true"
+OSRM_CACHE_MONGO = os.getenv("OSRM_CACHE_MONGO", "false").lower() == "true"  # shared tier across workers
+OSRM_CACHE_PRECISION = int(os.getenv("OSRM_CACHE_PRECISION", "5"))  # coordinate decimals in cache keys
+OSRM_CACHE_MAX_ENTRIES = int(os.getenv("OSRM_CACHE_MAX_ENTRIES", "20000"))  # one entry per table source row or route; a 1000-node table takes 1000
+OSRM_CACHE_TTL = int(os.getenv("OSRM_CACHE_TTL", "86400"))  # 1 day
+OSRM_CACHE_MONGO_MAX_ENTRIES = int(os.getenv("OSRM_CACHE_MONGO_MAX_ENTRIES", "200000"))  # same units as OSRM_CACHE_MAX_ENTRIES
+OSRM_CACHE_MONGO_TTL = int(os.getenv("OSRM_CACHE_MONGO_TTL", "604800"))  # 7 days
+
+# Region-wide matrix store (precomputed OSRM matrices over all users and doctors)
+MATRIX_STORE_DIR = os.getenv("MATRIX_STORE_DIR", "")  # empty = disabled
+MATRIX_STORE_SYNC_ON_START = os.getenv("MATRIX_STORE_SYNC_ON_START", "true").lower() == "true"
 
 # Algorithm configuration
 K_NEAREST_NEIGHBORS = int(os.getenv("K_NEAREST_NEIGHBORS", "10"))
 MAX_GRAPH_SIZE = int(os.getenv("MAX_GRAPH_SIZE", "1000"))
+GRAPH_K = int(os.getenv("GRAPH_K", "4"))  # neighbors per node of the k-nearest routing graph (benchmarks, route sessions, offline suite)
+GRAPH_PREFILTER_MIN_NODES = int(os.getenv("GRAPH_PREFILTER_MIN_NODES", "200"))  # smaller graphs get the full OSRM table, 0 = never prefilter
+GRAPH_PREFILTER_FACTOR = int(os.getenv("GRAPH_PREFILTER_FACTOR", "3"))  # straight-line candidates per node = factor * k
+FLOYD_WARSHALL_IMPL = os.getenv("FLOYD_WARSHALL_IMPL", "numpy")  # python | numpy | blocked
+DIJKSTRA_WORKERS = int(os.getenv("DIJKSTRA_WORKERS", str(os.cpu_count() or 1)))  # 1 = serial
+DIJKSTRA_PARALLEL_MIN_NODES = int(os.getenv("DIJKSTRA_PARALLEL_MIN_NODES", "200"))  # smaller graphs run serially
+ASTAR_MAX_SPEED = float(os.getenv("ASTAR_MAX_SPEED", "1.1"))  # straight-line meters per unit of edge weight at most (graph weights are meters; >1 leaves a margin for the spherical distance)
+ASTAR_SNAP_SLACK = float(os.getenv("ASTAR_SNAP_SLACK", "250"))  # meters OSRM may move a point onto the road, taken off the A* bound at both ends
+TSP_TIME_LIMIT = float(os.getenv("TSP_TIME_LIMIT", "10"))  # seconds of OR-Tools search per route
+TSP_FIRST_SOLUTION = os.getenv("TSP_FIRST_SOLUTION", "PATH_CHEAPEST_ARC")  # OR-Tools FirstSolutionStrategy
+TSP_METAHEURISTIC = os.getenv("TSP_METAHEURISTIC", "AUTOMATIC")  # OR-Tools LocalSearchMetaheuristic, e.g. GUIDED_LOCAL_SEARCH
+TSP_HEURISTIC_TIME_LIMIT = float(os.getenv("TSP_HEURISTIC_TIME_LIMIT", "2"))  # seconds of 2-opt/Or-opt search
+TSP_HEURISTIC_MAX_ITERATIONS = int(os.getenv("TSP_HEURISTIC_MAX_ITERATIONS", "10000"))  # improving moves
+TSP_HEURISTIC_CONSTRUCTION = os.getenv("TSP_HEURISTIC_CONSTRUCTION", "nearestNeighbor")  # nearestNeighbor | greedyEdge
 
 # Benchmark configuration
-BENCHMARK_TIMEOUT = int(os.getenv("BENCHMARK_TIMEOUT", "300"))  # 5 minutes
+BENCHMARK_TIMEOUT = int(os.getenv("BENCHMARK_TIMEOUT", "300"))  # 5 minutes, deadline for a benchmark's compute jobs
+BENCHMARK_ALGORITHMS = [a for a in os.getenv("BENCHMARK_ALGORITHMS", "").split(",") if a]  # empty = all all-pairs algorithms
+BENCHMARK_WARMUP = int(os.getenv("BENCHMARK_WARMUP", "1"))  # untimed runs per variant
+BENCHMARK_MIN_REPEATS = int(os.getenv("BENCHMARK_MIN_REPEATS", "3"))
+BENCHMARK_MAX_REPEATS = int(os.getenv("BENCHMARK_MAX_REPEATS", "20"))
+BENCHMARK_TARGET_CI = float(os.getenv("BENCHMARK_TARGET_CI", "0.05"))  # 95% CI half-width / median, 0 = fixed repeats
+BENCHMARK_VARIANT_BUDGET = float(os.getenv("BENCHMARK_VARIANT_BUDGET", "30"))  # seconds, stops repeating a slow variant
+BENCHMARK_MEASURE_MEMORY = os.getenv("BENCHMARK_MEASURE_MEMORY", "false").lower() == "true"  # tracemalloc peak (process-global, runs are serialized)
+BENCHMARK_DISABLE_GC = os.getenv("BENCHMARK_DISABLE_GC", "true").lower() == "true"  # GC off in timed regions (process-global: off while any job is timing)
+
+# Compute executor configuration (CPU-bound algorithm work)
+COMPUTE_EXECUTOR = os.getenv("COMPUTE_EXECUTOR", "thread")  # thread | process
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", "2"))
+COMPUTE_MAX_QUEUE = int(os.getenv("COMPUTE_MAX_QUEUE", "8"))  # waiting jobs before answering 429
+
+# Background benchmark jobs (POST /api/benchmark/jobs)
+BENCHMARK_JOB_WORKERS = int(os.getenv("BENCHMARK_JOB_WORKERS", "1"))  # 0 = this process only accepts jobs
+BENCHMARK_JOB_POLL_INTERVAL = float(os.getenv("BENCHMARK_JOB_POLL_INTERVAL", "2"))  # seconds
+BENCHMARK_JOB_LEASE = float(os.getenv("BENCHMARK_JOB_LEASE", "60"))  # seconds a claim stays valid without renewal
+
+# Route sessions (PATCH /api/routes/sessions/{id} edits a route incrementally)
+ROUTE_SESSION_MAX = int(os.getenv("ROUTE_SESSION_MAX", "64"))  # sessions kept per process (each holds ~3 N x N float64 arrays)
+ROUTE_SESSION_TTL = int(os.getenv("ROUTE_SESSION_TTL", "28800"))  # seconds since the last edit, 8 hours
+ROUTE_SESSION_SEARCH_TIME = float(os.getenv("ROUTE_SESSION_SEARCH_TIME", "0.2"))  # seconds of local search per edit
+
+# Batch routing (POST /api/routes/batch)
+BATCH_MAX_DOCTORS = int(os.getenv("BATCH_MAX_DOCTORS", "100"))  # doctors per request
+BATCH_CAPACITY_SLACK = float(os.getenv("BATCH_CAPACITY_SLACK", "1.25"))  # default capacity = ceil(patients / doctors * slack)
+BATCH_TIME_LIMIT = float(os.getenv("BATCH_TIME_LIMIT", "30"))  # seconds of OR-Tools search for the whole VRP
+
+# List endpoints (GET /api/users, /api/doctors)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "500"))  # default page size
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "5000"))
+
+# Set by init_db
+database = None
+
+async def create_osrm_client() -> OSRMClient:
+    """Create the application-wide OSRM client from the environment configuration"""
+    cache = None
+    if OSRM_CACHE_ENABLED:
+        mongo = None
+        if OSRM_CACHE_MONGO and database is not None:
+            mongo = MongoCacheTier(
+                database["osrm_cache"],
+                max_entries=OSRM_CACHE_MONGO_MAX_ENTRIES,
+                ttl=OSRM_CACHE_MONGO_TTL,
+            )
+            await mongo.ensure_indexes()
+        cache = OSRMCache(
+            lru=LRUCache(max_entries=OSRM_CACHE_MAX_ENTRIES, ttl=OSRM_CACHE_TTL),
+            mongo=mongo,
+            precision=OSRM_CACHE_PRECISION,
+        )
+    return OSRMClient(
+        base_url=OSRM_BASE_URL,
+        table_max_size=OSRM_TABLE_MAX_SIZE,
+        max_connections=OSRM_MAX_CONNECTIONS,
+        max_concurrency=OSRM_MAX_CONCURRENCY,
+        timeout=OSRM_TIMEOUT,
+        retries=OSRM_RETRIES,
+        cache=cache,
+    )
 
 async def init_db():
     """Initialize database connection and Beanie ODM"""
+    global database
     client = AsyncIOMotorClient(MONGODB_URL)
+    database = client[DATABASE_NAME]
     print(f"Connected to MongoDB: {MONGODB_URL}")
     print(f"Database name: {DATABASE_NAME}")
     print(f"OSRM base URL: {OSRM_BASE_URL}")
     await init_beanie(
-        database=client[DATABASE_NAME],
-        document_models=[User, Doctor, Recommendation]
+        database=database,
+        document_models=[User, Doctor, Recommendation, BenchmarkJob]
     ) 
\ No newline at end of file
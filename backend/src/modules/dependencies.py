@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import Request
+from modules.preprocess.osrm_client import OSRMClient
+from modules.preprocess.matrix_store import MatrixStore
+from modules.services.compute import ComputeExecutor
+from modules.services.benchmark_jobs import BenchmarkJobQueue
+
+def get_osrm_client(request: Request) -> OSRMClient:
+    """Application-scoped OSRM client created in the lifespan of `main.py`"""
+    return request.app.state.osrm_client
+
+def get_compute_executor(request: Request) -> ComputeExecutor:
+    """Application-scoped executor for CPU-bound algorithm work"""
+    return request.app.state.compute
+
+def get_job_queue(request: Request) -> BenchmarkJobQueue:
+    """Application-scoped background benchmark job queue"""
+    return request.app.state.job_queue
+
+def get_matrix_store(request: Request) -> Optional[MatrixStore]:
+    """Application-scoped region-wide matrix store, None unless MATRIX_STORE_DIR is set"""
+    return request.app.state.matrix_store
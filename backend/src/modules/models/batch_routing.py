@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class BatchRoutingRequest(BaseModel):
+    doctorIds: List[str]
+    userIds: List[str]  # patients to split between the doctors
+    priorities: Optional[Dict[str, bool]] = None
+    assignment: str = "vrp"  # vrp (one multi-vehicle model) | cluster (assign first, then a tour per doctor)
+    capacity: Optional[int] = None  # patients per doctor at most, defaults to an even share times BATCH_CAPACITY_SLACK
+    tourAlgorithm: str = "tsp"  # cluster only: tsp | tspHeuristic
+    tspTimeLimit: Optional[float] = None  # seconds, defaults to BATCH_TIME_LIMIT (vrp) or the per-tour TSP defaults
+    tspFirstSolution: Optional[str] = None  # defaults to TSP_FIRST_SOLUTION
+    tspMetaheuristic: Optional[str] = None  # defaults to TSP_METAHEURISTIC
+    geometry: bool = False  # also fetch each route's GeoJSON from OSRM
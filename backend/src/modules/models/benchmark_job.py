@@ -0,0 +1,56 @@
+from beanie import Document
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
+import pymongo
+
+class HarnessOptions(BaseModel):
+    """Per-request overrides of the BENCHMARK_* harness settings."""
+    warmup: Optional[int] = None
+    minRepeats: Optional[int] = None
+    maxRepeats: Optional[int] = None
+    targetCI: Optional[float] = None
+    measureMemory: Optional[bool] = None
+    disableGC: Optional[bool] = None
+
+class BenchmarkRequest(BaseModel):
+    doctorId: str
+    userIds: List[str]
+    algorithm: str = "tsp"
+    priorities: Optional[Dict[str, bool]] = None
+    fwImpl: Optional[str] = None  # defaults to FLOYD_WARSHALL_IMPL
+    tspTimeLimit: Optional[float] = None  # seconds, defaults to TSP_TIME_LIMIT (TSP_HEURISTIC_TIME_LIMIT for tspHeuristic)
+    tspFirstSolution: Optional[str] = None  # defaults to TSP_FIRST_SOLUTION
+    tspMetaheuristic: Optional[str] = None  # defaults to TSP_METAHEURISTIC
+    tspMaxIterations: Optional[int] = None  # tspHeuristic only, defaults to TSP_HEURISTIC_MAX_ITERATIONS
+    tspConstruction: Optional[str] = None  # tspHeuristic only, defaults to TSP_HEURISTIC_CONSTRUCTION
+    benchmarkAlgorithms: Optional[List[str]] = None  # all-pairs algorithms to time, defaults to BENCHMARK_ALGORITHMS
+    variants: Optional[Dict[str, List[str]]] = None  # extra implementations to compare, e.g. {"floydWarshall": ["python"]}
+    harness: Optional[HarnessOptions] = None
+
+class JobStage(BaseModel):
+    name: str
+    status: str = "pending"  # pending | running | done | skipped
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class BenchmarkJob(Document):
+    request: BenchmarkRequest
+    status: str = "queued"  # queued | running | completed | failed
+    stages: List[JobStage] = []
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    workerId: Optional[str] = None  # worker holding the job while running
+    leaseUntil: Optional[datetime] = None  # the job is re-queued if its worker stops renewing before this
+    createdAt: datetime = Field(default_factory=_now)
+    updatedAt: datetime = Field(default_factory=_now)
+
+    class Settings:
+        name = "benchmark_jobs"
+        indexes = [
+            [("status", pymongo.ASCENDING), ("createdAt", pymongo.ASCENDING)],
+            [("status", pymongo.ASCENDING), ("leaseUntil", pymongo.ASCENDING)],
+        ]
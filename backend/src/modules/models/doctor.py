@@ -1,15 +1,37 @@
 from beanie import Document # Object Document Mapper build on top of pydantic
-from pydantic import EmailStr # EmailStr is a pydantic field that validates that the email is a valid email address
-from typing import Optional, List # Optional is a type that allows for None values, List is a type that allows for a list of values
-from .recommendation import Recommendation
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator # EmailStr is a pydantic field that validates that the email is a valid email address
+from typing import Optional # Optional is a type that allows for None values
+import pymongo
+from modules.models.geo import GeoPoint
 
 class Doctor(Document):
     name: str
     email: EmailStr
     specialty: Optional[str] = None
-    recommendations: Optional[List[Recommendation]] = None
     latitude: float
     longitude: float
+    location: Optional[GeoPoint] = None  # derived from latitude/longitude for geospatial queries
+    # Recommendations are separate documents referencing the doctor (Recommendation.doctor_id)
+
+    @model_validator(mode="after")
+    def set_location(self):
+        self.location = GeoPoint.from_lat_lon(self.latitude, self.longitude)
+        return self
 
     class Settings:
-        name = "doctors" 
\ No newline at end of file
+        name = "doctors"
+        indexes = [
+            [("location", pymongo.GEOSPHERE)],
+        ]
+
+class DoctorListItem(BaseModel):
+    """A doctor as listed by GET /api/doctors: every field but `_id` is left out unless projected by `fields`."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias="_id")
+    name: Optional[str] = None
+    email: Optional[str] = None
+    specialty: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    location: Optional[GeoPoint] = None
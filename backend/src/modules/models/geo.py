@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List, Literal
+
+class GeoPoint(BaseModel):
+    """GeoJSON Point, as indexed by MongoDB 2dsphere indexes. Coordinates are [longitude, latitude]."""
+    type: Literal["Point"] = "Point"
+    coordinates: List[float]
+
+    @classmethod
+    def from_lat_lon(cls, latitude: float, longitude: float) -> "GeoPoint":
+        return cls(coordinates=[longitude, latitude])
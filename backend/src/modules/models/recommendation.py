@@ -1,10 +1,16 @@
-from beanie import Document
+from beanie import Document, PydanticObjectId
 from typing import Optional
 from datetime import datetime
+import pymongo
 
 class Recommendation(Document):
     text: str
-    date: Optional[datetime] = None
-    
+    date: Optional[datetime] = None  # set to the insertion time when omitted
+    doctor_id: Optional[PydanticObjectId] = None  # set from the URL on insert
+
     class Settings:
-        name = "recommendations" 
\ No newline at end of file
+        name = "recommendations"
+        indexes = [
+            # Newest-first listing per doctor, _id breaks ties between equal dates
+            [("doctor_id", pymongo.ASCENDING), ("date", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+        ]
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class RouteSessionRequest(BaseModel):
+    doctorId: str
+    userIds: List[str]
+    priorities: Optional[Dict[str, bool]] = None
+
+class RouteSessionPatch(BaseModel):
+    add: List[str] = []  # users to insert into the route
+    remove: List[str] = []  # users to drop from the route
+    priorities: Optional[Dict[str, bool]] = None  # new priority flags, for added or existing users
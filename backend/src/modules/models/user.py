@@ -1,6 +1,8 @@
 from beanie import Document
-from pydantic import EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 from typing import Optional
+import pymongo
+from modules.models.geo import GeoPoint
 
 class User(Document):
     name: str
@@ -9,6 +11,28 @@ class User(Document):
     latitude: float
     longitude: float
     phone_number: Optional[str] = None
+    location: Optional[GeoPoint] = None  # derived from latitude/longitude for geospatial queries
+
+    @model_validator(mode="after")
+    def set_location(self):
+        self.location = GeoPoint.from_lat_lon(self.latitude, self.longitude)
+        return self
 
     class Settings:
-        name = "users" 
\ No newline at end of file
+        name = "users"
+        indexes = [
+            [("location", pymongo.GEOSPHERE)],
+        ]
+
+class UserListItem(BaseModel):
+    """A user as listed by GET /api/users: every field but `_id` is left out unless projected by `fields`."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias="_id")
+    name: Optional[str] = None
+    email: Optional[str] = None
+    age: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    phone_number: Optional[str] = None
+    location: Optional[GeoPoint] = None
@@ -0,0 +1,138 @@
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Union
+
+class CSRGraph:
+    """
+    Compact directed weighted graph in CSR (compressed sparse row) layout.
+
+    The outgoing edges of node u are indices[indptr[u]:indptr[u + 1]] with the
+    matching weights; both are NumPy arrays, so neighbor access and
+    re-weighting return views instead of copies.
+    """
+    __slots__ = ("indptr", "indices", "weights")
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    @property
+    def n(self) -> int:
+        """Number of nodes."""
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    def __len__(self) -> int:
+        return self.n
+
+    @classmethod
+    def from_adj_list(cls, adj_list: Dict[int, List[Tuple[int, float]]], n: Optional[int] = None) -> "CSRGraph":
+        """Build from a Dict[int, List[(neighbor, weight)]] adjacency list."""
+        if n is None:
+            n = max(adj_list, default=-1) + 1
+        indptr = [0]
+        indices: List[int] = []
+        weights: List[float] = []
+        for u in range(n):
+            for v, w in adj_list.get(u, ()):
+                indices.append(v)
+                weights.append(w)
+            indptr.append(len(indices))
+        return cls(
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(weights, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_dense(cls, matrix) -> "CSRGraph":
+        """Build from a dense matrix, keeping finite off-diagonal entries as edges."""
+        dense = np.asarray(matrix, dtype=np.float64)
+        mask = np.isfinite(dense)
+        np.fill_diagonal(mask, False)
+        rows, cols = np.nonzero(mask)
+        indptr = np.zeros(dense.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=dense.shape[0]), out=indptr[1:])
+        return cls(indptr, cols.astype(np.int32), dense[rows, cols])
+
+    @classmethod
+    def k_nearest(cls, distances, k: int) -> "CSRGraph":
+        """
+        Keep the k nearest reachable neighbors of every row of a distance matrix.
+
+        Args:
+            distances: N x N matrix (nested lists with None or numpy array with
+                nan/inf for unreachable pairs)
+            k: Number of nearest neighbors to keep per node
+        """
+        dense = np.array(distances, dtype=np.float64)
+        n = dense.shape[0]
+        dense[~np.isfinite(dense)] = np.inf
+        np.fill_diagonal(dense, np.inf)
+        k = min(k, max(n - 1, 0))
+        if k == 0:
+            return cls(np.zeros(n + 1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0))
+        # Rows of the k smallest entries, ordered by distance like k_nearest()
+        nearest = np.argpartition(dense, k - 1, axis=1)[:, :k]
+        nearest_w = np.take_along_axis(dense, nearest, axis=1)
+        order = np.argsort(nearest_w, axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_w = np.take_along_axis(nearest_w, order, axis=1)
+        keep = np.isfinite(nearest_w)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        return cls(indptr, nearest[keep].astype(np.int32), nearest_w[keep])
+
+    def neighbors(self, u: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, weights) views of the outgoing edges of u."""
+        start, end = self.indptr[u], self.indptr[u + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def sources(self) -> np.ndarray:
+        """Source node of every edge, aligned with indices/weights."""
+        return np.repeat(np.arange(self.n, dtype=np.int32), np.diff(self.indptr))
+
+    def with_weights(self, weights: np.ndarray) -> "CSRGraph":
+        """Same structure with other edge weights; indptr/indices are shared, not copied."""
+        return CSRGraph(self.indptr, self.indices, weights)
+
+    def to_dense(self, dtype=np.float64) -> np.ndarray:
+        """Dense adjacency matrix with inf for missing edges and 0 on the diagonal."""
+        dense = np.full((self.n, self.n), np.inf, dtype=dtype)
+        np.fill_diagonal(dense, 0.0)
+        # minimum.at keeps the cheapest of parallel edges
+        np.minimum.at(dense, (self.sources(), self.indices), self.weights.astype(dtype))
+        return dense
+
+    def to_adj_list(self) -> Dict[int, List[Tuple[int, float]]]:
+        """Dict[int, List[(neighbor, weight)]] adjacency list."""
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+        return {
+            u: list(zip(indices[indptr[u]:indptr[u + 1]], weights[indptr[u]:indptr[u + 1]]))
+            for u in range(self.n)
+        }
+
+    def as_lists(self) -> Tuple[List[int], List[int], List[float]]:
+        """indptr, indices and weights as Python lists, the fastest form for pure-Python loops."""
+        return self.indptr.tolist(), self.indices.tolist(), self.weights.tolist()
+
+def as_csr(graph: Union["CSRGraph", Dict[int, List[Tuple[int, float]]], list, np.ndarray]) -> CSRGraph:
+    """Accept a CSRGraph, an adjacency list or a dense matrix and return a CSRGraph."""
+    if isinstance(graph, CSRGraph):
+        return graph
+    if isinstance(graph, dict):
+        return CSRGraph.from_adj_list(graph)
+    return CSRGraph.from_dense(graph)
+
+def as_dense(graph) -> np.ndarray:
+    """Accept a CSRGraph, an adjacency list or a dense matrix and return a dense array."""
+    if isinstance(graph, CSRGraph):
+        return graph.to_dense()
+    if isinstance(graph, dict):
+        return CSRGraph.from_adj_list(graph).to_dense()
+    return np.asarray(graph, dtype=np.float64)
@@ -1,5 +1,8 @@
-from typing import List, Dict, Tuple, Any
+import asyncio
+from typing import List, Dict, Tuple, Optional
 from .osrm_client import OSRMClient
+from .csr_graph import CSRGraph
+from .spatial import candidate_blocks
 
 class Node:
     """Represents a waypoint/node in the routing graph."""
@@ -8,6 +11,73 @@ class Node:
         self.latitude = latitude
         self.longitude = longitude
 
+class RoutingGraph:
+    """
+    Result of the graph-building pipeline.
+    
+    Holds the sparse k-nearest graph (CSR layout) together with the full OSRM
+    distance and duration matrices it was derived from, so later stages
+    (e.g. total travel time) don't need another table request.
+    """
+    def __init__(self, graph: CSRGraph,
+                 distances: Optional[List[List[Optional[float]]]] = None,
+                 durations: Optional[List[List[Optional[float]]]] = None):
+        self.graph = graph
+        self.distances = distances
+        self.durations = durations
+    
+    @property
+    def adj_list(self) -> Dict[int, List[Tuple[int, float]]]:
+        """The sparse graph as a Dict[int, List[(neighbor, distance)]] adjacency list."""
+        return self.graph.to_adj_list()
+
+async def build_graph(waypoints: List[Node], k: int, osrm_client: OSRMClient | None = None,
+                      candidates: Optional[int] = None) -> RoutingGraph:
+    """
+    Build the routing graph for a set of waypoints with a single OSRM table request.
+    
+    The distance and duration matrices are fetched together (chunked by the
+    client when N exceeds OSRM's table limit) and the k-nearest graph is
+    derived from the distance matrix as a CSRGraph.
+    
+    With `candidates`, each node's k nearest are picked among its `candidates`
+    nearest by straight-line distance (found with a spatial grid), and OSRM is
+    only asked for those pairs: about N·candidates table entries instead of N².
+    The matrices are then None outside the requested pairs.
+    
+    Args:
+        waypoints: List of Node objects with id, latitude, longitude
+        k: Number of nearest neighbors to connect for each node
+        osrm_client: OSRM client instance (optional, creates default if None)
+        candidates: Straight-line candidates per node (should be a few times k), None for the full table
+        
+    Returns:
+        RoutingGraph with the sparse k-nearest graph and the matrices
+    """
+    if osrm_client is None:
+        async with OSRMClient() as client:
+            return await build_graph(waypoints, k, client, candidates)
+    
+    waypoint_dicts = [{'latitude': wp.latitude, 'longitude': wp.longitude} for wp in waypoints]
+    
+    try:
+        if candidates is not None and candidates + 1 < len(waypoints):
+            blocks = await asyncio.to_thread(
+                candidate_blocks, [wp.latitude for wp in waypoints], [wp.longitude for wp in waypoints], candidates)
+            table = await osrm_client.get_table_blocks(waypoint_dicts, blocks)
+        else:
+            table = await osrm_client.get_table(waypoint_dicts)
+    except Exception as e:
+        print(f"Error getting OSRM table for {len(waypoints)} nodes: {e}")
+        # If OSRM fails, create empty adjacency lists
+        return RoutingGraph(CSRGraph.from_adj_list({}, len(waypoints)))
+    
+    return graph_from_table(table['distances'], table['durations'], k)
+
+def graph_from_table(distances, durations, k: int) -> RoutingGraph:
+    """RoutingGraph from already known matrices (nested lists with None or arrays with NaN for unreachable pairs)."""
+    return RoutingGraph(CSRGraph.k_nearest(distances, k), distances, durations)
+
 async def build_sparse_graph(waypoints: List[Node], k: int, osrm_client: OSRMClient | None = None) -> Dict[int, List[Tuple[int, float]]]:
     """
     Build a sparse adjacency-list graph from OSRM using a k-nearest strategy.
@@ -24,33 +94,5 @@ async def build_sparse_graph(waypoints: List[Node], k: int, osrm_client: OSRMCli
         Dictionary mapping node_id (int) to list of (neighbor_id, distance) tuples
         where distance is in meters
     """
-    if osrm_client is None:
-        osrm_client = OSRMClient()
-    
-    # Convert waypoints to format expected by OSRM client
-    waypoint_dicts = []
-    for wp in waypoints:
-        waypoint_dicts.append({
-            'latitude': wp.latitude,
-            'longitude': wp.longitude
-        })
-    
-    # Build sparse graph
-    graph: Dict[int, List[Tuple[int, float]]] = {}
-    
-    for i, node in enumerate(waypoints):
-        try:
-            # Get k nearest neighbors for this node using OSRM table service
-            neighbors = await osrm_client.get_nearest_neighbors(
-                str(i), k, waypoint_dicts
-            )
-            
-            # Convert string IDs to integers and store in graph
-            graph[i] = [(int(neighbor_id), distance) for neighbor_id, distance in neighbors]
-            
-        except Exception as e:
-            print(f"Error getting neighbors for node {i}: {e}")
-            # If OSRM fails, create empty adjacency list
-            graph[i] = []
-    
-    return graph 
\ No newline at end of file
+    graph = await build_graph(waypoints, k, osrm_client)
+    return graph.adj_list
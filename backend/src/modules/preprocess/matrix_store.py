@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .osrm_client import OSRMClient
+
+MATRICES = ("distances", "durations")
+
+class MatrixStore:
+    """
+    Region-wide OSRM distance/duration matrices over every known location, on disk.
+
+    Each matrix is a capacity x capacity float32 file opened as a NumPy
+    memmap (NaN for unreachable pairs), so slicing out a benchmark's
+    submatrix only touches the pages of its rows. `index.json` maps each
+    key (e.g. "user:<id>") to its row and the coordinates the row was
+    computed for. Rows of removed keys are reused; the files double in
+    capacity when full.
+
+    Only one process should write a store directory. Writers are serialized
+    by a lock and apply their changes between awaits, so readers on the
+    event loop never see a half-written row.
+    """
+
+    def __init__(self, directory: str, initial_capacity: int = 1024):
+        self.directory = directory
+        self._lock = asyncio.Lock()
+        self._rows: Dict[str, int] = {}
+        self._coords: Dict[str, Tuple[float, float]] = {}
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+            self.capacity = index["capacity"]
+            for key, (row, latitude, longitude) in index["entries"].items():
+                self._rows[key] = row
+                self._coords[key] = (latitude, longitude)
+            self._matrices = {name: self._open(name, self.capacity, "r+") for name in MATRICES}
+        else:
+            self.capacity = initial_capacity
+            self._matrices = {name: self._open(name, self.capacity, "w+") for name in MATRICES}
+            self._save_index()
+        self._free = sorted(set(range(self.capacity)) - set(self._rows.values()), reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.f32")
+
+    def _open(self, name: str, capacity: int, mode: str, path: Optional[str] = None) -> np.memmap:
+        return np.memmap(path or self._path(name), dtype=np.float32, mode=mode, shape=(capacity, capacity))
+
+    def _save_index(self) -> None:
+        entries = {key: [row, *self._coords[key]] for key, row in self._rows.items()}
+        tmp = os.path.join(self.directory, "index.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"capacity": self.capacity, "entries": entries}, f)
+        os.replace(tmp, os.path.join(self.directory, "index.json"))
+
+    def _grow(self, needed: int) -> None:
+        """Copy the matrices into files of at least `needed` rows (old memmaps stay valid for readers)."""
+        capacity = max(self.capacity * 2, needed)
+        for name in MATRICES:
+            tmp = self._path(name) + ".tmp"
+            grown = self._open(name, capacity, "w+", tmp)
+            grown[:self.capacity, :self.capacity] = self._matrices[name]
+            grown.flush()
+            os.replace(tmp, self._path(name))
+            self._matrices[name] = grown
+        self._free = sorted(set(self._free) | set(range(self.capacity, capacity)), reverse=True)
+        self.capacity = capacity
+
+    def submatrix(self, keys: Sequence[str],
+                  coords: Optional[Sequence[Tuple[float, float]]] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        The (distances, durations) matrices between `keys`, in that order, without network I/O.
+
+        Returns None if a key is not stored, or if `coords` (latitude, longitude per key)
+        differ from the ones its row was computed for (the entity moved and the
+        store has not caught up yet).
+        """
+        rows = [self._rows.get(key) for key in keys]
+        if any(row is None for row in rows):
+            return None
+        if coords is not None and any(self._coords[key] != tuple(c) for key, c in zip(keys, coords)):
+            return None
+        index = np.ix_(rows, rows)
+        distances, durations = (self._matrices[name][index].astype(np.float64) for name in MATRICES)
+        return distances, durations
+
+    async def update(self, osrm_client: OSRMClient, locations: Dict[str, Tuple[float, float]]) -> int:
+        """
+        Add keys or move them to new (latitude, longitude) coordinates.
+
+        Only the rows and columns of the changed keys are requested from OSRM.
+        Returns:
+            Number of keys whose rows were (re)computed
+        """
+        async with self._lock:
+            changed = {key: tuple(c) for key, c in locations.items() if self._coords.get(key) != tuple(c)}
+            if not changed:
+                return 0
+            unchanged = [key for key in self._rows if key not in changed]
+            keys = unchanged + list(changed)
+            coords = {**self._coords, **changed}
+            waypoints = [{'latitude': coords[key][0], 'longitude': coords[key][1]} for key in keys]
+            new = list(range(len(unchanged), len(keys)))
+            old = list(range(len(unchanged)))
+            rows, columns = await asyncio.gather(
+                osrm_client.get_table_rect(waypoints, new, list(range(len(keys)))),
+                osrm_client.get_table_rect(waypoints, old, new),
+            )
+
+            # No awaits from here on: readers see the old state or the new one
+            new_keys = [key for key in changed if key not in self._rows]
+            if len(new_keys) > len(self._free):
+                self._grow(len(self._rows) + len(new_keys))
+            for key in new_keys:
+                self._rows[key] = self._free.pop()
+            positions = [self._rows[key] for key in keys]
+            changed_rows = positions[len(unchanged):]
+            for name in MATRICES:
+                matrix = self._matrices[name]
+                matrix[np.ix_(changed_rows, positions)] = _as_array(rows[name])
+                if old:
+                    matrix[np.ix_(positions[:len(unchanged)], changed_rows)] = _as_array(columns[name])
+                matrix.flush()
+            self._coords.update(changed)
+            self._save_index()
+            return len(changed)
+
+    async def remove(self, keys: Sequence[str]) -> int:
+        """Forget keys; their rows are reused by later additions. Returns the number removed."""
+        async with self._lock:
+            removed = [key for key in keys if key in self._rows]
+            for key in removed:
+                self._free.append(self._rows.pop(key))
+                del self._coords[key]
+            if removed:
+                self._save_index()
+            return len(removed)
+
+    async def sync(self, osrm_client: OSRMClient, locations: Dict[str, Tuple[float, float]],
+                   batch_size: int = 500) -> Dict[str, int]:
+        """
+        Make the store hold exactly `locations`: stale keys are removed, new and moved ones computed.
+
+        New keys are added `batch_size` at a time so a first build of a large
+        region fills the store progressively instead of in one huge request.
+        """
+        removed = await self.remove([key for key in list(self._rows) if key not in locations])
+        pending = [key for key, c in locations.items() if self._coords.get(key) != tuple(c)]
+        updated = 0
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            updated += await self.update(osrm_client, {key: locations[key] for key in batch})
+        return {'removed': removed, 'updated': updated}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._rows),
+            'capacity': self.capacity,
+            'bytes': 2 * self.capacity * self.capacity * np.dtype(np.float32).itemsize,
+        }
+
+def _as_array(values: List[List[Optional[float]]]) -> np.ndarray:
+    """Nested lists from OSRM (None for unreachable) as a float32 array with NaN."""
+    return np.array(values, dtype=np.float64).astype(np.float32)
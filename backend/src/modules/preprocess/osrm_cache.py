@@ -0,0 +1,160 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+def coordinate_key(waypoint: Dict[str, float], precision: int = 5) -> str:
+    """
+    Normalize a waypoint to a cache key component.
+
+    Coordinates are rounded to `precision` decimals (5 decimals is ~1 m), so
+    the same doctor/patient location always maps to the same key.
+    """
+    return f"{waypoint['longitude']:.{precision}f},{waypoint['latitude']:.{precision}f}"
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL and a maximum number of entries."""
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                continue
+            expires_at, value = entry
+            if expires_at < now:
+                del self._entries[key]
+                self.misses += 1
+                continue
+            self._entries.move_to_end(key)
+            found[key] = value
+            self.hits += 1
+        return found
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        for key, value in items.items():
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+class MongoCacheTier:
+    """
+    MongoDB-backed cache tier shared by all backend workers.
+
+    Entries expire through a TTL index on `expires_at`; when the collection
+    grows past `max_entries` the entries closest to expiry are trimmed.
+    """
+
+    TRIM_EVERY = 1000  # writes between size checks
+    BATCH_SIZE = 1000  # keys per `$in` query, far below MongoDB's 16 MB document limit
+
+    def __init__(self, collection, max_entries: int = 100_000, ttl: float = 7 * 86400.0):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_trim = 0
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        now = datetime.now(timezone.utc)
+        found = {}
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            batch = keys[start:start + self.BATCH_SIZE]
+            # The TTL monitor only runs once a minute, so filter on expiry too
+            async for doc in self.collection.find({'_id': {'$in': batch}, 'expires_at': {'$gt': now}}):
+                found[doc['_id']] = doc['value']
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        await self.collection.bulk_write(
+            [UpdateOne({'_id': key}, {'$set': {'value': value, 'expires_at': expires_at}}, upsert=True)
+             for key, value in items.items()],
+            ordered=False,
+        )
+        self._writes_since_trim += len(items)
+        if self._writes_since_trim >= self.TRIM_EVERY:
+            self._writes_since_trim = 0
+            await self._trim()
+
+    async def _trim(self) -> None:
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = self.collection.find({}, {'_id': 1}).sort('expires_at', 1).limit(excess)
+        ids = [doc['_id'] async for doc in oldest]
+        for start in range(0, len(ids), self.BATCH_SIZE):
+            await self.collection.delete_many({'_id': {'$in': ids[start:start + self.BATCH_SIZE]}})
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+class OSRMCache:
+    """
+    Two-tier cache for OSRM responses: an in-process LRU in front of an
+    optional MongoDB tier. Values found only in MongoDB are promoted to the LRU.
+    """
+
+    def __init__(self, lru: Optional[LRUCache] = None, mongo: Optional[MongoCacheTier] = None, precision: int = 5):
+        self.lru = lru or LRUCache()
+        self.mongo = mongo
+        self.precision = precision
+
+    def key(self, waypoint: Dict[str, float]) -> str:
+        return coordinate_key(waypoint, self.precision)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = self.lru.get_many(keys)
+        if self.mongo is not None and len(found) < len(keys):
+            from_mongo = await self.mongo.get_many([key for key in keys if key not in found])
+            self.lru.set_many(from_mongo)
+            found.update(from_mongo)
+        return found
+
+    async def set_many(self, items: Dict[str, Any]) -> None:
+        self.lru.set_many(items)
+        if self.mongo is not None:
+            await self.mongo.set_many(items)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {'lru': self.lru.stats()}
+        if self.mongo is not None:
+            stats['mongo'] = self.mongo.stats()
+        return stats
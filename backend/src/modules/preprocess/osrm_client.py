@@ -1,6 +1,11 @@
 import httpx
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 import asyncio
+import random
+from .osrm_cache import OSRMCache
+
+# OSRM's osrm-routed default for --max-table-size
+DEFAULT_TABLE_MAX_SIZE = 100
 
 class OSRMClient:
     """
@@ -9,15 +14,295 @@ class OSRMClient:
     Supports:
     - Table service: Get distance/duration matrix between multiple points
     - Route service: Get detailed route between two points with geometry
+    
+    The client is meant to be long-lived (one per application, see `main.py`):
+    it keeps a pooled keep-alive HTTP connection to OSRM, caps the number of
+    in-flight requests and retries 5xx/connection errors with jittered backoff.
+    Call `aclose()` when done with it.
+    
+    With an `OSRMCache`, table entries and route geometries are served from
+    the cache when the same (normalized) coordinates were requested before.
     """
     
-    def __init__(self, base_url: str = "http://osrm:5000"):
+    def __init__(self, base_url: str = "http://osrm:5000", table_max_size: int = DEFAULT_TABLE_MAX_SIZE,
+                 max_connections: int = 20, max_concurrency: int = 20, timeout: float = 30.0,
+                 retries: int = 3, backoff: float = 0.2, cache: Optional[OSRMCache] = None):
         self.base_url = base_url.rstrip('/')
+        self.table_max_size = table_max_size
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+    
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._client.aclose()
+    
+    async def __aenter__(self) -> "OSRMClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def _get(self, url: str) -> Dict[str, Any]:
+        """
+        GET an OSRM URL and return the decoded JSON body.
+        
+        Server errors (5xx) and transport errors are retried up to `retries`
+        times with exponential backoff and full jitter; 4xx responses are
+        raised immediately since retrying them cannot succeed.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url)
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500 or attempt >= self.retries:
+                    raise
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+    
+    async def _get_route_cached(self, key: str, url: str) -> Dict[str, Any]:
+        """GET a route URL, going through the cache when one is configured."""
+        if self.cache is None:
+            return await self._get(url)
+        key = f"route:{key}"
+        found = await self.cache.get_many([key])
+        if key in found:
+            return found[key]
+        data = await self._get(url)
+        # Only the first route is used; alternatives and waypoints are dropped
+        data = {'routes': data['routes'][:1]}
+        await self.cache.set_many({key: data})
+        return data
+    
+    def _route_key(self, waypoints: List[Dict[str, float]]) -> str:
+        return ";".join(self.cache.key(wp) for wp in waypoints) if self.cache is not None else ""
+    
+    async def get_table(self, waypoints: List[Dict[str, float]], annotations: str = "distance,duration") -> Dict[str, List[List[Optional[float]]]]:
+        """
+        Get the full distance and/or duration matrix between all waypoints.
+        
+        A single table request is sent when the waypoints fit in OSRM's table
+        limit. Larger inputs are split into source/destination blocks (using the
+        `sources` and `destinations` parameters) which are requested concurrently
+        and stitched back into one N x N matrix. With a cache configured only the
+        rows that have uncached pairs are requested.
+        
+        Args:
+            waypoints: List of waypoints with lat/lon coordinates
+            annotations: Comma separated OSRM annotations ("distance", "duration")
+            
+        Returns:
+            Dictionary with a 'distances' and/or 'durations' entry, each a 2D list
+            (meters / seconds). Unreachable pairs are None.
+        """
+        n = len(waypoints)
+        keys = [f"{a}s" for a in annotations.split(",")]
+        if self.cache is not None:
+            return await self._get_table_cached(waypoints, keys)
+        everything = list(range(n))
+        rows = await self._fetch_rows(waypoints, everything, everything, annotations)
+        return {key: [rows[key][i] for i in everything] for key in keys}
+    
+    async def _cached_rows(self, coord_keys: List[str]) -> Dict[str, Dict[str, List[Optional[float]]]]:
+        """
+        Cached table rows of the given sources, as {source: {destination: [distance, duration]}}.
+
+        Each source location is one cache entry holding every destination
+        requested from it so far (as [destination, distance, duration] lists,
+        since coordinate keys contain dots MongoDB field names should not), so
+        an N-node table takes N entries rather than N².
+        """
+        found = await self.cache.get_many([f"table:{a}" for a in dict.fromkeys(coord_keys)])
+        return {key[len("table:"):]: {b: [distance, duration] for b, distance, duration in row}
+                for key, row in found.items()}
+    
+    async def _store_rows(self, rows: Dict[str, Dict[str, List[Optional[float]]]],
+                          new_entries: Dict[Tuple[str, str], List[Optional[float]]]) -> None:
+        """Merge new (source, destination) entries into `rows` and write the changed rows back to the cache."""
+        for (a, b), value in new_entries.items():
+            rows.setdefault(a, {})[b] = value
+        changed = {a for a, _ in new_entries}
+        await self.cache.set_many({f"table:{a}": [[b, *value] for b, value in rows[a].items()] for a in changed})
+    
+    async def _get_table_cached(self, waypoints: List[Dict[str, float]], keys: List[str]) -> Dict[str, List[List[Optional[float]]]]:
+        n = len(waypoints)
+        coord_keys = [self.cache.key(wp) for wp in waypoints]
+        rows = await self._cached_rows(coord_keys)
+        
+        missing = {(i, j) for i, a in enumerate(coord_keys) for j, b in enumerate(coord_keys) if b not in rows.get(a, ())}
+        if missing:
+            # Cover the missing pairs with few nodes (typically the new points) and
+            # request their rows and columns rather than the whole matrix
+            cover = _cover_nodes(missing, n)
+            everything = list(range(n))
+            covered = set(cover)
+            others = [i for i in everything if i not in covered]
+            fetched, columns = await asyncio.gather(
+                self._fetch_rows(waypoints, cover, everything, "distance,duration"),
+                self._fetch_rows(waypoints, others, cover, "distance,duration"),
+            )
+            new_entries = {}
+            for i in cover:
+                for j in everything:
+                    new_entries[coord_keys[i], coord_keys[j]] = [fetched['distances'][i][j], fetched['durations'][i][j]]
+            for i in others:
+                for position, j in enumerate(cover):
+                    new_entries[coord_keys[i], coord_keys[j]] = [columns['distances'][i][position], columns['durations'][i][position]]
+            await self._store_rows(rows, new_entries)
+        
+        position = {'distances': 0, 'durations': 1}
+        return {key: [[rows[a][b][position[key]] for b in coord_keys] for a in coord_keys] for key in keys}
+    
+    async def get_table_rect(self, waypoints: List[Dict[str, float]], sources: List[int], destinations: List[int],
+                             annotations: str = "distance,duration") -> Dict[str, List[List[Optional[float]]]]:
+        """
+        Get the sources x destinations part of the table (chunked to the table limit, not cached).
+
+        Returns:
+            Dictionary with 'distances' and/or 'durations' entries whose rows follow
+            `sources` and columns follow `destinations`. Unreachable pairs are None.
+        """
+        rows = await self._fetch_rows(waypoints, sources, destinations, annotations)
+        return {key: [rows[key][i] for i in sources] for key in rows}
+
+    async def get_table_blocks(self, waypoints: List[Dict[str, float]], blocks: List[Tuple[List[int], List[int]]],
+                               annotations: str = "distance,duration") -> Dict[str, List[List[Optional[float]]]]:
+        """
+        Get only the sources x destinations blocks of the table (e.g. from `spatial.candidate_blocks`).
+
+        The blocks are requested concurrently; with a cache configured, blocks
+        whose pairs are all cached are not requested.
+
+        Args:
+            waypoints: List of waypoints with lat/lon coordinates
+            blocks: (sources, destinations) index lists into waypoints
+            annotations: Comma separated OSRM annotations ("distance", "duration")
+
+        Returns:
+            Dictionary with N x N 'distances' and/or 'durations' entries; pairs
+            outside the blocks are None, like unreachable ones.
+        """
+        n = len(waypoints)
+        keys = [f"{a}s" for a in annotations.split(",")]
+        result = {key: [[None] * n for _ in range(n)] for key in keys}
+        if self.cache is None:
+            fetched = await asyncio.gather(*(self._fetch_rows(waypoints, src, dst, annotations) for src, dst in blocks))
+            for (src, dst), rows in zip(blocks, fetched):
+                for key in keys:
+                    for i in src:
+                        target = result[key][i]
+                        for j, value in zip(dst, rows[key][i]):
+                            target[j] = value
+            return result
+
+        coord_keys = [self.cache.key(wp) for wp in waypoints]
+        rows = await self._cached_rows(sorted({coord_keys[i] for src, _ in blocks for i in src}))
+        pending = [(src, dst) for src, dst in blocks
+                   if any(coord_keys[j] not in rows.get(coord_keys[i], ()) for i in src for j in dst)]
+        fetched = await asyncio.gather(*(self._fetch_rows(waypoints, src, dst, "distance,duration") for src, dst in pending))
+        new_entries = {}
+        for (src, dst), block in zip(pending, fetched):
+            for i in src:
+                for position, j in enumerate(dst):
+                    new_entries[coord_keys[i], coord_keys[j]] = [block['distances'][i][position], block['durations'][i][position]]
+        if new_entries:
+            await self._store_rows(rows, new_entries)
+
+        position = {'distances': 0, 'durations': 1}
+        for src, dst in blocks:
+            for i in src:
+                row = rows[coord_keys[i]]
+                for key in keys:
+                    target = result[key][i]
+                    for j in dst:
+                        target[j] = row[coord_keys[j]][position[key]]
+        return result
+
+    async def _fetch_rows(self, waypoints: List[Dict[str, float]], sources: List[int], destinations: List[int], annotations: str) -> Dict[str, Dict[int, List[Optional[float]]]]:
+        """
+        Request the sources x destinations part of the table, chunked to the table limit.
+        
+        Returns, per annotation, a mapping from source index to its row of
+        values aligned with `destinations`.
+        """
+        n = len(waypoints)
+        keys = [f"{a}s" for a in annotations.split(",")]
+        if not sources or not destinations:
+            return {key: {i: [] for i in sources} for key in keys}
+        if n <= self.table_max_size:
+            data = await self._fetch_table(
+                waypoints, annotations,
+                None if len(sources) == n else sources,
+                None if len(destinations) == n else destinations,
+            )
+            return {key: dict(zip(sources, data[key])) for key in keys}
+        
+        # Each block request carries at most table_max_size coordinates
+        chunk = max(1, self.table_max_size // 2)
+        src_blocks = [sources[start:start + chunk] for start in range(0, len(sources), chunk)]
+        dst_blocks = [destinations[start:start + chunk] for start in range(0, len(destinations), chunk)]
+        tasks = []
+        for src in src_blocks:
+            for dst in dst_blocks:
+                tasks.append(self._fetch_table_block(waypoints, src, dst, annotations))
+        block_results = await asyncio.gather(*tasks)
+        
+        column = {j: position for position, j in enumerate(destinations)}
+        result: Dict[str, Dict[int, List[Optional[float]]]] = {
+            key: {i: [None] * len(destinations) for i in sources} for key in keys
+        }
+        for src, dst, data in block_results:
+            for key in keys:
+                matrix = result[key]
+                for row, i in zip(data[key], src):
+                    target = matrix[i]
+                    for value, j in zip(row, dst):
+                        target[column[j]] = value
+        return result
+    
+    async def _fetch_table_block(self, waypoints: List[Dict[str, float]], src: List[int], dst: List[int], annotations: str) -> Tuple[List[int], List[int], Dict[str, Any]]:
+        """Request the src x dst block of the table, sending only the coordinates involved."""
+        if src == dst:
+            data = await self._fetch_table([waypoints[i] for i in src], annotations)
+            return src, dst, data
+        coords = [waypoints[i] for i in src] + [waypoints[j] for j in dst]
+        sources = list(range(len(src)))
+        destinations = list(range(len(src), len(coords)))
+        data = await self._fetch_table(coords, annotations, sources, destinations)
+        return src, dst, data
+    
+    async def _fetch_table(self, waypoints: List[Dict[str, float]], annotations: str, sources: Optional[List[int]] = None, destinations: Optional[List[int]] = None) -> Dict[str, Any]:
+        # Format: "lon1,lat1;lon2,lat2;lon3,lat3"
+        coordinates = ";".join(f"{wp['longitude']},{wp['latitude']}" for wp in waypoints)
+        url = f"{self.base_url}/table/v1/driving/{coordinates}?annotations={annotations}"
+        if sources is not None:
+            url += "&sources=" + ";".join(map(str, sources))
+        if destinations is not None:
+            url += "&destinations=" + ";".join(map(str, destinations))
+        return await self._get(url)
     
     async def get_nearest_neighbors(self, point_id: str, k: int, waypoints: List[Dict[str, float]]) -> List[Tuple[str, float]]:
         """
         Get k nearest neighbors for a given point using OSRM table service.
         
+        Only the row of the source point is requested. To build a k-nearest graph
+        for every waypoint prefer `get_table` once and `CSRGraph.k_nearest`.
+        
         Args:
             point_id: ID of the source point (index in waypoints list)
             k: Number of nearest neighbors to find
@@ -26,35 +311,21 @@ class OSRMClient:
         Returns:
             List of tuples (neighbor_id, distance_in_meters)
         """
-        # Build coordinates string for OSRM table service
-        # Format: "lon1,lat1;lon2,lat2;lon3,lat3"
-        coords = []
-        for wp in waypoints:
-            coords.append(f"{wp['longitude']},{wp['latitude']}")
+        source_idx = int(point_id)
+        data = await self._fetch_table(waypoints, "distance", sources=[source_idx])
         
-        coordinates = ";".join(coords)
+        # Get distances from source point to all other points
+        distances = data['distances'][0]
         
-        # OSRM table service URL - returns distance/duration matrix
-        url = f"{self.base_url}/table/v1/driving/{coordinates}"
+        # Create list of (point_id, distance) tuples, excluding self
+        point_distances = []
+        for i, distance in enumerate(distances):
+            if i != source_idx and distance is not None:
+                point_distances.append((str(i), distance))
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Get distances from source point to all other points
-            source_idx = int(point_id)
-            distances = data['distances'][source_idx]
-            
-            # Create list of (point_id, distance) tuples, excluding self
-            point_distances = []
-            for i, distance in enumerate(distances):
-                if i != source_idx and distance is not None:
-                    point_distances.append((str(i), distance))
-            
-            # Sort by distance and return top k
-            point_distances.sort(key=lambda x: x[1])
-            return point_distances[:k]
+        # Sort by distance and return top k
+        point_distances.sort(key=lambda x: x[1])
+        return point_distances[:k]
     
     async def get_route(self, i: str, j: str, waypoints: List[Dict[str, float]]) -> Dict[str, Any]:
         """
@@ -78,42 +349,52 @@ class OSRMClient:
         # OSRM route service URL with full geometry
         url = f"{self.base_url}/route/v1/driving/{coordinates}?overview=full&geometries=geojson"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract route information
-            route = data['routes'][0]
-            return {
-                'distance': route['distance'],  # meters
-                'duration': route['duration'],  # seconds
-                'geometry': route['geometry']   # GeoJSON LineString
-            } 
+        data = await self._get_route_cached(self._route_key([source, dest]), url)
+        
+        # Extract route information
+        route = data['routes'][0]
+        return {
+            'distance': route['distance'],  # meters
+            'duration': route['duration'],  # seconds
+            'geometry': route['geometry']   # GeoJSON LineString
+        }
     
-    async def get_full_route(self, waypoints: List[Dict[str, float]]) -> Dict[str, Any]:
+    async def get_full_route(self, waypoints: List[Dict[str, float]], legs: bool = False) -> Dict[str, Any]:
         """
         Get route for a sequence of waypoints using OSRM route service.
         Args:
             waypoints: List of waypoints with lat/lon coordinates (ordered)
+            legs: Also return the geometry of every leg between consecutive
+                waypoints, built from the route steps of the same request
         Returns:
-            Route information including distance, duration, and GeoJSON geometry
+            Route information including distance, duration, and GeoJSON geometry.
+            With legs=True a 'legs' list holds distance, duration and geometry per leg.
         """
         if len(waypoints) < 2:
             raise ValueError("At least two waypoints are required for a route.")
         # Format: "lon1,lat1;lon2,lat2;..."
         coordinates = ";".join(f"{wp['longitude']},{wp['latitude']}" for wp in waypoints)
         url = f"{self.base_url}/route/v1/driving/{coordinates}?overview=full&geometries=geojson"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            route = data['routes'][0]
-            return {
-                'distance': route['distance'],
-                'duration': route['duration'],
-                'geometry': route['geometry']
-            } 
+        if legs:
+            url += "&steps=true"
+        key = ("legs:" if legs else "full:") + self._route_key(waypoints)
+        data = await self._get_route_cached(key, url)
+        route = data['routes'][0]
+        result = {
+            'distance': route['distance'],
+            'duration': route['duration'],
+            'geometry': route['geometry']
+        }
+        if legs:
+            result['legs'] = [
+                {
+                    'distance': leg['distance'],
+                    'duration': leg['duration'],
+                    'geometry': _leg_geometry(leg)
+                }
+                for leg in route['legs']
+            ]
+        return result
     
     async def get_duration_matrix(self, waypoints: List[Dict[str, float]]) -> Any:
         """
@@ -123,11 +404,35 @@ class OSRMClient:
         Returns:
             durations: 2D list of durations in seconds
         """
-        coords = [f"{wp['longitude']},{wp['latitude']}" for wp in waypoints]
-        coordinates = ";".join(coords)
-        url = f"{self.base_url}/table/v1/driving/{coordinates}?annotations=duration"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return data['durations'] 
\ No newline at end of file
+        table = await self.get_table(waypoints, annotations="duration")
+        return table['durations']
+
+
+def _cover_nodes(pairs: set, n: int) -> List[int]:
+    """Pick nodes so every missing (i, j) pair has i or j in the result."""
+    # Nodes whose whole row is missing (new or never seen points) are always
+    # taken; the greedy pass then only sees the few pairs left over
+    row_counts: Dict[int, int] = {}
+    for i, _ in pairs:
+        row_counts[i] = row_counts.get(i, 0) + 1
+    cover = {i for i, count in row_counts.items() if count == n}
+    remaining = {(i, j) for i, j in pairs if i not in cover and j not in cover}
+    while remaining:
+        counts: Dict[int, int] = {}
+        for i, j in remaining:
+            counts[i] = counts.get(i, 0) + 1
+            counts[j] = counts.get(j, 0) + 1
+        node = max(counts, key=counts.get)
+        cover.add(node)
+        remaining = {(i, j) for i, j in remaining if i != node and j != node}
+    return sorted(cover)
+
+def _leg_geometry(leg: Dict[str, Any]) -> Dict[str, Any]:
+    """Join the step geometries of an OSRM route leg into one GeoJSON LineString."""
+    coordinates: List[List[float]] = []
+    for step in leg.get('steps', []):
+        for point in step['geometry']['coordinates']:
+            # Consecutive steps share their boundary point
+            if not coordinates or coordinates[-1] != point:
+                coordinates.append(point)
+    return {'type': 'LineString', 'coordinates': coordinates}
@@ -0,0 +1,138 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS = 6_371_008.8  # mean radius in meters
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (NumPy broadcasting over array arguments)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class GridIndex:
+    """
+    Uniform grid over points projected to meters, for nearest and radius queries.
+
+    Coordinates are projected equirectangularly around the mean latitude,
+    which is accurate to well under a percent at city scale. The grid only
+    selects candidate cells; results are ranked by exact haversine distance.
+    """
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float], cell_size: Optional[float] = None):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        n = len(self.latitudes)
+        self._cos_lat = math.cos(math.radians(float(self.latitudes.mean()))) if n else 1.0
+        self.xy = self._project(self.latitudes, self.longitudes)
+        if cell_size is None:
+            # About 4 points per cell on evenly spread data (points along a line
+            # count the line's length squared over n as their area)
+            extent = np.ptp(self.xy, axis=0) if n else np.zeros(2)
+            area = max(extent[0] * extent[1], extent.max() ** 2 / max(n, 1), 1.0)
+            cell_size = math.sqrt(area * 4 / max(n, 1))
+        self.cell_size = float(cell_size)
+        cells = np.floor(self.xy / self.cell_size).astype(np.int64)
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if n:
+            order = np.lexsort((cells[:, 1], cells[:, 0]))
+            keys = cells[order]
+            starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for group in np.split(order, starts):
+                self._cells[(int(cells[group[0], 0]), int(cells[group[0], 1]))] = group
+        self._cell_keys = np.array(list(self._cells), dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def _project(self, latitudes, longitudes) -> np.ndarray:
+        lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        return np.stack((EARTH_RADIUS * lon * self._cos_lat, EARTH_RADIUS * lat), axis=-1)
+
+    def _ring(self, cx: int, cy: int, r: int) -> List[np.ndarray]:
+        """Points in the cells at Chebyshev distance r from cell (cx, cy)."""
+        if r == 0:
+            found = self._cells.get((cx, cy))
+            return [found] if found is not None else []
+        if (2 * r + 1) ** 2 > 4 * len(self._cells):
+            # Sparse grid: scanning the occupied cells beats walking the ring
+            d = np.maximum(np.abs(self._cell_keys[:, 0] - cx), np.abs(self._cell_keys[:, 1] - cy))
+            return [self._cells[(int(x), int(y))] for x, y in self._cell_keys[d == r]]
+        groups = []
+        for x in range(cx - r, cx + r + 1):
+            for y in (cy - r, cy + r) if abs(x - cx) < r else range(cy - r, cy + r + 1):
+                found = self._cells.get((x, y))
+                if found is not None:
+                    groups.append(found)
+        return groups
+
+    def nearest(self, latitude: float, longitude: float, count: int) -> np.ndarray:
+        """Indices of the `count` points nearest to (latitude, longitude), nearest first."""
+        count = min(count, len(self))
+        if count <= 0:
+            return np.empty(0, dtype=np.int64)
+        point = self._project(latitude, longitude)
+        cx, cy = (int(c) for c in np.floor(point / self.cell_size))
+        max_ring = int(np.abs(self._cell_keys - (cx, cy)).max())
+        groups: List[np.ndarray] = []
+        found = 0
+        for r in range(max_ring + 1):
+            ring = self._ring(cx, cy, r)
+            groups.extend(ring)
+            found += sum(len(g) for g in ring)
+            if found >= count:
+                # Cells beyond ring r are at least r cells away from the query point
+                candidates = np.concatenate(groups)
+                projected = np.sort(np.hypot(*(self.xy[candidates] - point).T))
+                if projected[count - 1] <= r * self.cell_size:
+                    break
+        candidates = np.concatenate(groups)
+        dist = haversine(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        best = np.argsort(dist, kind="stable")[:count]
+        return candidates[best]
+
+    def within(self, latitude: float, longitude: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and haversine distances of the points within `radius` meters, nearest first."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        point = self._project(latitude, longitude)
+        # 1% slack for the projection error
+        lo = np.floor((point - radius * 1.01) / self.cell_size).astype(np.int64)
+        hi = np.floor((point + radius * 1.01) / self.cell_size).astype(np.int64)
+        inside = np.all((self._cell_keys >= lo) & (self._cell_keys <= hi), axis=1)
+        groups = [self._cells[(int(x), int(y))] for x, y in self._cell_keys[inside]]
+        if not groups:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidates = np.concatenate(groups)
+        dist = haversine(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        keep = dist <= radius
+        order = np.argsort(dist[keep], kind="stable")
+        return candidates[keep][order], dist[keep][order]
+
+def candidate_blocks(latitudes: Sequence[float], longitudes: Sequence[float],
+                     candidates: int) -> List[Tuple[List[int], List[int]]]:
+    """
+    Source/destination blocks covering every point's `candidates` nearest points.
+
+    Sources are grouped by grid cell order into blocks of about `candidates`
+    points; a block's destinations are the union of its sources' nearest
+    points. Nearby sources share most of their candidates, so the blocks hold
+    roughly N·c table entries instead of N².
+    """
+    index = GridIndex(latitudes, longitudes)
+    n = len(index)
+    if n == 0:
+        return []
+    nearest = [index.nearest(index.latitudes[i], index.longitudes[i], candidates + 1) for i in range(n)]
+    # Row-major cell order keeps each block spatially compact
+    cells = np.floor(index.xy / (index.cell_size * max(1.0, math.sqrt(candidates / 4)))).astype(np.int64)
+    order = np.lexsort((cells[:, 0], cells[:, 1])).tolist()
+    size = max(1, candidates)
+    blocks = []
+    for start in range(0, n, size):
+        sources = sorted(order[start:start + size])
+        destinations = sorted(set(np.concatenate([nearest[i] for i in sources]).tolist()))
+        blocks.append((sources, destinations))
+    return blocks
@@ -1,145 +1,58 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from modules.benchmark.runner import benchmark_algorithms
-from modules.models.doctor import Doctor
-from modules.models.user import User
-from modules.preprocess.graph_builder import Node, build_sparse_graph
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from typing import Dict, Any, Optional
+from modules.models.benchmark_job import BenchmarkRequest, BenchmarkJob
 from modules.preprocess.osrm_client import OSRMClient
-from modules.config import OSRM_BASE_URL
-from modules.algorithms.tsp_solver import solve_tsp
-from modules.algorithms.dijkstra_all_pairs import dijkstra_route
-from modules.algorithms.bellman_ford_all_pairs import bellman_ford_route
-from modules.algorithms.floyd_warshall import floyd_warshall_route
+from modules.preprocess.matrix_store import MatrixStore
+from modules.services.compute import ComputeExecutor
+from modules.services.benchmark import execute_benchmark
+from modules.services.benchmark_jobs import BenchmarkJobQueue
+from modules.services.region_matrix import sync_matrix_store
+from modules.algorithms.tsp_solver import tsp_cache_stats
+from modules.dependencies import get_osrm_client, get_compute_executor, get_job_queue, get_matrix_store
 
 router = APIRouter(prefix="/api/benchmark", tags=["benchmark"])
 
-class BenchmarkRequest(BaseModel):
-    doctorId: str
-    userIds: List[str]
-    algorithm: str = "tsp"
-    priorities: Optional[Dict[str, bool]] = None
+@router.get("/cache", response_model=Dict[str, Any])
+async def osrm_cache_stats(osrm_client: OSRMClient = Depends(get_osrm_client)):
+    if osrm_client.cache is None:
+        return {"enabled": False, "tsp": tsp_cache_stats()}
+    return {"enabled": True, **osrm_client.cache.stats(), "tsp": tsp_cache_stats()}
+
+@router.get("/executor", response_model=Dict[str, Any])
+async def compute_executor_stats(compute: ComputeExecutor = Depends(get_compute_executor)):
+    return compute.stats()
+
+@router.get("/matrix", response_model=Dict[str, Any])
+async def matrix_store_stats(matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
+    if matrix_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **matrix_store.stats()}
+
+@router.post("/matrix/sync", response_model=Dict[str, Any], status_code=202)
+async def sync_matrix(background_tasks: BackgroundTasks,
+                      matrix_store: Optional[MatrixStore] = Depends(get_matrix_store),
+                      osrm_client: OSRMClient = Depends(get_osrm_client)):
+    if matrix_store is None:
+        raise HTTPException(status_code=409, detail="Matrix store is disabled (MATRIX_STORE_DIR is not set)")
+    background_tasks.add_task(sync_matrix_store, matrix_store, osrm_client)
+    return {"status": "syncing"}
 
 @router.post("/", response_model=Dict[str, Any])
-async def run_benchmark(data: BenchmarkRequest):
-    # Fetch doctor and users from DB
-    doctor = await Doctor.get(data.doctorId)
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor not found")
-    users = [await User.get(uid) for uid in data.userIds]
-    if any(u is None for u in users):
-        raise HTTPException(status_code=404, detail="One or more users not found")
-
-    # Build waypoints: doctor first, then users
-    waypoints = [Node("0", doctor.latitude, doctor.longitude)]
-    for i, user in enumerate(users, 1):
-        if user is not None:
-            waypoints.append(Node(str(i), user.latitude, user.longitude))
-
-    # Build sparse graph (adjacency list)
-    osrm_client = OSRMClient(base_url=OSRM_BASE_URL)
-    k = 4  # or load from config
-    adj_list = await build_sparse_graph(waypoints, k, osrm_client)
-
-    # Build adjacency matrix for Floyd-Warshall
-    n = len(waypoints)
-    adj_matrix = [[float('inf')] * n for _ in range(n)]
-    for i in range(n):
-        adj_matrix[i][i] = 0.0
-    for i, neighbors in adj_list.items():
-        for j, w in neighbors:
-            adj_matrix[i][j] = w
-
-    # --- NEW: Apply priorities to adjacency/duration matrix for Bellman-Ford and Floyd-Warshall ---
-    if data.priorities and data.algorithm in ("bellmanFord", "floydWarshall"):
-        idx_to_userid = {i: data.userIds[i-1] for i in range(1, n)}
-        idx_to_userid[0] = data.doctorId
-        for from_idx in range(n):
-            user_id = idx_to_userid.get(from_idx)
-            if user_id and data.priorities.get(user_id):
-                for to_idx in range(n):
-                    if from_idx != to_idx and adj_matrix[from_idx][to_idx] > 0:
-                        adj_matrix[from_idx][to_idx] = -1e6  # Strong negative edge
-    # --- END NEW ---
-
-    # --- NEW: Rebuild adj_list from adj_matrix for Bellman-Ford ---
-    def matrix_to_adj_list(matrix):
-        n = len(matrix)
-        adj_list = {}
-        for i in range(n):
-            adj_list[i] = []
-            for j in range(n):
-                if i != j and matrix[i][j] != float('inf'):
-                    adj_list[i].append((j, matrix[i][j]))
-        return adj_list
-    if data.algorithm == "bellmanFord":
-        adj_list = matrix_to_adj_list(adj_matrix)
-    # --- END NEW ---
-
-    # Run benchmarks
-    results = benchmark_algorithms(adj_matrix, adj_list)
-
-    # Determine visiting order based on selected algorithm
-    start_idx = 0
-    user_indices = list(range(1, n))
-    visiting_order = []
-    if data.algorithm == "tsp":
-        visiting_order = solve_tsp(adj_matrix)
-    elif data.algorithm == "dijkstra":
-        visiting_order = dijkstra_route(adj_list, start_idx, user_indices)
-    elif data.algorithm == "bellmanFord":
-        idx_to_userid = {i: data.userIds[i-1] for i in range(1, n)}
-        idx_to_userid[0] = data.doctorId
-        visiting_order = bellman_ford_route(
-            adj_list, start_idx, user_indices,
-            priorities=data.priorities,
-            idx_to_userid=idx_to_userid
-        )
-    elif data.algorithm == "floydWarshall":
-        visiting_order = floyd_warshall_route(adj_matrix, start_idx, user_indices)
-    else:
-        visiting_order = [0] + user_indices  # fallback: doctor then users in order
-
-    # Ensure visiting_order is valid and starts at 0
-    if not visiting_order or visiting_order[0] != 0:
-        visiting_order = [0] + [i for i in user_indices if i != 0]
-
-    # Map visiting_order indices to coordinates
-    ordered_coords = [
-        {"latitude": waypoints[i].latitude, "longitude": waypoints[i].longitude}
-        for i in visiting_order
-    ]
-
-    # Get full route geometry for the visiting order
-    visiting_order_route = await osrm_client.get_full_route(ordered_coords)
-
-    # Get route geometry for each segment (as before)
-    route_geojson = []
-    for i in range(1, len(visiting_order)):
-        i_from = visiting_order[i - 1]
-        i_to = visiting_order[i]
-        route = await osrm_client.get_route(str(i_from), str(i_to), [
-            {"latitude": wp.latitude, "longitude": wp.longitude} for wp in waypoints
-        ])
-        route_geojson.append(route['geometry'])
-
-    # --- NEW: Get total time for the optimal route ---
-    # Get duration matrix for all waypoints
-    waypoint_dicts = [{"latitude": wp.latitude, "longitude": wp.longitude} for wp in waypoints]
-    durations = await osrm_client.get_duration_matrix(waypoint_dicts)
-    total_time = 0.0
-    for i in range(1, len(visiting_order)):
-        from_idx = visiting_order[i-1]
-        to_idx = visiting_order[i]
-        seg_time = durations[from_idx][to_idx]
-        if seg_time is not None:
-            total_time += seg_time
-    results['totalTime'] = total_time
-    # --- END NEW ---
-
-    if data.algorithm == "tsp":
-        results['routeGeoJSON'] = route_geojson
-    else:
-        results['routeGeoJSON'] = [visiting_order_route['geometry']]
-    results['tspRouteOrder'] = visiting_order
-    return results 
\ No newline at end of file
+async def run_benchmark(data: BenchmarkRequest,
+                        osrm_client: OSRMClient = Depends(get_osrm_client),
+                        compute: ComputeExecutor = Depends(get_compute_executor),
+                        matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
+    return await execute_benchmark(data, osrm_client, compute, matrix_store=matrix_store)
+
+@router.post("/jobs", response_model=Dict[str, Any], status_code=202)
+async def submit_benchmark_job(data: BenchmarkRequest, queue: BenchmarkJobQueue = Depends(get_job_queue)):
+    job = await queue.submit(data)
+    return {"id": str(job.id), "status": job.status}
+
+# Declared last so it doesn't shadow the fixed GET paths above
+@router.get("/{job_id}", response_model=BenchmarkJob)
+async def get_benchmark_job(job_id: str):
+    job = await BenchmarkJob.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Benchmark job not found")
+    return job
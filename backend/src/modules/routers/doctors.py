@@ -1,42 +1,85 @@
-from fastapi import APIRouter, HTTPException
-from modules.models.doctor import Doctor
-from typing import List
-from modules.services.crud import add_recommendation, list_recommendations
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from modules.models.doctor import Doctor, DoctorListItem
+from typing import Any, Dict, List, Optional
+from modules.config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+from modules.services.pagination import list_page, parse_fields, stream_ndjson
+from modules.services.region_matrix import location_key, store_location, forget_location
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+from modules.dependencies import get_matrix_store, get_osrm_client
+from modules.services.crud import add_recommendation, list_recommendations, users_near
 from modules.models.recommendation import Recommendation
 
 router = APIRouter(prefix="/api/doctors", tags=["doctors"])
 
 @router.post("/", response_model=Doctor)
-async def create_doctor(doctor: Doctor):
+async def create_doctor(doctor: Doctor, background_tasks: BackgroundTasks,
+                        matrix_store: Optional[MatrixStore] = Depends(get_matrix_store),
+                        osrm_client: OSRMClient = Depends(get_osrm_client)):
     await doctor.insert()
+    if matrix_store is not None:
+        background_tasks.add_task(store_location, matrix_store, osrm_client, location_key("doctor", doctor.id), doctor.latitude, doctor.longitude)
     return doctor
 
-@router.get("/", response_model=List[Doctor])
-async def list_doctors():
-    return await Doctor.find_all().to_list()
+@router.get("/", response_model=List[DoctorListItem], response_model_exclude_unset=True)
+async def list_doctors(response: Response,
+                       after: Optional[str] = Query(None, description="Return doctors after this id (X-Next-Cursor of the previous page)"),
+                       limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+                       fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. name,latitude,longitude"),
+                       format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every doctor after `after`")):
+    projection = parse_fields(Doctor, fields)
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(Doctor, after, projection), media_type="application/x-ndjson")
+    page, next_cursor = await list_page(Doctor, after, limit, projection)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @router.put("/{doctor_id}", response_model=Doctor)
-async def update_doctor(doctor_id: str, doctor: Doctor):
+async def update_doctor(doctor_id: str, doctor: Doctor, background_tasks: BackgroundTasks,
+                        matrix_store: Optional[MatrixStore] = Depends(get_matrix_store),
+                        osrm_client: OSRMClient = Depends(get_osrm_client)):
     db_doctor = await Doctor.get(doctor_id)
     if not db_doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     doctor.id = db_doctor.id
     await doctor.replace()
+    if matrix_store is not None:
+        # No-op unless the doctor moved
+        background_tasks.add_task(store_location, matrix_store, osrm_client, location_key("doctor", doctor.id), doctor.latitude, doctor.longitude)
     return doctor
 
 @router.delete("/{doctor_id}")
-async def delete_doctor(doctor_id: str):
+async def delete_doctor(doctor_id: str, matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
     doctor = await Doctor.get(doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
     await doctor.delete()
+    if matrix_store is not None:
+        await forget_location(matrix_store, location_key("doctor", doctor.id))
+    await Recommendation.find(Recommendation.doctor_id == doctor.id).delete()
     return {"ok": True}
 
+@router.get("/{doctor_id}/patients", response_model=List[Dict[str, Any]])
+async def patients_within_radius(doctor_id: str,
+                                 radius: float = Query(5000, gt=0, description="Straight-line radius in meters"),
+                                 limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE)):
+    """Users within `radius` meters of the doctor, nearest first, each with its `distance`."""
+    doctor = await Doctor.get(doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return await users_near(doctor.latitude, doctor.longitude, radius, limit)
+
 @router.post("/{doctor_id}/recommendations", response_model=Recommendation)
 async def create_recommendation(doctor_id: str, rec: Recommendation):
-    doctor = await add_recommendation(doctor_id, Recommendation(**rec.model_dump()))
-    return (doctor.recommendations or [])[-1]
+    return await add_recommendation(doctor_id, rec)
 
 @router.get("/{doctor_id}/recommendations", response_model=List[Recommendation])
-async def get_recommendations(doctor_id: str):
-    return await list_recommendations(doctor_id) 
\ No newline at end of file
+async def get_recommendations(doctor_id: str, response: Response,
+                              after: Optional[str] = Query(None, description="Return recommendations older than this id (X-Next-Cursor of the previous page)"),
+                              limit: int = Query(50, ge=1, le=LIST_MAX_PAGE_SIZE)):
+    page, next_cursor = await list_recommendations(doctor_id, after, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
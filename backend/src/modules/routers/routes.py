@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from typing import Any, Dict, Optional
+from modules.models.batch_routing import BatchRoutingRequest
+from modules.models.route_session import RouteSessionRequest, RouteSessionPatch
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+from modules.services.batch_routing import execute_batch_routing
+from modules.services.compute import ComputeExecutor
+from modules.services.route_sessions import create_session, patch_session, get_session, delete_session
+from modules.dependencies import get_osrm_client, get_compute_executor, get_matrix_store
+
+router = APIRouter(prefix="/api/routes", tags=["routes"])
+
+@router.post("/sessions", response_model=Dict[str, Any], status_code=201)
+async def create_route_session(data: RouteSessionRequest,
+                               osrm_client: OSRMClient = Depends(get_osrm_client),
+                               compute: ComputeExecutor = Depends(get_compute_executor),
+                               matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
+    """Solve a doctor's route and keep its graph, distances and tour for incremental edits."""
+    return await create_session(data, osrm_client, compute, matrix_store)
+
+@router.get("/sessions/{session_id}", response_model=Dict[str, Any])
+async def get_route_session(session_id: str):
+    return get_session(session_id).view()
+
+@router.patch("/sessions/{session_id}", response_model=Dict[str, Any])
+async def edit_route_session(session_id: str, patch: RouteSessionPatch,
+                             osrm_client: OSRMClient = Depends(get_osrm_client),
+                             compute: ComputeExecutor = Depends(get_compute_executor),
+                             matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
+    """Add/remove users or change priorities without solving the route from scratch."""
+    return await patch_session(get_session(session_id), patch, osrm_client, compute, matrix_store)
+
+@router.delete("/sessions/{session_id}")
+async def delete_route_session(session_id: str):
+    delete_session(session_id)
+    return {"ok": True}
+
+@router.post("/batch", response_model=Dict[str, Any])
+async def plan_batch_routes(data: BatchRoutingRequest,
+                            osrm_client: OSRMClient = Depends(get_osrm_client),
+                            compute: ComputeExecutor = Depends(get_compute_executor),
+                            matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
+    """Assign patients to several doctors and solve every doctor's tour over one shared matrix."""
+    return await execute_batch_routing(data, osrm_client, compute, matrix_store)
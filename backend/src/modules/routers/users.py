@@ -1,31 +1,59 @@
-from fastapi import APIRouter, HTTPException
-from modules.models.user import User
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from modules.models.user import User, UserListItem
+from typing import List, Optional
+from modules.config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+from modules.services.pagination import list_page, parse_fields, stream_ndjson
+from modules.services.region_matrix import location_key, store_location, forget_location
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+from modules.dependencies import get_matrix_store, get_osrm_client
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.post("/", response_model=User)
-async def create_user(user: User):
+async def create_user(user: User, background_tasks: BackgroundTasks,
+                      matrix_store: Optional[MatrixStore] = Depends(get_matrix_store),
+                      osrm_client: OSRMClient = Depends(get_osrm_client)):
     await user.insert()
+    if matrix_store is not None:
+        background_tasks.add_task(store_location, matrix_store, osrm_client, location_key("user", user.id), user.latitude, user.longitude)
     return user
 
-@router.get("/", response_model=List[User])
-async def list_users():
-    return await User.find_all().to_list()
+@router.get("/", response_model=List[UserListItem], response_model_exclude_unset=True)
+async def list_users(response: Response,
+                     after: Optional[str] = Query(None, description="Return users after this id (X-Next-Cursor of the previous page)"),
+                     limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+                     fields: Optional[str] = Query(None, description="Comma separated fields to return, e.g. name,latitude,longitude"),
+                     format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every user after `after`")):
+    projection = parse_fields(User, fields)
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(User, after, projection), media_type="application/x-ndjson")
+    page, next_cursor = await list_page(User, after, limit, projection)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @router.put("/{user_id}", response_model=User)
-async def update_user(user_id: str, user: User):
+async def update_user(user_id: str, user: User, background_tasks: BackgroundTasks,
+                      matrix_store: Optional[MatrixStore] = Depends(get_matrix_store),
+                      osrm_client: OSRMClient = Depends(get_osrm_client)):
     db_user = await User.get(user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     user.id = db_user.id
     await user.replace()
+    if matrix_store is not None:
+        # No-op unless the user moved
+        background_tasks.add_task(store_location, matrix_store, osrm_client, location_key("user", user.id), user.latitude, user.longitude)
     return user
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: str):
+async def delete_user(user_id: str, matrix_store: Optional[MatrixStore] = Depends(get_matrix_store)):
     user = await User.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     await user.delete()
+    if matrix_store is not None:
+        await forget_location(matrix_store, location_key("user", user.id))
     return {"ok": True} 
\ No newline at end of file
@@ -0,0 +1,192 @@
+import asyncio
+import math
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from modules.algorithms.assignment import assign_capacitated
+from modules.algorithms.tsp_heuristic import solve_tsp_heuristic
+from modules.algorithms.tsp_solver import solve_tsp, solve_vrp, FIRST_SOLUTION_STRATEGIES, METAHEURISTICS
+from modules.config import (
+    BENCHMARK_TIMEOUT, BATCH_MAX_DOCTORS, BATCH_CAPACITY_SLACK, BATCH_TIME_LIMIT,
+    TSP_TIME_LIMIT, TSP_FIRST_SOLUTION, TSP_METAHEURISTIC, TSP_HEURISTIC_TIME_LIMIT,
+)
+from modules.models.batch_routing import BatchRoutingRequest
+from modules.models.doctor import Doctor
+from modules.models.user import User
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+from modules.services.compute import ComputeExecutor
+from modules.services.crud import get_locations
+from modules.services.region_matrix import location_key
+
+ASSIGNMENTS = ("vrp", "cluster")
+TOUR_ALGORITHMS = ("tsp", "tspHeuristic")
+
+async def load_matrix(keys: List[str], coords: List[Tuple[float, float]], osrm_client: OSRMClient,
+                      matrix_store: Optional[MatrixStore] = None) -> Tuple[np.ndarray, np.ndarray, str]:
+    """
+    Full distance and duration matrices between all locations (NaN where unreachable).
+    Returns:
+        (distances, durations, source): source is "store" or "osrm"
+    """
+    if matrix_store is not None:
+        stored = matrix_store.submatrix(keys, coords)
+        if stored is not None:
+            return stored[0], stored[1], "store"
+    table = await osrm_client.get_table([{'latitude': lat, 'longitude': lon} for lat, lon in coords])
+    if not table.get('distances'):
+        raise HTTPException(status_code=502, detail="OSRM table request failed")
+    distances, durations = (np.array(table[key], dtype=np.float64) for key in ('distances', 'durations'))
+    return distances, durations, "osrm"
+
+def solve_cluster_tour(distances: np.ndarray, nodes: List[int], priority: Set[int], algorithm: str,
+                       options: Dict[str, Any]) -> List[int]:
+    """
+    Closed tour of one doctor (nodes[0]) through its assigned nodes, as indices into the shared matrix.
+
+    Runs on the compute executor; the doctor's submatrix is cut here so only
+    the shared matrix and index lists cross to a worker.
+    """
+    sub = distances[np.ix_(nodes, nodes)]
+    local_priority = {i for i, node in enumerate(nodes) if node in priority}
+    if algorithm == "tspHeuristic":
+        tour = solve_tsp_heuristic(sub, local_priority, **options)
+    else:
+        tour = solve_tsp(sub, local_priority, **options)
+    return [nodes[i] for i in tour]
+
+async def execute_batch_routing(data: BatchRoutingRequest, osrm_client: OSRMClient, compute: ComputeExecutor,
+                                matrix_store: Optional[MatrixStore] = None) -> Dict[str, Any]:
+    """
+    Plan the routes of several doctors over one shared set of patients.
+
+    One distance matrix covers every doctor and patient (from the matrix
+    store, or a single OSRM table request). With assignment "vrp" a
+    multi-vehicle OR-Tools model assigns and orders the patients together;
+    with "cluster" patients are assigned to doctors by capacitated regret
+    insertion and each doctor's tour is then solved on its own submatrix,
+    in parallel on the compute executor.
+    """
+    doctor_ids, user_ids = list(data.doctorIds), list(data.userIds)
+    if not doctor_ids:
+        raise HTTPException(status_code=400, detail="At least one doctor is required")
+    if len(doctor_ids) > BATCH_MAX_DOCTORS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_DOCTORS} doctors per request")
+    if len(set(doctor_ids)) != len(doctor_ids) or len(set(user_ids)) != len(user_ids):
+        raise HTTPException(status_code=400, detail="Duplicate doctors or users in the request")
+    if data.assignment not in ASSIGNMENTS:
+        raise HTTPException(status_code=400, detail=f"Unknown assignment: {data.assignment}")
+    if data.tourAlgorithm not in TOUR_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"Unknown tour algorithm: {data.tourAlgorithm}")
+    first_solution = TSP_FIRST_SOLUTION if data.tspFirstSolution is None else data.tspFirstSolution
+    metaheuristic = TSP_METAHEURISTIC if data.tspMetaheuristic is None else data.tspMetaheuristic
+    if first_solution not in FIRST_SOLUTION_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown TSP first solution strategy: {first_solution}")
+    if metaheuristic not in METAHEURISTICS:
+        raise HTTPException(status_code=400, detail=f"Unknown TSP metaheuristic: {metaheuristic}")
+    capacity = data.capacity
+    if capacity is None:
+        capacity = max(1, math.ceil(len(user_ids) / len(doctor_ids) * BATCH_CAPACITY_SLACK))
+    if capacity * len(doctor_ids) < len(user_ids):
+        raise HTTPException(status_code=400,
+                            detail=f"{len(user_ids)} users exceed {len(doctor_ids)} doctors x capacity {capacity}")
+
+    (doctors, missing_doctors), (users, missing_users) = await asyncio.gather(
+        get_locations(Doctor, doctor_ids),
+        get_locations(User, user_ids),
+    )
+    if missing_doctors:
+        raise HTTPException(status_code=404, detail=f"Doctors not found: {', '.join(missing_doctors)}")
+    if missing_users:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(missing_users)}")
+
+    # Nodes: doctors 0..D-1, then users D..D+U-1
+    ids = doctor_ids + user_ids
+    locations = [doctors[i] for i in doctor_ids] + [users[i] for i in user_ids]
+    coords = [(location.latitude, location.longitude) for location in locations]
+    keys = [location_key("doctor", i) for i in doctor_ids] + [location_key("user", i) for i in user_ids]
+    started = time.perf_counter()
+    distances, durations, source = await load_matrix(keys, coords, osrm_client, matrix_store)
+    timings: Dict[str, Any] = {'matrixTime': time.perf_counter() - started}
+
+    depots = list(range(len(doctor_ids)))
+    priority = {i for i, user_id in enumerate(ids) if i >= len(depots) and (data.priorities or {}).get(user_id)}
+    if data.assignment == "vrp":
+        routes, timings['vrp'] = await compute.run(
+            solve_vrp, distances, depots, capacity, priority,
+            BATCH_TIME_LIMIT if data.tspTimeLimit is None else data.tspTimeLimit, first_solution, metaheuristic,
+            timeout=BENCHMARK_TIMEOUT,
+        )
+        if not routes:
+            raise HTTPException(status_code=422, detail="No feasible routes found")
+    else:
+        assigned, timings['assignment'] = await compute.run(
+            assign_capacitated, distances, depots, capacity, timeout=BENCHMARK_TIMEOUT,
+        )
+        if data.tourAlgorithm == "tspHeuristic":
+            options = {'time_limit': TSP_HEURISTIC_TIME_LIMIT if data.tspTimeLimit is None else data.tspTimeLimit}
+        else:
+            options = {'time_limit': TSP_TIME_LIMIT if data.tspTimeLimit is None else data.tspTimeLimit,
+                       'first_solution': first_solution, 'metaheuristic': metaheuristic}
+        # At most one tour per worker at a time: the executor rejects jobs past its queue
+        slots = asyncio.Semaphore(compute.max_workers)
+
+        async def tour(depot: int):
+            nodes = [depot] + assigned[depot]
+            if len(nodes) == 1:
+                return [depot, depot], None
+            tour_options = options
+            if data.tourAlgorithm == "tsp":
+                # Warm-starts from the doctor's last tour, shared with the single-doctor benchmark
+                tour_options = {**options, 'node_keys': [ids[i] for i in nodes], 'warm_start_key': ids[depot]}
+            async with slots:
+                return await compute.run(
+                    solve_cluster_tour, distances, nodes, priority, data.tourAlgorithm, tour_options,
+                    timeout=BENCHMARK_TIMEOUT,
+                )
+
+        solved = await asyncio.gather(*(tour(depot) for depot in depots))
+        routes = [route for route, _ in solved]
+        timings['tours'] = {doctor_ids[depot]: timing for depot, (_, timing) in zip(depots, solved) if timing}
+
+    results = []
+    for route in routes:
+        legs = list(zip(route, route[1:]))
+        distance = float(sum(distances[a, b] for a, b in legs))
+        results.append({
+            "doctorId": ids[route[0]],
+            "userIds": [ids[i] for i in route[1:-1]],
+            "order": [ids[i] for i in route],
+            "tspRouteOrder": route,
+            "coordinates": [{"latitude": coords[i][0], "longitude": coords[i][1]} for i in route],
+            "totalDistance": distance if np.isfinite(distance) else None,
+            # Unreachable legs are not counted
+            "totalTime": float(np.nansum([durations[a, b] for a, b in legs])),
+        })
+
+    if data.geometry:
+        visiting = [result for result in results if result["userIds"]]
+        geometries = await asyncio.gather(
+            *(osrm_client.get_full_route(result["coordinates"]) for result in visiting),
+            return_exceptions=True,
+        )
+        for result, geometry in zip(visiting, geometries):
+            if isinstance(geometry, Exception):
+                print(f"Route geometry for doctor {result['doctorId']} failed: {geometry}")
+                result["routeGeoJSON"] = None
+            else:
+                result["routeGeoJSON"] = geometry["geometry"]
+
+    served = {user_id for result in results for user_id in result["userIds"]}
+    return {
+        "routes": results,
+        "unassigned": [user_id for user_id in user_ids if user_id not in served],
+        "capacity": capacity,
+        "totalDistance": float(sum(result["totalDistance"] or 0.0 for result in results)),
+        "totalTime": float(sum(result["totalTime"] for result in results)),
+        "matrixSource": source,
+        "computeTimings": timings,
+    }
@@ -0,0 +1,273 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from modules.benchmark.runner import benchmark_algorithms, ALGORITHMS, VARIANTS
+from modules.benchmark.harness import HarnessConfig
+from modules.models.benchmark_job import BenchmarkRequest, HarnessOptions
+from modules.models.doctor import Doctor
+from modules.models.user import User
+from modules.preprocess.graph_builder import Node, RoutingGraph, build_graph, graph_from_table
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+from modules.services.compute import ComputeExecutor
+from modules.services.crud import get_locations
+from modules.services.region_matrix import location_key
+from modules.algorithms.tsp_solver import solve_tsp, FIRST_SOLUTION_STRATEGIES, METAHEURISTICS
+from modules.algorithms.tsp_heuristic import solve_tsp_heuristic, CONSTRUCTIONS
+from modules.algorithms.dijkstra_all_pairs import dijkstra_route
+from modules.algorithms.bellman_ford_all_pairs import bellman_ford_route, spfa_route, NegativeCycleError
+from modules.algorithms.floyd_warshall import floyd_warshall_route, floyd_warshall_numpy, FLOYD_WARSHALL_IMPLEMENTATIONS
+from modules.algorithms.johnson import johnson_route
+from modules.config import (
+    FLOYD_WARSHALL_IMPL, GRAPH_K, GRAPH_PREFILTER_MIN_NODES, GRAPH_PREFILTER_FACTOR, DIJKSTRA_WORKERS, DIJKSTRA_PARALLEL_MIN_NODES, BENCHMARK_TIMEOUT, BENCHMARK_ALGORITHMS,
+    ASTAR_MAX_SPEED, ASTAR_SNAP_SLACK,
+    BENCHMARK_WARMUP, BENCHMARK_MIN_REPEATS, BENCHMARK_MAX_REPEATS, BENCHMARK_TARGET_CI,
+    BENCHMARK_VARIANT_BUDGET, BENCHMARK_MEASURE_MEMORY, BENCHMARK_DISABLE_GC,
+    TSP_TIME_LIMIT, TSP_FIRST_SOLUTION, TSP_METAHEURISTIC,
+    TSP_HEURISTIC_TIME_LIMIT, TSP_HEURISTIC_MAX_ITERATIONS, TSP_HEURISTIC_CONSTRUCTION,
+)
+
+# Progress stages of a benchmark, in execution order
+STAGES = ("graph",) + ALGORITHMS + ("routing",)
+
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+
+async def execute_benchmark(data: BenchmarkRequest, osrm_client: OSRMClient, compute: ComputeExecutor,
+                            progress: Optional[ProgressCallback] = None,
+                            matrix_store: Optional[MatrixStore] = None) -> Dict[str, Any]:
+    """
+    Build the graph, benchmark the all-pairs algorithms and compute the route for one request.
+    
+    With a `matrix_store` holding the doctor and every user at their current
+    coordinates, the graph is built from its submatrix without OSRM requests.
+    
+    `progress(stage, status)` is awaited when each of STAGES starts ("running")
+    and ends ("done"); algorithms that are not timed are reported "skipped".
+    """
+    async def report(stage: str, status: str) -> None:
+        if progress is not None:
+            await progress(stage, status)
+
+    fw_impl = data.fwImpl or FLOYD_WARSHALL_IMPL
+    if fw_impl not in FLOYD_WARSHALL_IMPLEMENTATIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown Floyd-Warshall implementation: {fw_impl}")
+
+    if data.algorithm == "tspHeuristic":
+        tsp_options = {
+            'time_limit': _pick(data.tspTimeLimit, TSP_HEURISTIC_TIME_LIMIT),
+            'max_iterations': _pick(data.tspMaxIterations, TSP_HEURISTIC_MAX_ITERATIONS),
+            'construction': _pick(data.tspConstruction, TSP_HEURISTIC_CONSTRUCTION),
+        }
+        if tsp_options['construction'] not in CONSTRUCTIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown TSP construction: {tsp_options['construction']}")
+    else:
+        tsp_options = {
+            'time_limit': _pick(data.tspTimeLimit, TSP_TIME_LIMIT),
+            'first_solution': _pick(data.tspFirstSolution, TSP_FIRST_SOLUTION),
+            'metaheuristic': _pick(data.tspMetaheuristic, TSP_METAHEURISTIC),
+            # Repeated requests for the same doctor and patients reuse or warm-start the last tour
+            'node_keys': [data.doctorId] + list(data.userIds),
+            'warm_start_key': data.doctorId,
+        }
+        if tsp_options['first_solution'] not in FIRST_SOLUTION_STRATEGIES:
+            raise HTTPException(status_code=400, detail=f"Unknown TSP first solution strategy: {tsp_options['first_solution']}")
+        if tsp_options['metaheuristic'] not in METAHEURISTICS:
+            raise HTTPException(status_code=400, detail=f"Unknown TSP metaheuristic: {tsp_options['metaheuristic']}")
+
+    # Only the requested algorithms are timed, plus the one the route is built from
+    timed = data.benchmarkAlgorithms or BENCHMARK_ALGORITHMS or list(ALGORITHMS)
+    unknown = [algorithm for algorithm in timed if algorithm not in ALGORITHMS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown benchmark algorithms: {', '.join(unknown)}")
+    if data.algorithm in ALGORITHMS and data.algorithm not in timed:
+        timed = list(timed) + [data.algorithm]
+
+    variants = data.variants or {}
+    for algorithm, names in variants.items():
+        unknown = [name for name in names if name not in VARIANTS.get(algorithm, {})]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown {algorithm} variants: {', '.join(unknown)}")
+    harness_config = build_harness_config(data)
+
+    waypoints = await load_waypoints(data.doctorId, data.userIds)
+
+    # Build sparse graph (CSR k-nearest graph)
+    results = {}
+    await report("graph", "running")
+    graph, source, prefilter = await load_graph(data.doctorId, data.userIds, waypoints, GRAPH_K, osrm_client, matrix_store)
+    results['matrixSource'] = source
+    await report("graph", "done")
+    sparse = graph.graph
+
+    # Dense adjacency matrix for Floyd-Warshall and TSP
+    n = len(waypoints)
+    adj_matrix = sparse.to_dense()
+
+    # Algorithm work runs on the compute executor, within BENCHMARK_TIMEOUT overall
+    deadline = time.monotonic() + BENCHMARK_TIMEOUT
+    timings = {}
+
+    # Run benchmarks, one compute job per algorithm so progress can be reported
+    apsp = {}
+    for algorithm in ALGORITHMS:
+        if algorithm not in timed:
+            await report(algorithm, "skipped")
+            continue
+        await report(algorithm, "running")
+        try:
+            (algo_results, algo_apsp), timings[algorithm] = await compute.run(
+                benchmark_algorithms,
+                adj_matrix, sparse,
+                config=harness_config,
+                variants=variants,
+                fw_impl=fw_impl,
+                dijkstra_workers=DIJKSTRA_WORKERS,
+                dijkstra_min_nodes=DIJKSTRA_PARALLEL_MIN_NODES,
+                astar_max_speed=ASTAR_MAX_SPEED,
+                astar_snap_slack=ASTAR_SNAP_SLACK,
+                algorithms=(algorithm,),
+                coords=[(wp.latitude, wp.longitude) for wp in waypoints],
+                timeout=deadline - time.monotonic(),
+            )
+        except NegativeCycleError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        results.update(algo_results)
+        apsp.update(algo_apsp)
+        await report(algorithm, "done")
+
+    # Determine visiting order based on selected algorithm
+    start_idx = 0
+    user_indices = list(range(1, n))
+    # Priority users are visited first by every algorithm
+    priorities = data.priorities or {}
+    priority_indices = {i for i in user_indices if priorities.get(data.userIds[i-1])}
+    await report("routing", "running")
+    visiting_order, timings['routing'] = await compute.run(
+        compute_visiting_order,
+        data.algorithm, adj_matrix, sparse, apsp, start_idx, user_indices, priority_indices,
+        tsp_options=tsp_options,
+        timeout=deadline - time.monotonic(),
+    )
+
+    # Ensure visiting_order is valid and starts at 0
+    if not visiting_order or visiting_order[0] != 0:
+        print(f"{data.algorithm} returned no route for doctor {data.doctorId}, using the request order")
+        visiting_order = [0] + [i for i in user_indices if i != 0]
+
+    # Map visiting_order indices to coordinates
+    ordered_coords = [
+        {"latitude": waypoints[i].latitude, "longitude": waypoints[i].longitude}
+        for i in visiting_order
+    ]
+
+    # Get full route geometry for the visiting order. Per-segment geometry is
+    # only returned for TSP, and then comes from the legs of the same request.
+    per_segment = data.algorithm in ("tsp", "tspHeuristic")
+    visiting_order_route = await osrm_client.get_full_route(ordered_coords, legs=per_segment)
+
+    # --- NEW: Get total time for the optimal route ---
+    # Durations come from the same table request used to build the graph
+    durations = graph.durations if graph.durations is not None else [[None] * n for _ in range(n)]
+    total_time = 0.0
+    for i in range(1, len(visiting_order)):
+        from_idx = visiting_order[i-1]
+        to_idx = visiting_order[i]
+        seg_time = durations[from_idx][to_idx]
+        # None (OSRM table) or NaN (matrix store) for unreachable pairs
+        if seg_time is not None and seg_time == seg_time:
+            total_time += seg_time
+        elif prefilter:
+            # Pair outside the prefiltered table: use the route's own duration
+            total_time = visiting_order_route['duration']
+            break
+    results['totalTime'] = total_time
+    # --- END NEW ---
+
+    if per_segment:
+        results['routeGeoJSON'] = [leg['geometry'] for leg in visiting_order_route['legs']]
+    else:
+        results['routeGeoJSON'] = [visiting_order_route['geometry']]
+    results['tspRouteOrder'] = visiting_order
+    results['computeTimings'] = timings
+    await report("routing", "done")
+    return results
+
+async def load_waypoints(doctor_id: str, user_ids: List[str]) -> List[Node]:
+    """Doctor (node 0) and users (nodes 1..n, in order) as waypoints, 404 if any is missing."""
+    # Fetch doctor and users from DB, one projected query each
+    (doctors, _), (users, missing) = await asyncio.gather(
+        get_locations(Doctor, [doctor_id]),
+        get_locations(User, user_ids),
+    )
+    doctor = doctors.get(doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(missing)}")
+
+    # Build waypoints: doctor first, then users
+    waypoints = [Node("0", doctor.latitude, doctor.longitude)]
+    for i, user_id in enumerate(user_ids, 1):
+        user = users[user_id]
+        waypoints.append(Node(str(i), user.latitude, user.longitude))
+    return waypoints
+
+async def load_graph(doctor_id: str, user_ids: List[str], waypoints: List[Node], k: int, osrm_client: OSRMClient,
+                     matrix_store: Optional[MatrixStore] = None) -> Tuple[RoutingGraph, str, bool]:
+    """
+    The k-nearest routing graph of the waypoints, from the matrix store when it holds them all.
+    Returns:
+        (graph, source, prefiltered): source is "store" or "osrm"; prefiltered
+        is True when OSRM was only asked for straight-line candidate pairs
+    """
+    if matrix_store is not None:
+        keys = [location_key("doctor", doctor_id)] + [location_key("user", user_id) for user_id in user_ids]
+        stored = matrix_store.submatrix(keys, [(wp.latitude, wp.longitude) for wp in waypoints])
+        if stored is not None:
+            return graph_from_table(*stored, k), "store", False
+    # Large graphs only ask OSRM for pairs among each node's straight-line nearest
+    prefilter = 0 < GRAPH_PREFILTER_MIN_NODES <= len(waypoints)
+    graph = await build_graph(waypoints, k, osrm_client, candidates=k * GRAPH_PREFILTER_FACTOR if prefilter else None)
+    return graph, "osrm", prefilter
+
+def _pick(value, default):
+    """The request's value unless it was left out (explicit zeros are kept)."""
+    return default if value is None else value
+
+def build_harness_config(data: BenchmarkRequest) -> HarnessConfig:
+    """Harness settings from the BENCHMARK_* configuration with the request's overrides applied."""
+    options = data.harness or HarnessOptions()
+    return HarnessConfig(
+        warmup=_pick(options.warmup, BENCHMARK_WARMUP),
+        min_repeats=_pick(options.minRepeats, BENCHMARK_MIN_REPEATS),
+        max_repeats=_pick(options.maxRepeats, BENCHMARK_MAX_REPEATS),
+        target_rel_ci=_pick(options.targetCI, BENCHMARK_TARGET_CI),
+        time_budget=BENCHMARK_VARIANT_BUDGET,
+        measure_memory=_pick(options.measureMemory, BENCHMARK_MEASURE_MEMORY),
+        disable_gc=_pick(options.disableGC, BENCHMARK_DISABLE_GC),
+    )
+
+def compute_visiting_order(algorithm, adj_matrix, sparse, apsp, start_idx, user_indices, priority_indices=None, tsp_options=None):
+    """Visiting order for the selected algorithm (CPU-bound, runs on the compute executor)."""
+    if algorithm in ("tsp", "tspHeuristic"):
+        # Tours travel along shortest paths, not only the k-nearest edges (inf elsewhere)
+        dist = apsp.get('floydWarshall')
+        if dist is None:
+            dist = floyd_warshall_numpy(adj_matrix)
+        if algorithm == "tsp":
+            return solve_tsp(dist, priority_indices, **(tsp_options or {}))
+        return solve_tsp_heuristic(dist, priority_indices, graph=sparse, **(tsp_options or {}))
+    elif algorithm == "dijkstra":
+        return dijkstra_route(sparse, start_idx, user_indices, dist=apsp['dijkstra'], priority_indices=priority_indices)
+    elif algorithm == "bellmanFord":
+        return bellman_ford_route(sparse, start_idx, user_indices, dist=apsp['bellmanFord'], priority_indices=priority_indices)
+    elif algorithm == "spfa":
+        return spfa_route(sparse, start_idx, user_indices, dist=apsp['spfa'], priority_indices=priority_indices)
+    elif algorithm == "johnson":
+        return johnson_route(sparse, start_idx, user_indices, dist=apsp['johnson'], priority_indices=priority_indices)
+    elif algorithm == "floydWarshall":
+        return floyd_warshall_route(adj_matrix, start_idx, user_indices, dist=apsp['floydWarshall'], priority_indices=priority_indices)
+    # fallback: doctor, then priority users, then the rest in order
+    priority_indices = priority_indices or set()
+    return [start_idx] + [i for i in user_indices if i in priority_indices] + [i for i in user_indices if i not in priority_indices]
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import socket
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from beanie import UpdateResponse
+from beanie.operators import Set
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from modules.models.benchmark_job import BenchmarkJob, BenchmarkRequest, JobStage
+from modules.preprocess.osrm_client import OSRMClient
+from modules.preprocess.matrix_store import MatrixStore
+from modules.services.compute import ComputeExecutor
+from modules.services.benchmark import execute_benchmark, STAGES
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class LeaseLost(Exception):
+    """The job's lease expired and it was re-queued (or claimed by another worker)."""
+
+class BenchmarkJobQueue:
+    """
+    Background benchmark jobs stored as BenchmarkJob documents.
+
+    Jobs are claimed atomically from MongoDB (oldest queued first), so any
+    process running workers can execute jobs submitted through any API
+    replica. Local submissions wake the workers right away; otherwise they
+    poll every `poll_interval` seconds. With `workers=0` a process only
+    accepts and serves jobs.
+
+    A claim is a lease: the job records the worker's id and `leaseUntil`,
+    which the worker renews on every progress update and every lease / 3
+    seconds while it runs. Polling workers re-queue running jobs whose
+    lease expired (their worker died), never jobs a live worker holds.
+    """
+
+    def __init__(self, osrm_client: OSRMClient, compute: ComputeExecutor, workers: int = 1, poll_interval: float = 2.0,
+                 matrix_store: Optional[MatrixStore] = None, lease: float = 60.0):
+        self.osrm_client = osrm_client
+        self.compute = compute
+        self.matrix_store = matrix_store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self.workers <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, request: BenchmarkRequest) -> BenchmarkJob:
+        job = BenchmarkJob(request=request, stages=[JobStage(name=stage) for stage in STAGES])
+        await job.insert()
+        self._wakeup.set()
+        return job
+
+    async def _requeue_expired(self) -> int:
+        """Hand running jobs whose lease expired back to the queue. Returns how many."""
+        expired = {"status": "running", "$or": [{"leaseUntil": None}, {"leaseUntil": {"$lt": _now()}}]}
+        result = await BenchmarkJob.find(expired).update(
+            Set({BenchmarkJob.status: "queued", BenchmarkJob.workerId: None, BenchmarkJob.leaseUntil: None})
+        )
+        return getattr(result, "modified_count", 0) or 0
+
+    async def _update(self, job: BenchmarkJob, fields: Dict[Any, Any]) -> bool:
+        """Write fields to a job this worker still holds; False if the lease was lost."""
+        updated = await BenchmarkJob.find_one(
+            BenchmarkJob.id == job.id, BenchmarkJob.status == "running", BenchmarkJob.workerId == self.worker_id,
+        ).update(Set({**fields, BenchmarkJob.updatedAt: _now()}))
+        return bool(getattr(updated, "modified_count", 0))
+
+    async def _renew(self, job: BenchmarkJob, fields: Optional[Dict[Any, Any]] = None) -> None:
+        if not await self._update(job, {**(fields or {}), BenchmarkJob.leaseUntil: _now() + timedelta(seconds=self.lease)}):
+            raise LeaseLost(str(job.id))
+
+    async def _heartbeat(self, job: BenchmarkJob) -> None:
+        # Stages can run for minutes without a progress update
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await self._renew(job)
+
+    async def _claim(self) -> Optional[BenchmarkJob]:
+        while True:
+            oldest = await BenchmarkJob.find(BenchmarkJob.status == "queued").sort("+createdAt").first_or_none()
+            if oldest is None:
+                return None
+            # Only one worker wins the queued -> running transition
+            job = await BenchmarkJob.find_one(
+                BenchmarkJob.id == oldest.id, BenchmarkJob.status == "queued"
+            ).update(
+                Set({
+                    BenchmarkJob.status: "running",
+                    BenchmarkJob.workerId: self.worker_id,
+                    BenchmarkJob.leaseUntil: _now() + timedelta(seconds=self.lease),
+                    BenchmarkJob.updatedAt: _now(),
+                }),
+                response_type=UpdateResponse.NEW_DOCUMENT,
+            )
+            if job is not None:
+                return job
+
+    async def _worker(self) -> None:
+        while True:
+            # Jobs left running by a worker that died are picked up again
+            await self._requeue_expired()
+            job = await self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: BenchmarkJob) -> None:
+        stages = {stage.name: stage for stage in job.stages}
+
+        async def progress(stage: str, status: str) -> None:
+            entry = stages.setdefault(stage, JobStage(name=stage))
+            entry.status = status
+            if status == "running":
+                entry.startedAt = _now()
+            else:
+                entry.finishedAt = _now()
+            await self._renew(job, {BenchmarkJob.stages: list(stages.values())})
+
+        released = {BenchmarkJob.workerId: None, BenchmarkJob.leaseUntil: None}
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        run = asyncio.create_task(execute_benchmark(job.request, self.osrm_client, self.compute, progress=progress,
+                                                    matrix_store=self.matrix_store))
+        try:
+            await asyncio.wait({heartbeat, run}, return_when=asyncio.FIRST_COMPLETED)
+            if not run.done():
+                # The heartbeat only ends when the lease was lost
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+                heartbeat.result()
+            result = run.result()
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        except LeaseLost:
+            print(f"Benchmark job {job.id} lost its lease, dropping the result")
+        except HTTPException as e:
+            if e.status_code == 429:
+                # Compute executor saturated: hand the job back and retry later
+                await self._update(job, {BenchmarkJob.status: "queued", **released})
+                await asyncio.sleep(self.poll_interval)
+                return
+            await self._update(job, {BenchmarkJob.status: "failed", BenchmarkJob.error: str(e.detail), **released})
+        except Exception as e:
+            traceback.print_exc()
+            await self._update(job, {BenchmarkJob.status: "failed", BenchmarkJob.error: repr(e), **released})
+        else:
+            await self._update(job, {
+                BenchmarkJob.status: "completed",
+                BenchmarkJob.result: jsonable_encoder(result),
+                **released,
+            })
+        finally:
+            heartbeat.cancel()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+
+def _timed(fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    """Run fn in the worker and report when it actually started and finished."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+class ComputeExecutor:
+    """
+    Managed pool for CPU-bound algorithm work, created in the lifespan of `main.py`.
+
+    Jobs run on a thread or process pool so the event loop keeps serving other
+    requests. At most `max_workers + max_queue` jobs are accepted at once; more
+    are rejected with 429 so callers back off instead of piling up.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, kind: str = "thread"):
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="compute")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'timedOut': 0, 'runTime': 0.0, 'queueTime': 0.0}
+
+    def _release(self, _future) -> None:
+        # Called when the job really ends, even after its caller timed out
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Tuple[Any, Dict[str, float]]:
+        """
+        Run fn(*args, **kwargs) on the pool.
+        Args:
+            timeout: Seconds to wait for the result before failing with 504.
+                The job itself cannot be interrupted and keeps its slot until it ends.
+        Returns:
+            (result, timing) where timing has the seconds spent queued and running
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats['rejected'] += 1
+                raise HTTPException(status_code=429, detail="Compute capacity exhausted, retry later", headers={"Retry-After": "1"})
+            self._in_flight += 1
+        submitted = time.time()
+        try:
+            future = self._executor.submit(_timed, fn, args, kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            result, started, finished = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self._stats['timedOut'] += 1
+            raise HTTPException(status_code=504, detail=f"{getattr(fn, '__name__', 'job')} exceeded its {timeout:.0f}s deadline")
+        except Exception:
+            self._stats['failed'] += 1
+            raise
+        timing = {'queueTime': started - submitted, 'runTime': finished - started}
+        self._stats['completed'] += 1
+        self._stats['queueTime'] += timing['queueTime']
+        self._stats['runTime'] += timing['runTime']
+        return result, timing
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'workers': self.max_workers,
+            'capacity': self.capacity,
+            'inFlight': self._in_flight,
+            **self._stats,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,20 +1,86 @@
 from modules.models.doctor import Doctor
 from modules.models.recommendation import Recommendation
-from typing import List
+from modules.models.user import User
+from modules.preprocess.spatial import haversine
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
+from beanie import Document, PydanticObjectId
+from beanie.operators import In
+from bson import ObjectId
 from fastapi import HTTPException
+from pydantic import BaseModel, Field
 
-async def add_recommendation(doctor_id: str, recommendation: Recommendation) -> Doctor:
-    doctor = await Doctor.get(doctor_id)
-    if not doctor:
-        raise HTTPException(status_code=404, detail="Doctor not found")
-    if doctor.recommendations is None:
-        doctor.recommendations = []
-    doctor.recommendations.append(recommendation)
-    await doctor.save()
-    return doctor
-
-async def list_recommendations(doctor_id: str) -> List[Recommendation]:
-    doctor = await Doctor.get(doctor_id)
-    if not doctor:
+class Location(BaseModel):
+    """Projection of a User or Doctor to its coordinates."""
+    id: PydanticObjectId = Field(alias="_id")
+    latitude: float
+    longitude: float
+
+async def get_locations(model: Type[Document], ids: List[str]) -> Tuple[Dict[str, Location], List[str]]:
+    """
+    Resolve many User/Doctor ids with a single `$in` query, projected to their coordinates.
+    Returns:
+        (locations, missing): Location by id, and the requested ids (in request
+        order, without duplicates) that are malformed or not in the collection
+    """
+    object_ids = list({ObjectId(i) for i in ids if ObjectId.is_valid(i)})
+    found = await model.find(In(model.id, object_ids)).project(Location).to_list() if object_ids else []
+    locations = {str(location.id): location for location in found}
+    missing = list(dict.fromkeys(i for i in ids if i not in locations))
+    return locations, missing
+
+async def users_near(latitude: float, longitude: float, radius: float, limit: int) -> List[Dict[str, Any]]:
+    """
+    Users within `radius` meters (straight line) of a point, nearest first.
+
+    Answered by MongoDB from the 2dsphere index on User.location.
+    Returns:
+        User documents (JSON-ready) with their `distance` in meters
+    """
+    near = {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [longitude, latitude]}, "$maxDistance": radius}}
+    users = await User.find({"location": near}).limit(limit).to_list()
+    return [
+        {**user.model_dump(mode="json", by_alias=True),
+         "distance": float(haversine(latitude, longitude, user.latitude, user.longitude))}
+        for user in users
+    ]
+
+async def _doctor_object_id(doctor_id: str) -> ObjectId:
+    """ObjectId of an existing doctor, 404 otherwise."""
+    if not ObjectId.is_valid(doctor_id) or not await Doctor.find(Doctor.id == ObjectId(doctor_id)).count():
         raise HTTPException(status_code=404, detail="Doctor not found")
-    return doctor.recommendations or [] 
\ No newline at end of file
+    return ObjectId(doctor_id)
+
+async def add_recommendation(doctor_id: str, recommendation: Recommendation) -> Recommendation:
+    """Insert a recommendation for the doctor as its own document (one atomic insert)."""
+    recommendation.id = None
+    recommendation.doctor_id = await _doctor_object_id(doctor_id)
+    if recommendation.date is None:
+        recommendation.date = datetime.now(timezone.utc)
+    await recommendation.insert()
+    return recommendation
+
+async def list_recommendations(doctor_id: str, after: Optional[str] = None, limit: int = 50) -> Tuple[List[Recommendation], Optional[str]]:
+    """
+    The doctor's recommendations newest first, one page at a time.
+
+    Pages are cut by (date, _id) keyset on the (doctor_id, date, _id) index,
+    so deep pages cost the same as the first one.
+    Args:
+        after: Id of the last recommendation of the previous page
+    Returns:
+        (recommendations, next_cursor): next_cursor is None on the last page
+    """
+    oid = await _doctor_object_id(doctor_id)
+    query = {"doctor_id": oid}
+    if after is not None:
+        last = await Recommendation.get(after) if ObjectId.is_valid(after) else None
+        if last is None or last.doctor_id != oid:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+        query["$or"] = [
+            {"date": {"$lt": last.date}},
+            {"date": last.date, "_id": {"$lt": last.id}},
+        ]
+    page = await Recommendation.find(query).sort([("date", -1), ("_id", -1)]).limit(limit + 1).to_list()
+    next_cursor = str(page[limit - 1].id) if len(page) > limit else None
+    return page[:limit], next_cursor
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from modules.models.doctor import Doctor
+from modules.models.recommendation import Recommendation
+from modules.models.user import User
+
+async def migrate_embedded_recommendations() -> int:
+    """
+    Move recommendations still embedded in doctor documents to the recommendations collection.
+
+    Each one is upserted on the doctor and its embedded `_id`, or its position
+    in the embedded array when it has none, so a migration interrupted
+    between the insert and the `$unset` can simply run again. Text and date
+    are only written on insert: a rerun neither duplicates a recommendation
+    nor moves the fallback date of an undated one.
+    Returns:
+        Number of doctors migrated
+    """
+    doctors = Doctor.get_motor_collection()
+    recommendations = Recommendation.get_motor_collection()
+    migrated = 0
+    async for doc in doctors.find({"recommendations": {"$exists": True}}, {"recommendations": 1}):
+        operations = []
+        for position, rec in enumerate(doc.get("recommendations") or []):
+            key = {"doctor_id": doc["_id"]}
+            if rec.get("_id") is not None:
+                key["_id"] = rec["_id"]
+            else:
+                key["embedded_index"] = position
+            fields = {"text": rec["text"], "date": rec.get("date") or datetime.now(timezone.utc)}
+            operations.append(UpdateOne(key, {"$setOnInsert": fields}, upsert=True))
+        if operations:
+            await recommendations.bulk_write(operations, ordered=False)
+        await doctors.update_one({"_id": doc["_id"]}, {"$unset": {"recommendations": ""}})
+        migrated += 1
+    return migrated
+
+async def backfill_locations(batch_size: int = 1000) -> int:
+    """
+    Set the GeoJSON `location` of users and doctors stored before it existed.
+    Returns:
+        Number of documents updated
+    """
+    updated = 0
+    for model in (User, Doctor):
+        collection = model.get_motor_collection()
+        operations = []
+        async for doc in collection.find({"location": None}, {"latitude": 1, "longitude": 1}):
+            location = {"type": "Point", "coordinates": [doc["longitude"], doc["latitude"]]}
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"location": location}}))
+            if len(operations) == batch_size:
+                updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+    return updated
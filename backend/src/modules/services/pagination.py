@@ -0,0 +1,55 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+from beanie import Document
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+def _encode(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return jsonable_encoder(doc, custom_encoder={ObjectId: str})
+
+def _query(after: Optional[str]) -> Dict[str, Any]:
+    if after is None:
+        return {}
+    if not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+    return {"_id": {"$gt": ObjectId(after)}}
+
+def parse_fields(model: Type[Document], fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """
+    MongoDB projection from a comma separated `fields` query parameter (None = all fields).
+    `_id` is always returned since it is the pagination cursor.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields or name == "id"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {name: 1 for name in names}
+
+async def list_page(model: Type[Document], after: Optional[str], limit: int,
+                    projection: Optional[Dict[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of a collection in `_id` order, starting after the `after` id (keyset pagination).
+    Returns:
+        (documents, next_cursor): next_cursor is the `after` of the following
+        page, None on the last one
+    """
+    cursor = model.get_motor_collection().find(_query(after), projection).sort("_id", 1).limit(limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+    next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+    return [_encode(doc) for doc in docs[:limit]], next_cursor
+
+def stream_ndjson(model: Type[Document], after: Optional[str], projection: Optional[Dict[str, int]] = None,
+                  batch_size: int = 500) -> AsyncIterator[bytes]:
+    """Every document after `after` as newline-delimited JSON, read batch by batch from the cursor."""
+    # Validated here so a bad cursor fails before the response starts
+    query = _query(after)
+
+    async def lines() -> AsyncIterator[bytes]:
+        cursor = model.get_motor_collection().find(query, projection).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            yield (json.dumps(_encode(doc)) + "\n").encode()
+
+    return lines()
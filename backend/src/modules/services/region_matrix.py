@@ -0,0 +1,39 @@
+import traceback
+from typing import Dict, Tuple
+from modules.models.doctor import Doctor
+from modules.models.user import User
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_client import OSRMClient
+
+def location_key(kind: str, entity_id) -> str:
+    """Matrix store key of a user ("user") or doctor ("doctor")."""
+    return f"{kind}:{entity_id}"
+
+async def all_locations() -> Dict[str, Tuple[float, float]]:
+    """(latitude, longitude) of every user and doctor by matrix store key."""
+    locations = {}
+    for kind, model in (("user", User), ("doctor", Doctor)):
+        async for doc in model.get_motor_collection().find({}, {"latitude": 1, "longitude": 1}):
+            locations[location_key(kind, doc["_id"])] = (doc["latitude"], doc["longitude"])
+    return locations
+
+async def sync_matrix_store(store: MatrixStore, osrm_client: OSRMClient) -> Dict[str, int]:
+    """Bring the store in line with the users and doctors in the database (the precompute job)."""
+    try:
+        result = await store.sync(osrm_client, await all_locations())
+        print(f"Matrix store synced: {result}")
+        return result
+    except Exception:
+        traceback.print_exc()
+        raise
+
+async def store_location(store: MatrixStore, osrm_client: OSRMClient, key: str, latitude: float, longitude: float) -> None:
+    """Add or move one entity (run as a background task after the response)."""
+    try:
+        await store.update(osrm_client, {key: (latitude, longitude)})
+    except Exception as e:
+        # The next sync picks it up; benchmarks fall back to OSRM meanwhile
+        print(f"Error updating matrix store for {key}: {e}")
+
+async def forget_location(store: MatrixStore, key: str) -> None:
+    await store.remove([key])
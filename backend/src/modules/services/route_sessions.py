@@ -0,0 +1,242 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from modules.algorithms.dijkstra_parallel import dijkstra_all_pairs_parallel
+from modules.algorithms.incremental import (
+    graph_add_node, graph_remove_node, apsp_add_node, apsp_remove_node, tour_insert, tour_remove, tour_cost,
+)
+from modules.algorithms.tsp_heuristic import solve_tsp_heuristic
+from modules.config import (
+    GRAPH_K, DIJKSTRA_WORKERS, DIJKSTRA_PARALLEL_MIN_NODES, BENCHMARK_TIMEOUT, TSP_HEURISTIC_TIME_LIMIT,
+    ROUTE_SESSION_MAX, ROUTE_SESSION_TTL, ROUTE_SESSION_SEARCH_TIME,
+)
+from modules.models.route_session import RouteSessionRequest, RouteSessionPatch
+from modules.models.user import User
+from modules.preprocess.csr_graph import CSRGraph
+from modules.preprocess.matrix_store import MatrixStore
+from modules.preprocess.osrm_cache import LRUCache
+from modules.preprocess.osrm_client import OSRMClient
+from modules.services.benchmark import load_waypoints, load_graph
+from modules.services.compute import ComputeExecutor
+from modules.services.crud import get_locations
+from modules.services.region_matrix import location_key
+
+
+# Sessions by id. Process-local: edits must reach the process that created the session.
+_sessions = LRUCache(max_entries=ROUTE_SESSION_MAX, ttl=ROUTE_SESSION_TTL)
+
+class RouteState:
+    """
+    Everything an edit needs, over node indices (0 = doctor): the k-nearest
+    graph, the OSRM distance/duration matrices (NaN where not requested or
+    unreachable), the all-pairs shortest path distances and the closed tour.
+    """
+
+    def __init__(self, graph: CSRGraph, distances: np.ndarray, durations: np.ndarray,
+                 apsp: np.ndarray, tour: List[int]):
+        self.graph = graph
+        self.distances = distances
+        self.durations = durations
+        self.apsp = apsp
+        self.tour = tour
+
+class RouteSession:
+    """A doctor's route kept in memory between edits. Node i > 0 is user_ids[i - 1]."""
+
+    def __init__(self, doctor_id: str, user_ids: List[str], coords: List[Tuple[float, float]],
+                 priorities: Set[str], state: RouteState):
+        self.id = uuid.uuid4().hex
+        self.doctor_id = doctor_id
+        self.user_ids = user_ids
+        self.coords = coords
+        self.priorities = priorities
+        self.state = state
+        self.lock = asyncio.Lock()
+
+    def view(self) -> Dict[str, Any]:
+        tour = self.state.tour
+        ids = [self.doctor_id] + self.user_ids
+        distance = tour_cost(tour, self.state.apsp)
+        legs = [self.state.durations[a, b] for a, b in zip(tour, tour[1:])]
+        return {
+            "id": self.id,
+            "doctorId": self.doctor_id,
+            "userIds": self.user_ids,
+            "priorities": sorted(self.priorities),
+            "order": [ids[i] for i in tour],
+            "tspRouteOrder": tour,
+            "coordinates": [{"latitude": self.coords[i][0], "longitude": self.coords[i][1]} for i in tour],
+            "totalDistance": distance if np.isfinite(distance) else None,
+            # Legs outside a prefiltered OSRM table are not counted
+            "totalTime": float(np.nansum(legs)),
+        }
+
+def solve_route(graph: CSRGraph, distances: np.ndarray, durations: np.ndarray, priority: Set[int],
+                time_limit: float) -> Tuple[RouteState, Dict[str, Any]]:
+    """Full solve for a new session: all-pairs Dijkstra, then a heuristic tour (runs on the compute executor)."""
+    started = time.perf_counter()
+    apsp = dijkstra_all_pairs_parallel(graph, workers=DIJKSTRA_WORKERS, min_nodes=DIJKSTRA_PARALLEL_MIN_NODES)
+    solved = time.perf_counter()
+    tour = solve_tsp_heuristic(apsp, priority, graph=graph, time_limit=time_limit)
+    stats = {'apspTime': solved - started, 'tourTime': time.perf_counter() - solved}
+    return RouteState(graph, distances, durations, apsp, tour), stats
+
+def edit_route(state: RouteState, remove: List[int], reprioritized: List[int], priority: Set[int],
+               add_distances: Tuple[np.ndarray, np.ndarray], add_durations: Tuple[np.ndarray, np.ndarray],
+               search_time: float) -> Tuple[RouteState, Dict[str, Any]]:
+    """
+    Apply one edit to a route state (runs on the compute executor).
+
+    Removed nodes go first (higher indices shift down), then nodes whose
+    priority changed are re-inserted, then new nodes are appended. Each new
+    node costs an O(n²) all-pairs update and a cheapest insertion. A short
+    2-opt/Or-opt search from the repaired tour finishes the edit.
+    Args:
+        remove: Node indices to remove
+        reprioritized: Indices (after removal) of kept nodes whose priority changed
+        priority: Priority node indices after the edit
+        add_distances: (rows, columns) for the added nodes: rows[j] from added node j to
+            every node after the edit, columns[:, j] from every node to it
+        add_durations: Same for the durations
+    """
+    started = time.perf_counter()
+    graph, apsp, tour = state.graph, state.apsp, state.tour
+    distances, durations = state.distances, state.durations
+    repaired = 0
+    for node in sorted(remove, reverse=True):
+        graph = graph_remove_node(graph, node)
+        apsp, pairs = apsp_remove_node(apsp, node, graph)
+        repaired += pairs
+        tour = tour_remove(tour, node)
+        distances = np.delete(np.delete(distances, node, axis=0), node, axis=1)
+        durations = np.delete(np.delete(durations, node, axis=0), node, axis=1)
+
+    for node in reprioritized:
+        tour = tour_insert([i for i in tour if i != node], apsp, node, priority)
+
+    kept = len(apsp)
+    rows, columns = add_distances
+    added = len(rows)
+    if added:
+        distances = _grow(distances, *add_distances)
+        durations = _grow(durations, *add_durations)
+    for x in range(kept, kept + added):
+        graph = graph_add_node(graph, distances[x, :x], distances[:x, x], GRAPH_K)
+        apsp = apsp_add_node(apsp, graph)
+        tour = tour_insert(tour, apsp, x, priority)
+    repaired_at = time.perf_counter()
+
+    tour = solve_tsp_heuristic(apsp, priority, graph=graph, time_limit=search_time, initial_tour=tour)
+    stats = {
+        'updateTime': repaired_at - started,
+        'searchTime': time.perf_counter() - repaired_at,
+        'repairedPairs': repaired,
+    }
+    return RouteState(graph, distances, durations, apsp, tour), stats
+
+def _grow(matrix: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Matrix of the kept nodes extended with the added nodes' rows and columns."""
+    kept, total = len(matrix), rows.shape[1]
+    grown = np.empty((total, total))
+    grown[:kept, :kept] = matrix
+    grown[kept:, :] = rows
+    grown[:, kept:] = columns
+    return grown
+
+async def _added_tables(final_keys: List[str], coords: List[Tuple[float, float]], added: int,
+                        osrm_client: OSRMClient, matrix_store: Optional[MatrixStore]):
+    """Distance and duration (rows, columns) of the last `added` nodes, from the matrix store or OSRM."""
+    stored = matrix_store.submatrix(final_keys, coords) if matrix_store is not None else None
+    if stored is not None:
+        return [(matrix[-added:, :], matrix[:, -added:]) for matrix in stored]
+    waypoints = [{'latitude': lat, 'longitude': lon} for lat, lon in coords]
+    everything = list(range(len(coords)))
+    new = everything[-added:]
+    rows, columns = await asyncio.gather(
+        osrm_client.get_table_rect(waypoints, new, everything),
+        osrm_client.get_table_rect(waypoints, everything, new),
+    )
+    return [(np.array(rows[key], dtype=np.float64), np.array(columns[key], dtype=np.float64))
+            for key in ('distances', 'durations')]
+
+def get_session(session_id: str) -> RouteSession:
+    session = _sessions.get_many([session_id]).get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Route session not found")
+    return session
+
+def delete_session(session_id: str) -> None:
+    get_session(session_id)
+    _sessions.delete_many([session_id])
+
+async def create_session(data: RouteSessionRequest, osrm_client: OSRMClient, compute: ComputeExecutor,
+                         matrix_store: Optional[MatrixStore] = None) -> Dict[str, Any]:
+    """Solve a doctor's route once and keep it as a session for incremental edits."""
+    if len(set(data.userIds)) != len(data.userIds):
+        raise HTTPException(status_code=400, detail="Duplicate users in the route")
+    waypoints = await load_waypoints(data.doctorId, data.userIds)
+    graph, source, _ = await load_graph(data.doctorId, data.userIds, waypoints, GRAPH_K, osrm_client, matrix_store)
+    priorities = {user_id for user_id, flag in (data.priorities or {}).items() if flag and user_id in data.userIds}
+    priority = {i for i, user_id in enumerate(data.userIds, 1) if user_id in priorities}
+    # The OSRM table is empty when OSRM failed (nested lists with None otherwise)
+    n = len(waypoints)
+    distances, durations = (np.array(matrix, dtype=np.float64) if matrix is not None else np.full((n, n), np.nan)
+                            for matrix in (graph.distances, graph.durations))
+    (state, stats), timing = await compute.run(
+        solve_route, graph.graph, distances, durations, priority, TSP_HEURISTIC_TIME_LIMIT,
+        timeout=BENCHMARK_TIMEOUT,
+    )
+    session = RouteSession(data.doctorId, list(data.userIds), [(wp.latitude, wp.longitude) for wp in waypoints],
+                           priorities, state)
+    _sessions.set_many({session.id: session})
+    return {**session.view(), "matrixSource": source, "computeTimings": {**stats, **timing}}
+
+async def patch_session(session: RouteSession, patch: RouteSessionPatch, osrm_client: OSRMClient,
+                        compute: ComputeExecutor, matrix_store: Optional[MatrixStore] = None) -> Dict[str, Any]:
+    """Add and remove users and change priorities, updating the kept graph, distances and tour."""
+    async with session.lock:
+        position = {user_id: i for i, user_id in enumerate(session.user_ids, 1)}
+        unknown = [user_id for user_id in patch.remove if user_id not in position]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Users not in the route: {', '.join(unknown)}")
+        removed = set(patch.remove)
+        present = [user_id for user_id in patch.add if user_id in position and user_id not in removed]
+        if present or len(set(patch.add)) != len(patch.add):
+            raise HTTPException(status_code=400, detail=f"Users already in the route: {', '.join(present or patch.add)}")
+        locations, missing = await get_locations(User, patch.add)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(missing)}")
+
+        kept_ids = [user_id for user_id in session.user_ids if user_id not in removed]
+        user_ids = kept_ids + list(patch.add)
+        coords = [session.coords[0]] + [session.coords[position[user_id]] for user_id in kept_ids]
+        coords += [(locations[user_id].latitude, locations[user_id].longitude) for user_id in patch.add]
+        priorities = (session.priorities - removed) | {u for u in patch.add if (patch.priorities or {}).get(u)}
+        reprioritized = []
+        for i, user_id in enumerate(kept_ids, 1):
+            flag = (patch.priorities or {}).get(user_id)
+            if flag is not None and flag != (user_id in priorities):
+                priorities = (priorities | {user_id}) if flag else (priorities - {user_id})
+                reprioritized.append(i)
+        priority = {i for i, user_id in enumerate(user_ids, 1) if user_id in priorities}
+
+        n = len(coords)
+        if patch.add:
+            keys = [location_key("doctor", session.doctor_id)] + [location_key("user", user_id) for user_id in user_ids]
+            add_distances, add_durations = await _added_tables(keys, coords, len(patch.add), osrm_client, matrix_store)
+        else:
+            add_distances = add_durations = (np.empty((0, n)), np.empty((n, 0)))
+        (state, stats), timing = await compute.run(
+            edit_route, session.state, [position[user_id] for user_id in removed], reprioritized, priority,
+            add_distances, add_durations, ROUTE_SESSION_SEARCH_TIME,
+            timeout=BENCHMARK_TIMEOUT,
+        )
+        session.state, session.user_ids, session.coords, session.priorities = state, user_ids, coords, priorities
+        # Refreshes the session's TTL
+        _sessions.set_many({session.id: session})
+        return {**session.view(), "computeTimings": {**stats, **timing}}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend imports its packages as `modules.*` from backend/src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
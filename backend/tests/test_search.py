@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from modules.algorithms.search import GraphSearch
+from modules.preprocess.spatial import haversine
+
+def snapped_graph(n: int, seed: int):
+    """
+    k-nearest road graph between snapped points, and the unsnapped coordinates
+    up to ~140 m away from them (what the A* bound actually sees).
+    """
+    rng = np.random.default_rng(seed)
+    snapped = np.column_stack([rng.uniform(52.50, 52.53, n), rng.uniform(13.38, 13.42, n)])
+    straight = haversine(snapped[:, None, 0], snapped[:, None, 1], snapped[None, :, 0], snapped[None, :, 1])
+    roads = straight * rng.uniform(1.0, 1.3, size=(n, n))
+    graph = {u: [(int(v), float(roads[u, v])) for v in np.argsort(straight[u])[1:6]] for u in range(n)}
+    coords = snapped + rng.uniform(-0.001, 0.001, size=(n, 2))
+    return graph, coords
+
+@pytest.mark.parametrize("seed", range(5))
+def test_astar_and_nearest_are_exact_with_snapped_points(seed):
+    graph, coords = snapped_graph(80, seed)
+    search = GraphSearch(graph, coords)
+    for source in range(0, 80, 7):
+        exact = search.to_targets(source, range(80))
+        assert all(search.astar(source, t) == pytest.approx(exact[t]) for t in range(80))
+        row = search.nearest(source, [t for t in range(80) if t != source], "astar")
+        assert min(row.values()) == pytest.approx(min(d for t, d in exact.items() if t != source))
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from modules.algorithms.tsp_heuristic import solve_tsp_heuristic
+
+def three_node_matrix() -> np.ndarray:
+    # 0 -> 2 -> 1 -> 0 costs 3, 0 -> 1 -> 2 -> 0 costs 30
+    return np.array([
+        [0.0, 10.0, 1.0],
+        [1.0, 0.0, 10.0],
+        [10.0, 1.0, 0.0],
+    ])
+
+@pytest.mark.parametrize("n", [1, 2])
+def test_trivial_tours(n):
+    assert solve_tsp_heuristic(np.zeros((n, n))) == list(range(n)) + [0]
+
+def test_three_nodes_takes_the_cheaper_order():
+    assert solve_tsp_heuristic(three_node_matrix()) == [0, 2, 1, 0]
+
+def test_three_nodes_puts_the_priority_node_first():
+    assert solve_tsp_heuristic(three_node_matrix(), {1}) == [0, 1, 2, 0]
+    assert solve_tsp_heuristic(three_node_matrix(), {2}) == [0, 2, 1, 0]
+    assert solve_tsp_heuristic(three_node_matrix(), {1, 2}) == [0, 2, 1, 0]
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from modules.algorithms.tsp_solver import solve_tsp
+
+def random_matrix(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0.0, 10000.0, size=(n, 2))
+    distances = np.abs(points[:, None, :] - points[None, :, :]).sum(axis=-1)
+    # One-way streets: asymmetric like real OSRM tables
+    return distances * (1.0 + rng.uniform(0.0, 0.1, size=(n, n)))
+
+@pytest.mark.parametrize("seed", range(10))
+def test_priority_solve_returns_full_tour_with_priority_first(seed):
+    rng = np.random.default_rng(100 + seed)
+    n = int(rng.integers(5, 26))
+    priority = set(rng.choice(np.arange(1, n), size=int(rng.integers(1, 4)), replace=False).tolist())
+
+    tour = solve_tsp(random_matrix(n, seed), priority, time_limit=1.0, cache=False)
+
+    assert tour[0] == 0 and tour[-1] == 0
+    assert sorted(tour[1:-1]) == list(range(1, n))
+    assert set(tour[1:1 + len(priority)]) == priority
+
+def test_solve_without_priorities_visits_every_node():
+    tour = solve_tsp(random_matrix(12, 0), time_limit=1.0, cache=False)
+    assert tour[0] == tour[-1] == 0
+    assert sorted(tour[1:-1]) == list(range(1, 12))
@@ -0,0 +1,30 @@
+import numpy as np
+
+import modules.services.benchmark as benchmark
+from modules.algorithms.floyd_warshall import floyd_warshall_numpy
+from modules.algorithms.tsp_solver import integer_costs
+from modules.benchmark.graphs import graph_from_distances, random_geometric_distances
+
+def test_tsp_on_sparse_graph_uses_no_penalty_arcs(monkeypatch):
+    n = 20
+    adj_matrix, sparse = graph_from_distances(random_geometric_distances(n, seed=3), 4)
+    assert np.isinf(adj_matrix).any()
+    solved = []
+
+    def solve_tsp(distance_matrix, *args, **kwargs):
+        solved.append(np.asarray(distance_matrix))
+        return real_solve_tsp(distance_matrix, *args, **kwargs)
+
+    real_solve_tsp = benchmark.solve_tsp
+    monkeypatch.setattr(benchmark, "solve_tsp", solve_tsp)
+    tour = benchmark.compute_visiting_order("tsp", adj_matrix, sparse, {}, 0, list(range(1, n)),
+                                            tsp_options={'time_limit': 1.0, 'cache': False})
+
+    closure = floyd_warshall_numpy(adj_matrix)
+    assert tour[0] == tour[-1] == 0 and sorted(tour[1:-1]) == list(range(1, n))
+    # The solver saw real shortest path costs on every arc, none of integer_costs' penalties
+    assert np.isfinite(solved[0]).all()
+    np.testing.assert_allclose(solved[0], closure)
+    penalty = integer_costs(adj_matrix).max()
+    costs = integer_costs(solved[0])
+    assert all(costs[a, b] < penalty for a, b in zip(tour, tour[1:]))
@@ -1,8 +1,8 @@
 import { useApi } from "@/hooks/useApi"
 
-export function getDoctors() {
+export function getDoctors(after?: string | null) {
   const api = useApi()
-  return api.get("/doctors")
+  return api.getPage("/doctors", after)
 }
 
 export function createDoctor(data: any) {
@@ -1,8 +1,8 @@
 import { useApi } from "@/hooks/useApi"
 
-export function getUsers() {
+export function getUsers(after?: string | null) {
   const api = useApi()
-  return api.get("/users")
+  return api.getPage("/users", after)
 }
 
 export function createUser(data: any) {
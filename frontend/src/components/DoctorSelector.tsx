@@ -1,4 +1,3 @@
-import { useEffect, useState } from "react"
 import {
   Select,
   SelectContent,
@@ -6,32 +5,34 @@ import {
   SelectTrigger,
   SelectValue,
 } from "@/components/ui/select"
-import { getDoctors } from "@/api/doctors"
+import { Button } from "@/components/ui/button"
 
 type Doctor = { _id: string; name: string }
 
 type Props = {
+  doctors: Doctor[]
+  hasMore?: boolean
+  onLoadMore?: () => void
   value?: string
   onChange?: (doctorId: string) => void
 }
 
-export function DoctorSelector({ value, onChange }: Props) {
-  const [doctors, setDoctors] = useState<Doctor[]>([])
-
-  useEffect(() => {
-    getDoctors().then((docs: Doctor[]) => setDoctors(docs))
-  }, [])
-
+export function DoctorSelector({ doctors, hasMore, onLoadMore, value, onChange }: Props) {
   return (
-    <Select value={value} onValueChange={onChange}>
-      <SelectTrigger>
-        <SelectValue placeholder="Select doctor..." />
-      </SelectTrigger>
-      <SelectContent>
-        {doctors.map(d => (
-          <SelectItem key={d._id} value={d._id}>{d.name}</SelectItem>
-        ))}
-      </SelectContent>
-    </Select>
+    <div className="flex flex-col gap-1">
+      <Select value={value} onValueChange={onChange}>
+        <SelectTrigger>
+          <SelectValue placeholder="Select doctor..." />
+        </SelectTrigger>
+        <SelectContent>
+          {doctors.map(d => (
+            <SelectItem key={d._id} value={d._id}>{d.name}</SelectItem>
+          ))}
+        </SelectContent>
+      </Select>
+      {hasMore && (
+        <Button variant="link" size="sm" onClick={onLoadMore}>Load more doctors</Button>
+      )}
+    </div>
   )
 } 
\ No newline at end of file
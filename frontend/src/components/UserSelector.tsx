@@ -1,6 +1,8 @@
 import { useEffect, useState } from "react"
 import MultipleSelector, { type Option } from "@/components/ui/multiple-selector"
+import { Button } from "@/components/ui/button"
 import { getUsers } from "@/api/users"
+import { usePaginated } from "@/hooks/usePaginated"
 
 type User = { _id: string; name: string }
 
@@ -10,30 +12,30 @@ type Props = {
 }
 
 export function UserSelector({ value, onChange }: Props) {
-  const [options, setOptions] = useState<Option[]>([])
+  const users = usePaginated<User>(getUsers)
+  const options: Option[] = users.items.map(u => ({ value: u._id, label: u.name }))
   const [selected, setSelected] = useState<Option[]>([])
 
-  useEffect(() => {
-    getUsers().then((users: User[]) => {
-      setOptions(users.map(u => ({ value: u._id, label: u.name })))
-    })
-  }, [])
-
   useEffect(() => {
     if (value && options.length) {
       setSelected(options.filter(o => value.includes(o.value)))
     }
-  }, [value, options])
+  }, [value, users.items])
 
   return (
-    <MultipleSelector
-      options={options}
-      value={selected}
-      onChange={opts => {
-        setSelected(opts)
-        onChange?.(opts.map(o => o.value))
-      }}
-      placeholder="Select users..."
-    />
+    <div className="flex flex-col gap-1">
+      <MultipleSelector
+        options={options}
+        value={selected}
+        onChange={opts => {
+          setSelected(opts)
+          onChange?.(opts.map(o => o.value))
+        }}
+        placeholder="Select users..."
+      />
+      {users.hasMore && (
+        <Button variant="link" size="sm" onClick={users.loadMore}>Load more users</Button>
+      )}
+    </div>
   )
 } 
\ No newline at end of file
@@ -1,23 +1,20 @@
 import * as React from "react"
-import { getUsers } from "@/api/users"
 import { DataTable } from "./data-table"
 import { type User } from "./columns"
 
 type Props = {
+  users: User[]
+  hasMore?: boolean
+  onLoadMore?: () => void
   value: string[]
   onChange: (userIds: string[]) => void
   priorities?: { [userId: string]: boolean }
   onPrioritiesChange?: (priorities: { [userId: string]: boolean }) => void
 }
 
-export function UserTableSelector({ value, onChange, priorities: prioritiesProp, onPrioritiesChange }: Props) {
-  const [users, setUsers] = React.useState<User[]>([])
+export function UserTableSelector({ users, hasMore, onLoadMore, value, onChange, priorities: prioritiesProp, onPrioritiesChange }: Props) {
   const [priorities, setPriorities] = React.useState<{ [userId: string]: boolean }>({})
 
-  React.useEffect(() => {
-    getUsers().then(setUsers)
-  }, [])
-
   // Sync priorities with prop if controlled
   React.useEffect(() => {
     if (prioritiesProp) setPriorities(prioritiesProp)
@@ -34,6 +31,8 @@ export function UserTableSelector({ value, onChange, priorities: prioritiesProp,
   return (
     <DataTable
       data={users}
+      hasMore={hasMore}
+      onLoadMore={onLoadMore}
       value={value}
       onChange={onChange}
       priorities={priorities}
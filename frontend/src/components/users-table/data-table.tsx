@@ -23,9 +23,12 @@ type DataTableProps = {
   onChange: (userIds: string[]) => void
   priorities: { [userId: string]: boolean }
   onPriorityChange: (userId: string, value: boolean) => void
+  // More users on the server than in data
+  hasMore?: boolean
+  onLoadMore?: () => void
 }
 
-export function DataTable({ data, value, onChange, priorities, onPriorityChange }: DataTableProps) {
+export function DataTable({ data, value, onChange, priorities, onPriorityChange, hasMore, onLoadMore }: DataTableProps) {
   const [sorting, setSorting] = React.useState<SortingState>([])
   const [columnFilters, setColumnFilters] = React.useState<ColumnFiltersState>([])
   const [columnVisibility, setColumnVisibility] = React.useState<VisibilityState>({})
@@ -127,6 +130,11 @@ export function DataTable({ data, value, onChange, priorities, onPriorityChange
         <span className="text-xs self-center">
           Página {table.getState().pagination.pageIndex + 1} de {table.getPageCount()}
         </span>
+        {hasMore && (
+          <Button variant="outline" size="sm" onClick={onLoadMore} className="bg-[#FFDAA8] hover:bg-[#FFD7A2]">
+            Cargar más
+          </Button>
+        )}
       </div>
     </div>
   )
@@ -1,5 +1,8 @@
 const base = import.meta.env.VITE_API_URL + "/api" || "http://localhost:8000/api"
 
+// One page of a paginated list endpoint; next is null on the last page
+export type Page<T = any> = { items: T[]; next: string | null }
+
 export function useApi() {
   async function get(path: string) {
     const res = await fetch(base + path)
@@ -7,6 +10,14 @@ export function useApi() {
     return res.json()
   }
 
+  // One page of a paginated list endpoint, starting after the given cursor
+  async function getPage(path: string, after?: string | null): Promise<Page> {
+    const sep = path.includes("?") ? "&" : "?"
+    const res = await fetch(base + path + (after ? `${sep}after=${encodeURIComponent(after)}` : ""))
+    if (!res.ok) throw new Error(await res.text())
+    return { items: await res.json(), next: res.headers.get("X-Next-Cursor") }
+  }
+
   async function post(path: string, data: any) {
     const res = await fetch(base + path, {
       method: "POST",
@@ -17,5 +28,5 @@ export function useApi() {
     return res.json()
   }
 
-  return { get, post }
-} 
\ No newline at end of file
+  return { get, getPage, post }
+}
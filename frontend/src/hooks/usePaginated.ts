@@ -0,0 +1,30 @@
+import { useEffect, useState } from "react"
+import type { Page } from "@/hooks/useApi"
+
+// Loads the first page on mount and the following ones on loadMore()
+export function usePaginated<T = any>(fetchPage: (after?: string | null) => Promise<Page<T>>) {
+  const [items, setItems] = useState<T[]>([])
+  const [next, setNext] = useState<string | null>(null)
+  const [loading, setLoading] = useState(false)
+
+  async function load(after: string | null) {
+    setLoading(true)
+    try {
+      const page = await fetchPage(after)
+      setItems(prev => (after ? [...prev, ...page.items] : page.items))
+      setNext(page.next)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  useEffect(() => {
+    load(null)
+  }, [])
+
+  function loadMore() {
+    if (next && !loading) load(next)
+  }
+
+  return { items, hasMore: next !== null, loading, loadMore }
+}
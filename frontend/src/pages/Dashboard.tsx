@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import { Tabs, TabsList, TabsTrigger, TabsContent } from "@/components/ui/tabs";
 import { UserSelector } from "@/components/UserSelector";
 import { DoctorSelector } from "@/components/DoctorSelector";
@@ -9,6 +9,7 @@ import { Button } from "@/components/ui/button";
 import { runBenchmark } from "@/api/benchmark";
 import { getUsers } from "@/api/users";
 import { getDoctors } from "@/api/doctors";
+import { usePaginated } from "@/hooks/usePaginated";
 import { UserTableSelector } from "@/components/users-table/UserTableSelector";
 import {
   Select,
@@ -41,7 +42,7 @@ function BarChart({ timings }: { timings: Record<string, number> }) {
     Object.entries(timings).map(([k, v]) => [k, v * 1e6]),
   );
   const max = Math.max(
-    ...Object.values(scaledTimings).filter((v) => typeof v === "number"),
+    ...Object.values(scaledTimings).filter((v) => typeof v === "number" && !isNaN(v)),
     1,
   );
 
@@ -64,65 +65,74 @@ function BarChart({ timings }: { timings: Record<string, number> }) {
   );
 }
 
+function LoadMore({ hasMore, loading, onClick }: { hasMore: boolean, loading: boolean, onClick: () => void }) {
+  if (!hasMore) return null;
+  return (
+    <Button variant="outline" size="sm" className="mt-2" disabled={loading} onClick={onClick}>
+      {loading ? "Loading..." : "Load more"}
+    </Button>
+  );
+}
+
 function UsersList() {
-  const [users, setUsers] = useState<any[]>([]);
-  useEffect(() => {
-    getUsers().then(setUsers);
-  }, []);
+  const { items: users, hasMore, loading, loadMore } = usePaginated(getUsers);
   if (users.length === 0) return <p>No users found.</p>;
   return (
-    <Table>
-      <TableHeader>
-        <TableRow>
-          <TableHead>Name</TableHead>
-          <TableHead>Email</TableHead>
-          <TableHead>Age</TableHead>
-          <TableHead>Phone</TableHead>
-          <TableHead>Latitude</TableHead>
-          <TableHead>Longitude</TableHead>
-        </TableRow>
-      </TableHeader>
-      <TableBody>
-        {users.map((u) => (
-          <TableRow key={u._id}>
-            <TableCell>{u.name}</TableCell>
-            <TableCell>{u.email}</TableCell>
-            <TableCell>{u.age ?? '-'}</TableCell>
-            <TableCell>{u.phone_number ?? '-'}</TableCell>
-            <TableCell>{u.latitude}</TableCell>
-            <TableCell>{u.longitude}</TableCell>
+    <>
+      <Table>
+        <TableHeader>
+          <TableRow>
+            <TableHead>Name</TableHead>
+            <TableHead>Email</TableHead>
+            <TableHead>Age</TableHead>
+            <TableHead>Phone</TableHead>
+            <TableHead>Latitude</TableHead>
+            <TableHead>Longitude</TableHead>
           </TableRow>
-        ))}
-      </TableBody>
-    </Table>
+        </TableHeader>
+        <TableBody>
+          {users.map((u) => (
+            <TableRow key={u._id}>
+              <TableCell>{u.name}</TableCell>
+              <TableCell>{u.email}</TableCell>
+              <TableCell>{u.age ?? '-'}</TableCell>
+              <TableCell>{u.phone_number ?? '-'}</TableCell>
+              <TableCell>{u.latitude}</TableCell>
+              <TableCell>{u.longitude}</TableCell>
+            </TableRow>
+          ))}
+        </TableBody>
+      </Table>
+      <LoadMore hasMore={hasMore} loading={loading} onClick={loadMore} />
+    </>
   );
 }
 
 function DoctorsList() {
-  const [doctors, setDoctors] = useState<any[]>([]);
-  useEffect(() => {
-    getDoctors().then(setDoctors);
-  }, []);
+  const { items: doctors, hasMore, loading, loadMore } = usePaginated(getDoctors);
   if (doctors.length === 0) return <p>No doctors found.</p>;
   return (
-    <Table>
-      <TableHeader>
-        <TableRow>
-          <TableHead>Name</TableHead>
-          <TableHead>Email</TableHead>
-          <TableHead>Specialty</TableHead>
-        </TableRow>
-      </TableHeader>
-      <TableBody>
-        {doctors.map((d) => (
-          <TableRow key={d._id}>
-            <TableCell>{d.name}</TableCell>
-            <TableCell>{d.email}</TableCell>
-            <TableCell>{d.specialty}</TableCell>
+    <>
+      <Table>
+        <TableHeader>
+          <TableRow>
+            <TableHead>Name</TableHead>
+            <TableHead>Email</TableHead>
+            <TableHead>Specialty</TableHead>
           </TableRow>
-        ))}
-      </TableBody>
-    </Table>
+        </TableHeader>
+        <TableBody>
+          {doctors.map((d) => (
+            <TableRow key={d._id}>
+              <TableCell>{d.name}</TableCell>
+              <TableCell>{d.email}</TableCell>
+              <TableCell>{d.specialty}</TableCell>
+            </TableRow>
+          ))}
+        </TableBody>
+      </Table>
+      <LoadMore hasMore={hasMore} loading={loading} onClick={loadMore} />
+    </>
   );
 }
 
@@ -135,18 +145,14 @@ export default function Dashboard() {
   const [route, setRoute] = useState<any>(null);
   const [loading, setLoading] = useState(false);
   const [algorithm, setAlgorithm] = useState<string>("tsp");
-  const [allUsers, setAllUsers] = useState<any[]>([]);
-  const [allDoctors, setAllDoctors] = useState<any[]>([]);
+  // Shared by the selectors and the map, so a selection always has its coordinates
+  const users = usePaginated(getUsers);
+  const doctors = usePaginated(getDoctors);
   const [totalTime, setTotalTime] = useState<number | null>(null);
   const [priorities, setPriorities] = useState<{ [userId: string]: boolean }>({});
 
-  useEffect(() => {
-    getUsers().then(setAllUsers);
-    getDoctors().then(setAllDoctors);
-  }, []);
-
-  const selectedUsers = allUsers.filter(u => userIds.includes(u._id));
-  const selectedDoctor = allDoctors.find(d => d._id === doctorId);
+  const selectedUsers = users.items.filter(u => userIds.includes(u._id));
+  const selectedDoctor = doctors.items.find(d => d._id === doctorId);
 
   const handleStart = async () => {
     console.log("Start button clicked", { doctorId, userIds, algorithm });
@@ -159,6 +165,8 @@ export default function Dashboard() {
         floydWarshall: res.fwTime,
         dijkstra: res.dijkstraTime,
         bellmanFord: res.bellmanFordTime,
+        spfa: res.spfaTime,
+        johnson: res.johnsonTime,
       });
       setTspOrder(Array.isArray(res.tspRouteOrder) ? res.tspRouteOrder : []);
       setRoute(
@@ -240,9 +248,18 @@ export default function Dashboard() {
               </div>
             )}
             <div className="flex gap-4 mb-4">
-              <DoctorSelector value={doctorId} onChange={setDoctorId} />
+              <DoctorSelector
+                doctors={doctors.items}
+                hasMore={doctors.hasMore}
+                onLoadMore={doctors.loadMore}
+                value={doctorId}
+                onChange={setDoctorId}
+              />
               <div className="flex-1">
                 <UserTableSelector
+                  users={users.items}
+                  hasMore={users.hasMore}
+                  onLoadMore={users.loadMore}
                   value={userIds}
                   onChange={setUserIds}
                   priorities={priorities}
@@ -256,11 +273,14 @@ export default function Dashboard() {
                   </SelectTrigger>
                   <SelectContent>
                     <SelectItem value="tsp">TSP</SelectItem>
+                    <SelectItem value="tspHeuristic">TSP (heuristic)</SelectItem>
                     <SelectItem value="floydWarshall">
                       Floyd-Warshall
                     </SelectItem>
                     <SelectItem value="dijkstra">Dijkstra</SelectItem>
                     <SelectItem value="bellmanFord">Bellman-Ford</SelectItem>
+                    <SelectItem value="spfa">SPFA</SelectItem>
+                    <SelectItem value="johnson">Johnson</SelectItem>
                   </SelectContent>
                 </Select>
               </div>